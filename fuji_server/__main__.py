@@ -8,15 +8,81 @@ import argparse
 import configparser
 import logging
 import os
+import signal
+import tempfile
 
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
 from fuji_server.app import create_app
+from fuji_server.helper.catalogue_lookup import CatalogueLookup
+from fuji_server.helper.doi_prefix_index import DOIPrefixIndex
+from fuji_server.helper.github_cache import GithubCache
+from fuji_server.helper.host_health import HostHealthRegistry
+from fuji_server.helper.http_cache import HTTPCache
+from fuji_server.helper.parsed_artifact_cache import ParsedArtifactCache
+from fuji_server.helper.prefork_server import PreforkServer
 from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.redirect_chain_cache import RedirectChainCache
+from fuji_server.helper.reference_data_refresher import ReferenceDataRefresher
+from fuji_server.helper.reference_data_reloader import ReferenceDataReloader
+from fuji_server.helper.reference_data_snapshot import ReferenceDataSnapshot
+from fuji_server.helper.repository_profile_cache import RepositoryProfileCache
+from fuji_server.helper.request_helper import RequestHelper
+from fuji_server.helper.result_store import AssessmentResultStore
 
 
-def main():
+def configure_caches(ROOT_DIR):
+    # caches with SQLite connections are configured in each (forked) worker process
+    HostHealthRegistry.configure(
+        config["SERVICE"].get("host_cooldown"), config["SERVICE"].get("host_failure_threshold")
+    )
+    pid_resolution_cache_path = config["SERVICE"].get("pid_resolution_cache_path")
+    RedirectChainCache.configure(
+        ttl=config["SERVICE"].get("pid_resolution_ttl"),
+        path=os.path.join(ROOT_DIR, pid_resolution_cache_path) if pid_resolution_cache_path else None,
+    )
+    CatalogueLookup.configure(
+        positive_ttl=config["SERVICE"].get("catalogue_positive_ttl"),
+        negative_ttl=config["SERVICE"].get("catalogue_negative_ttl"),
+    )
+    re3data_profile_cache_path = config["SERVICE"].get("re3data_profile_cache_path")
+    RepositoryProfileCache.configure(
+        os.path.join(ROOT_DIR, re3data_profile_cache_path) if re3data_profile_cache_path else None,
+        ttl=config["SERVICE"].get("re3data_profile_ttl"),
+    )
+    doi_prefix_cache_path = config["SERVICE"].get("doi_prefix_cache_path")
+    DOIPrefixIndex.configure(os.path.join(ROOT_DIR, doi_prefix_cache_path) if doi_prefix_cache_path else None)
+    github_cache_path = config["SERVICE"].get("github_cache_path")
+    GithubCache.configure(
+        os.path.join(ROOT_DIR, github_cache_path) if github_cache_path else None,
+        max_age=config["SERVICE"].get("github_cache_max_age"),
+    )
+    content_cache_path = config["SERVICE"].get("content_cache_path")
+    RequestHelper.configure_content_cache(
+        max_bytes=config["SERVICE"].get("content_cache_max_size"),
+        ttl=config["SERVICE"].get("content_cache_ttl"),
+        shared_path=os.path.join(ROOT_DIR, content_cache_path) if content_cache_path else None,
+        shared_max_bytes=config["SERVICE"].get("content_cache_shared_max_size"),
+    )
+    ParsedArtifactCache.configure(
+        max_size=config["SERVICE"].get("parsed_cache_max_size"), ttl=config["SERVICE"].get("parsed_cache_ttl")
+    )
+    if config["SERVICE"].get("http_cache_path"):
+        HTTPCache.configure(
+            os.path.join(ROOT_DIR, config["SERVICE"]["http_cache_path"]),
+            max_size=config["SERVICE"].get("http_cache_max_size"),
+            max_age=config["SERVICE"].get("http_cache_max_age"),
+            default_ttl=config["SERVICE"].get("http_cache_default_ttl"),
+        )
+    if config["SERVICE"].get("result_store_path"):
+        AssessmentResultStore.configure(
+            os.path.join(ROOT_DIR, config["SERVICE"]["result_store_path"]),
+            max_age=config["SERVICE"].get("result_store_max_age"),
+        )
+
+
+def main(build_snapshot=False):
     logging.getLogger("connexion.operation").setLevel("INFO")
     ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
     YAML_DIR = config["SERVICE"]["yaml_directory"]
@@ -38,16 +104,40 @@ def main():
     preproc.set_metric_yaml_path(METRIC_YML_PATH)
     # logger.info('Total metrics defined: {}'.format(preproc.get_total_metrics()))
 
-    isDebug = config.getboolean("SERVICE", "debug_mode")
-    preproc.retrieve_licenses(isDebug)
+    PreforkServer.configure(config["SERVICE"].get("workers"))
+    reference_data_dir = config["SERVICE"].get("reference_data_dir")
+    ReferenceDataRefresher.configure(
+        os.path.join(ROOT_DIR, reference_data_dir) if reference_data_dir else None,
+        interval=config["SERVICE"].get("reference_data_refresh_interval"),
+        stale_after=config["SERVICE"].get("reference_data_stale_after"),
+    )
+    # the parsed reference data is loaded from a binary snapshot, a missing or stale snapshot is (re)built
+    reference_data_snapshot = config["SERVICE"].get("reference_data_snapshot")
+    snapshot_path = os.path.join(ROOT_DIR, reference_data_snapshot) if reference_data_snapshot else None
+    reload_state_path = None
+    if PreforkServer.is_enabled():
+        # state of the reloads done by the master, reported by all workers
+        reload_state_path = os.path.join(tempfile.gettempdir(), "fuji_reload_" + str(os.getpid()) + ".json")
+    ReferenceDataReloader.configure(snapshot_path, reload_state_path)
+    if snapshot_path and (build_snapshot or not ReferenceDataSnapshot.load(snapshot_path)):
+        ReferenceDataSnapshot.build(snapshot_path)
+        if build_snapshot:
+            return
+    elif build_snapshot:
+        print("No reference_data_snapshot path configured")
+        return
+    elif not snapshot_path:
+        preproc.retrieve_licenses()
+        preproc.retrieve_metadata_standards()
     preproc.retrieve_datacite_re3repos()
+    preproc.set_mime_types()
 
-    preproc.retrieve_metadata_standards()
     # preproc.retrieve_linkedvocabs(lov_api=LOV_API, lodcloud_api=LOD_CLOUDNET, bioportal_api=BIOPORTAL_REST, bioportal_key=BIOPORTAL_APIKEY, isDebugMode=False)
     # preproc.retrieve_linkedvocabs(lov_api=LOV_API, lodcloud_api=LOD_CLOUDNET, isDebugMode=isDebug)
     preproc.set_remote_log_info(config["SERVICE"].get("remote_log_host"), config["SERVICE"].get("remote_log_path"))
     preproc.set_max_content_size(config["SERVICE"]["max_content_size"])
-
+    preproc.set_assessment_timeout(config["SERVICE"].get("assessment_timeout"))
+    preproc.set_data_harvest_timeout(config["SERVICE"].get("data_harvest_timeout"))
     logger.info(f"Total SPDX licenses : {preproc.get_total_licenses()}")
     logger.info(f"Total re3repositories found from datacite api : {len(preproc.getRE3repositories())}")
     logger.info(f"Total subjects area of imported metadata standards : {len(preproc.metadata_standards)}")
@@ -56,8 +146,34 @@ def main():
 
     app = create_app(config)
     Limiter(get_remote_address, app=app.app, default_limits=[str(config["SERVICE"]["rate_limit"])])
-    # built in uvicorn ASGI
-    app.run(host=config["SERVICE"]["service_host"], port=int(config["SERVICE"]["service_port"]))
+
+    def start_worker():
+        configure_caches(ROOT_DIR)
+        if PreforkServer.is_enabled():
+            # the master reloads the reference data once and replaces all workers
+            ReferenceDataReloader.set_master(os.getppid())
+            # the refreshed snapshots are loaded by the master after an update
+            ReferenceDataRefresher.set_update_handler(ReferenceDataReloader.start)
+        if PreforkServer.worker_number == 0:
+            # reference data is downloaded in the background (by one worker only) if reference_data_dir is set,
+            # assessments use the latest ready snapshot
+            ReferenceDataRefresher.start()
+        if hasattr(signal, "SIGHUP"):
+            # reloads changed reference data files and metric YAMLs (as POST /admin/reload)
+            signal.signal(signal.SIGHUP, lambda signum, frame: ReferenceDataReloader.start())
+
+    if PreforkServer.is_enabled():
+        # workers share the reference data loaded by this process
+        PreforkServer.preload()
+        PreforkServer.run(
+            app, config["SERVICE"]["service_host"], int(config["SERVICE"]["service_port"]), post_fork=start_worker
+        )
+        if os.path.exists(reload_state_path):
+            os.remove(reload_state_path)
+    else:
+        start_worker()
+        # built in uvicorn ASGI
+        app.run(host=config["SERVICE"]["service_host"], port=int(config["SERVICE"]["service_port"]))
 
 
 if __name__ == "__main__":
@@ -66,6 +182,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     # add a new command line option, call it '-c' and set its destination to 'config_file'
     parser.add_argument("-c", "--config", required=True, help="Path to server.ini config file")
+    parser.add_argument(
+        "--build-snapshot", action="store_true", help="Compile the reference data snapshot (build step) and exit"
+    )
     args = parser.parse_args()
     config = configparser.ConfigParser()
     config.read(args.config)
@@ -78,4 +197,4 @@ if __name__ == "__main__":
         os.makedirs(log_directory, exist_ok=True)
     # fileConfig(log_configfile, defaults={'logfilename': log_file_path.replace("\\", "/")})
     logger = logging.getLogger()  # use this form to initialize the root logger
-    main()
+    main(build_snapshot=args.build_snapshot)
@@ -2,6 +2,7 @@
 #
 # SPDX-License-Identifier: MIT
 
+import asyncio
 import hashlib
 import io
 import json
@@ -10,8 +11,6 @@ import logging.handlers
 import re
 from urllib.parse import urlparse
 
-import pandas as pd
-
 from fuji_server import __version__
 from fuji_server.evaluators.fair_evaluator_api import FAIREvaluatorAPI
 from fuji_server.evaluators.fair_evaluator_code_provenance import FAIREvaluatorCodeProvenance
@@ -52,15 +51,14 @@ from fuji_server.evaluators.fair_evaluator_unique_persistent_identifier_software
 )
 from fuji_server.evaluators.fair_evaluator_version_identifier import FAIREvaluatorVersionIdentifier
 from fuji_server.harvester.data_harvester import DataHarvester
-from fuji_server.harvester.github_harvester import GithubHarvester
 from fuji_server.harvester.metadata_harvester import MetadataHarvester
+from fuji_server.helper.deadline import AssessmentDeadline
 from fuji_server.helper.linked_vocab_helper import LinkedVocabHelper
 from fuji_server.helper.metadata_collector import MetadataOfferingMethods
 from fuji_server.helper.metadata_mapper import Mapper
 from fuji_server.helper.metric_helper import MetricHelper
 from fuji_server.helper.preprocessor import Preprocessor
 from fuji_server.helper.repository_helper import RepositoryHelper
-from fuji_server.helper.request_helper import RequestHelper
 
 
 class FAIRCheck:
@@ -88,6 +86,20 @@ class FAIRCheck:
     GOOGLE_DATA_URL_CACHE = []
     LINKED_VOCAB_INDEX = {}
     ACCESS_RIGHTS = {}
+    # class-level tables each assessment takes at its start, see load_predata
+    REFERENCE_TABLES = [
+        "FILES_LIMIT",
+        "SCIENCE_FILE_FORMATS",
+        "LONG_TERM_FILE_FORMATS",
+        "OPEN_FILE_FORMATS",
+        "DEFAULT_NAMESPACES",
+        "STANDARD_PROTOCOLS",
+        "SCHEMA_ORG_CONTEXT",
+        "VALID_RESOURCE_TYPES",
+        "IDENTIFIERS_ORG_DATA",
+        "LINKED_VOCAB_INDEX",
+        "ACCESS_RIGHTS",
+    ]
     FUJI_VERSION = __version__
 
     def __init__(
@@ -129,6 +141,7 @@ class FAIRCheck:
         self.repository_urls = []  # urls identified which could represent the repository will need this probably for FAIRiCAT things
         self.landing_html = None
         self.landing_content_type = None
+        self.landing_validators = None
         self.landing_origin = None  # schema + authority of the landing page e.g. https://www.pangaea.de
         self.signposting_header_links = []
         self.typed_links = []
@@ -157,6 +170,9 @@ class FAIRCheck:
         self.use_datacite = use_datacite
         self.use_github = use_github
         self.repeat_pid_check = False
+        # time budget of the assessment, phases starting after the deadline are skipped
+        self.deadline = AssessmentDeadline(Preprocessor.assessment_timeout)
+        self.skipped_phases = []
         self.logger_message_stream = io.StringIO()
         logging.addLevelName(self.LOG_SUCCESS, "SUCCESS")
         logging.addLevelName(self.LOG_FAILURE, "FAILURE")
@@ -186,7 +202,12 @@ class FAIRCheck:
                 "FsF-F1-02D : Verification of PIDs is disabled in the config file, the evaluation result may be misleading"
             )"""
         self.count = 0
-        FAIRCheck.load_predata()
+        # the reference data may be refreshed or reloaded meanwhile, an assessment uses the tables current at its start
+        with Preprocessor.reference_data_lock:
+            FAIRCheck.load_predata()
+            for table in self.REFERENCE_TABLES:
+                setattr(self, table, getattr(FAIRCheck, table))
+            self.SPDX_LICENSES, self.SPDX_LICENSE_NAMES = Preprocessor.get_licenses()
         # self.extruct = None
         self.extruct_result = {}
         self.lov_helper = LinkedVocabHelper(self.LINKED_VOCAB_INDEX)
@@ -230,40 +251,27 @@ class FAIRCheck:
             metric_version=self.metric_helper.get_metric_version(),
         )
         self.repo_helper = None
-        RequestHelper.reset_cache()
 
     @classmethod
     def load_predata(cls):
         cls.FILES_LIMIT = Preprocessor.data_files_limit
-        if not cls.SPDX_LICENSES:
-            cls.SPDX_LICENSES, cls.SPDX_LICENSE_NAMES = Preprocessor.get_licenses()
         """if not cls.COMMUNITY_METADATA_STANDARDS:
             cls.COMMUNITY_METADATA_STANDARDS = Preprocessor.get_metadata_standards()
             cls.COMMUNITY_METADATA_STANDARDS_URIS = {u.strip().strip('#/') : k for k, v in cls.COMMUNITY_METADATA_STANDARDS.items() for u in v.get('urls')}
             cls.COMMUNITY_METADATA_STANDARDS_NAMES = {k: v.get('title') for k,v in cls.COMMUNITY_METADATA_STANDARDS.items()}"""
 
-        if not cls.SCIENCE_FILE_FORMATS:
-            cls.SCIENCE_FILE_FORMATS = Preprocessor.get_science_file_formats()
-        if not cls.LONG_TERM_FILE_FORMATS:
-            cls.LONG_TERM_FILE_FORMATS = Preprocessor.get_long_term_file_formats()
-        if not cls.OPEN_FILE_FORMATS:
-            cls.OPEN_FILE_FORMATS = Preprocessor.get_open_file_formats()
-        if not cls.DEFAULT_NAMESPACES:
-            cls.DEFAULT_NAMESPACES = Preprocessor.getDefaultNamespaces()
-        # if not cls.VOCAB_NAMESPACES:
-        #    cls.VOCAB_NAMESPACES = Preprocessor.getLinkedVocabs()
-        if not cls.STANDARD_PROTOCOLS:
-            cls.STANDARD_PROTOCOLS = Preprocessor.get_standard_protocols()
-        if not cls.SCHEMA_ORG_CONTEXT:
-            cls.SCHEMA_ORG_CONTEXT = Preprocessor.get_schema_org_context()
-        if not cls.VALID_RESOURCE_TYPES:
-            cls.VALID_RESOURCE_TYPES = Preprocessor.get_resource_types()
-        if not cls.IDENTIFIERS_ORG_DATA:
-            cls.IDENTIFIERS_ORG_DATA = Preprocessor.get_identifiers_org_data()
-        if not cls.LINKED_VOCAB_INDEX:
-            cls.LINKED_VOCAB_INDEX = Preprocessor.get_linked_vocab_index()
-        if not cls.ACCESS_RIGHTS:
-            cls.ACCESS_RIGHTS = Preprocessor.get_access_rights()
+        # the tables are read from the Preprocessor every time, they are replaced when the reference data is reloaded
+        cls.SCIENCE_FILE_FORMATS = Preprocessor.get_science_file_formats()
+        cls.LONG_TERM_FILE_FORMATS = Preprocessor.get_long_term_file_formats()
+        cls.OPEN_FILE_FORMATS = Preprocessor.get_open_file_formats()
+        cls.DEFAULT_NAMESPACES = Preprocessor.getDefaultNamespaces()
+        # cls.VOCAB_NAMESPACES = Preprocessor.getLinkedVocabs()
+        cls.STANDARD_PROTOCOLS = Preprocessor.get_standard_protocols()
+        cls.SCHEMA_ORG_CONTEXT = Preprocessor.get_schema_org_context()
+        cls.VALID_RESOURCE_TYPES = Preprocessor.get_resource_types()
+        cls.IDENTIFIERS_ORG_DATA = Preprocessor.get_identifiers_org_data()
+        cls.LINKED_VOCAB_INDEX = Preprocessor.get_linked_vocab_index()
+        cls.ACCESS_RIGHTS = Preprocessor.get_access_rights()
         # TODO: change this
         # Preprocessor.set_mime_types()
 
@@ -373,6 +381,14 @@ class FAIRCheck:
         # ========= clean merged metadata, delete all entries which are None or ''
         self.retrieve_metadata_embedded()
         self.retrieve_metadata_external()
+        self.set_harvested_namespaces()
+
+    async def harvest_all_metadata_async(self):
+        await self.retrieve_metadata_embedded_async()
+        await self.retrieve_metadata_external_async()
+        self.set_harvested_namespaces()
+
+    def set_harvested_namespaces(self):
         self.logger.info(
             "FsF-F2-01M : Type of object described by the metadata -: {}".format(
                 self.metadata_merged.get("object_type")
@@ -387,12 +403,23 @@ class FAIRCheck:
             ]
             self.namespace_uri = list(set(self.namespace_uri))
 
+    def is_phase_skipped(self, phase, metric_id):
+        if self.deadline.expired():
+            self.logger.warning(f"{metric_id} : Assessment deadline exceeded, skipping -: {phase}")
+            if phase not in self.skipped_phases:
+                self.skipped_phases.append(phase)
+            return True
+        return False
+
     def harvest_re3_data(self):
+        if self.is_phase_skipped("re3data_harvesting", "FsF-R1.3-01M"):
+            return
         if self.use_datacite:
             client_id = self.metadata_merged.get("datacite_client")
             self.logger.info(f"FsF-R1.3-01M : re3data/datacite client id -: {client_id}")
             self.repo_helper = RepositoryHelper(client_id=client_id, logger=self.logger, landingpage=self.landing_url)
-            self.repo_helper.lookup_re3data()
+            with self.deadline.active():
+                self.repo_helper.lookup_re3data()
         else:
             self.client_id = None
             self.logger.warning(
@@ -402,16 +429,30 @@ class FAIRCheck:
             )
 
     def harvest_all_data(self):
+        if self.is_phase_skipped("data_harvesting", "FsF-F3-01M"):
+            return
         if self.metadata_merged.get("object_content_identifier"):
             data_links = self.metadata_merged.get("object_content_identifier")  # [: self.FILES_LIMIT]
-            data_harvester = DataHarvester(data_links, self.logger, self.landing_url, metrics=self.METRICS.keys())
+            data_harvester = DataHarvester(
+                data_links, self.logger, self.landing_url, metrics=self.METRICS.keys(), deadline=self.deadline
+            )
             data_harvester.retrieve_all_data()
             self.content_identifier = data_harvester.data
+            if data_harvester.deadline_exceeded and "data_harvesting_incomplete" not in self.skipped_phases:
+                # some data links have not been harvested within the phase deadline
+                self.skipped_phases.append("data_harvesting_incomplete")
 
     def harvest_github(self):
+        if self.is_phase_skipped("github_harvesting", "FRSM-15-R1.1"):
+            self.github_data = {}
+            return
         if self.use_github:
+            # PyGithub is only imported if GitHub harvesting is requested
+            from fuji_server.harvester.github_harvester import GithubHarvester
+
             github_harvester = GithubHarvester(self.id, self.logger)
-            github_harvester.harvest()
+            with self.deadline.active():
+                github_harvester.harvest()
             self.github_data = github_harvester.data
         else:
             self.github_data = {}
@@ -419,8 +460,28 @@ class FAIRCheck:
             for m in ["FRSM-15-R1.1"]:
                 self.logger.warning(f"{m} : Github support disabled, therefore skipping harvesting through Github API")
 
+    async def harvest_re3_data_async(self):
+        await asyncio.to_thread(self.harvest_re3_data)
+
+    async def harvest_all_data_async(self):
+        await asyncio.to_thread(self.harvest_all_data)
+
+    async def harvest_github_async(self):
+        await asyncio.to_thread(self.harvest_github)
+
     def retrieve_metadata_embedded(self):
-        self.metadata_harvester.retrieve_metadata_embedded()
+        if not self.is_phase_skipped("embedded_metadata_harvesting", "FsF-F2-01M"):
+            with self.deadline.active():
+                self.metadata_harvester.retrieve_metadata_embedded()
+        self.set_embedded_metadata()
+
+    async def retrieve_metadata_embedded_async(self):
+        if not self.is_phase_skipped("embedded_metadata_harvesting", "FsF-F2-01M"):
+            with self.deadline.active():
+                await self.metadata_harvester.retrieve_metadata_embedded_async()
+        self.set_embedded_metadata()
+
+    def set_embedded_metadata(self):
         # self.metadata_unmerged.extend(self.metadata_harvester.metadata_unmerged)
         # self.metadata_merged.update(self.metadata_harvester.metadata_merged)
         self.repeat_pid_check = self.metadata_harvester.repeat_pid_check
@@ -430,6 +491,7 @@ class FAIRCheck:
         self.related_resources.extend(self.metadata_harvester.related_resources)
         self.related_resources = list({v["related_resource"]: v for v in self.related_resources}.values())
         self.landing_url = self.metadata_harvester.landing_url
+        self.landing_validators = self.metadata_harvester.landing_validators
         self.landing_origin = self.metadata_harvester.landing_origin
         self.landing_domain = self.metadata_harvester.landing_domain
         self.origin_url = self.metadata_harvester.origin_url
@@ -439,7 +501,21 @@ class FAIRCheck:
         self.isLandingPageAccessible = self.metadata_harvester.isLandingPageAccessible
 
     def retrieve_metadata_external(self, target_url=None, repeat_mode=False):
-        self.metadata_harvester.retrieve_metadata_external(target_url, repeat_mode=repeat_mode)
+        if self.is_phase_skipped("external_metadata_harvesting", "FsF-F2-01M"):
+            return
+        with self.deadline.active():
+            self.metadata_harvester.retrieve_metadata_external(target_url, repeat_mode=repeat_mode)
+            self.set_external_metadata()
+
+    async def retrieve_metadata_external_async(self, target_url=None, repeat_mode=False):
+        if self.is_phase_skipped("external_metadata_harvesting", "FsF-F2-01M"):
+            return
+        with self.deadline.active():
+            await self.metadata_harvester.retrieve_metadata_external_async(target_url, repeat_mode=repeat_mode)
+            # resolving signposting cite-as PIDs may require further requests
+            await asyncio.to_thread(self.set_external_metadata)
+
+    def set_external_metadata(self):
         # self.metadata_unmerged.extend(self.metadata_harvester.metadata_unmerged)
         # self.metadata_merged.update(self.metadata_harvester.metadata_merged)
         self.repeat_pid_check = self.metadata_harvester.repeat_pid_check
@@ -627,6 +703,9 @@ class FAIRCheck:
         return logger_messages
 
     def get_assessment_summary(self, results):
+        # pandas is imported on first use, it would add several hundred milliseconds to the start-up
+        import pandas as pd
+
         status_dict = {"pass": 1, "fail": 0}
         summary_dict = {
             "fair_category": [],
@@ -717,6 +796,9 @@ class FAIRCheck:
         summary["status_passed"] = sf.groupby(by="fair_principle")["status"].sum().to_dict()
         summary["status_passed"].update(sf.groupby(by="fair_category")["status"].sum().to_dict())
         summary["status_passed"]["FAIR"] = int(sf["status"].sum())
+        if self.skipped_phases:
+            # phases which have not been run since the assessment deadline was exceeded
+            summary["skipped_phases"] = self.skipped_phases
         return summary
 
     def set_repository_uris(self):
@@ -2,9 +2,31 @@
 #
 # SPDX-License-Identifier: MIT
 
+import connexion
+
 from fuji_server.helper.metric_helper import MetricHelper
 
 
+def get_metric_response(metric_helper, response):
+    """Return the response with the ETag of the metric specification, 304 if the client has the current version
+
+    :param metric_helper: the metric helper of the requested version
+    :type metric_helper: MetricHelper
+    :param response: metric(s) of the specification
+
+    :rtype: tuple
+    """
+    if not response:
+        return response, 404
+    etag = metric_helper.get_etag()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    # weak comparison as required for If-None-Match
+    tags = [tag.strip().removeprefix("W/") for tag in connexion.request.headers.get("If-None-Match", "").split(",")]
+    if "*" in tags or etag in tags:
+        return "", 304, headers
+    return response, 200, headers
+
+
 def get_metrics(version):
     """Return all metrics and their definitions.
     :rtype: Metrics
@@ -12,10 +34,7 @@ def get_metrics(version):
     metric_version = version
     metric_helper = MetricHelper(metric_version)
     response = metric_helper.get_metrics()
-    if response:
-        return response, 200
-    else:
-        return response, 404
+    return get_metric_response(metric_helper, response)
 
 
 def get_metric(version, metric):
@@ -25,7 +44,4 @@ def get_metric(version, metric):
     metric_version = version
     metric_helper = MetricHelper(metric_version)
     response = metric_helper.get_metric(metric)
-    if response:
-        return response, 200
-    else:
-        return response, 404
+    return get_metric_response(metric_helper, response)
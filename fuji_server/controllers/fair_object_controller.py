@@ -2,13 +2,17 @@
 #
 # SPDX-License-Identifier: MIT
 
+import asyncio
 import datetime
+import json
 
 import connexion
 
+from fuji_server import encoder
 from fuji_server.controllers.fair_check import FAIRCheck
 from fuji_server.helper.identifier_helper import IdentifierHelper
 from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.result_store import AssessmentResultStore
 from fuji_server.helper.results_exporter import FAIRResultsMapper
 from fuji_server.models.fair_results import FAIRResults
 from fuji_server.models.harvest_results_metadata import HarvestResultsMetadata
@@ -47,10 +51,16 @@ async def assess_by_id(body):
         print("BODY METRIC", metric_version)
         auth_token = body.get("auth_token")
         auth_token_type = body.get("auth_token_type")
+        max_age = body.get("max_age")
         logger = Preprocessor.logger
-        # updating re3data
-        Preprocessor.retrieve_datacite_re3repos()
-
+        # a stored result is reused if it is not older than max_age and the landing page did not change
+        store_key = AssessmentResultStore.get_key(body)
+        if max_age is not None and store_key:
+            stored = await asyncio.to_thread(AssessmentResultStore.get_unchanged, store_key, max_age)
+            if stored is not None:
+                stored_result, age = stored
+                print("Reusing stored assessment result of age: ", age)
+                return get_result_response(FAIRResults(**stored_result), {"Age": str(age)})
         logger.info("Assessment target: " + identifier)
         print("Assessment target: ", identifier, flush=True)
         starttimestmp = datetime.datetime.now().replace(microsecond=0).isoformat() + "Z"
@@ -64,6 +74,8 @@ async def assess_by_id(body):
             oaipmh_endpoint=oaipmh_endpoint,
             metric_version=metric_version,
         )
+        # the deadline caps the timeouts of all requests of this assessment (the request task's context)
+        ft.deadline.activate()
         # dataset level authentication
         if auth_token:
             ft.set_auth_token(auth_token, auth_token_type)
@@ -80,14 +92,15 @@ async def assess_by_id(body):
                 ft.logger.removeHandler(ft.weblogger)
         print("F-UJI Version: ", ft.FUJI_VERSION)
         print("starting harvesting ")
-        ft.harvest_all_metadata()
+        # harvesting and network bound checks are awaited so the worker can serve other requests meanwhile
+        await ft.harvest_all_metadata_async()
         ft.set_harvested_metadata()
         if ft.repeat_pid_check:
-            ft.retrieve_metadata_external(ft.pid_url, repeat_mode=True)
+            await ft.retrieve_metadata_external_async(ft.pid_url, repeat_mode=True)
             ft.set_harvested_metadata()
             ft.clean_metadata()
-        ft.harvest_re3_data()
-        ft.harvest_github()
+        await ft.harvest_re3_data_async()
+        await ft.harvest_github_async()
         core_metadata_result = ft.check_minimal_metatadata()
         # print(ft.metadata_unmerged)
         # print('F-UJI checks: access level')
@@ -96,12 +109,12 @@ async def assess_by_id(body):
         license_result = ft.check_license()
         license_file_result = ft.check_license_file()
         # print('F-UJI checks: related')
-        related_resources_result = ft.check_relatedresources()
+        related_resources_result = await asyncio.to_thread(ft.check_relatedresources)
         # print('F-UJI checks: searchable')
-        check_searchable_result = ft.check_searchable()
+        check_searchable_result = await asyncio.to_thread(ft.check_searchable)
         # print('F-UJI checks: data content')
-        ft.harvest_all_data()
-        uid_result, pid_result = ft.check_unique_persistent_metadata_identifier()
+        await ft.harvest_all_data_async()
+        uid_result, pid_result = await asyncio.to_thread(ft.check_unique_persistent_metadata_identifier)
         # uid_data_result = ft.check_unique_content_identifier()
         # pid_data_result = ft.check_persistent_data_identifier()
         content_identifier_included_result = ft.check_data_identifier_included_in_metadata()
@@ -118,10 +131,10 @@ async def assess_by_id(body):
         requirements_result = ft.check_requirements()
         test_cases_result = ft.check_test_cases()
         # print('F-UJI checks: data file format')
-        community_standards_result = ft.check_community_metadatastandards()
+        community_standards_result = await asyncio.to_thread(ft.check_community_metadatastandards)
         data_provenance_result = ft.check_data_provenance()
         code_provenance_result = ft.check_code_provenance()
-        formal_metadata_result = ft.check_formal_metadata()
+        formal_metadata_result = await asyncio.to_thread(ft.check_formal_metadata)
         # print('F-UJI checks: semantic vocab')
         semantic_vocab_result = ft.check_semantic_vocabulary()
         metadata_preserved_result = ft.check_metadata_preservation()
@@ -250,19 +263,61 @@ async def assess_by_id(body):
             resolved_url=resolved_url,
             harvested_metadata=harvest_result,
         )
-        accept_header = connexion.request.headers.get("Accept")
-        print("ACCEPT HEADER ", accept_header)
-        # RDF
-        rdf_mimes = FAIRResultsMapper.allowed_serialisations
-        if connexion.request.headers.get("Accept") in rdf_mimes:
-            rdf_mapper = FAIRResultsMapper(final_response)
-            rdf = rdf_mapper.getQualityVocabularyRDF(connexion.request.headers.get("Accept"))
-            print("RDF")
-            return rdf, 200, {"content-type": connexion.request.headers.get("Accept")}
-        # Standard JSON
-        elif connexion.request.headers.get("Accept") in ["application/json", "*/*"]:
-            return final_response, 200, {"content-type": "application/json"}
-        else:
-            return "", 400, {"content-type": "application/json"}
+        if store_key:
+            # the SQLite write and eviction do not block the event loop
+            await asyncio.to_thread(store_result, store_key, ft, final_response)
+        return get_result_response(final_response)
+    else:
+        return "", 400, {"content-type": "application/json"}
+
+
+def store_result(store_key, ft, final_response):
+    """Store the assessment result for reuse unless it is incomplete
+
+    :param store_key: key of the assessment request, see AssessmentResultStore.get_key
+    :type store_key: str
+    :param ft: the finished assessment
+    :type ft: FAIRCheck
+    :param final_response: the assessment result
+    :type final_response: FAIRResults
+
+    :rtype: bool
+    """
+    if ft.skipped_phases:
+        # a result degraded by the assessment deadline must not be served to later requests
+        print("Assessment result not stored, skipped phases: ", ft.skipped_phases)
+        return False
+    AssessmentResultStore.store(
+        store_key,
+        ft.landing_url,
+        ft.landing_validators,
+        json.dumps(final_response, cls=encoder.CustomJSONEncoder),
+    )
+    return True
+
+
+def get_result_response(final_response, headers=None):
+    """Serialise the assessment result according to the Accept header of the request
+
+    :param final_response: the assessment result
+    :type final_response: FAIRResults
+    :param headers: additional response headers
+    :type headers: dict
+
+    :rtype: tuple
+    """
+    headers = headers or {}
+    accept_header = connexion.request.headers.get("Accept")
+    print("ACCEPT HEADER ", accept_header)
+    # RDF
+    rdf_mimes = FAIRResultsMapper.allowed_serialisations
+    if connexion.request.headers.get("Accept") in rdf_mimes:
+        rdf_mapper = FAIRResultsMapper(final_response)
+        rdf = rdf_mapper.getQualityVocabularyRDF(connexion.request.headers.get("Accept"))
+        print("RDF")
+        return rdf, 200, {"content-type": connexion.request.headers.get("Accept"), **headers}
+    # Standard JSON
+    elif connexion.request.headers.get("Accept") in ["application/json", "*/*"]:
+        return final_response, 200, {"content-type": "application/json", **headers}
     else:
         return "", 400, {"content-type": "application/json"}
@@ -0,0 +1,25 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+from fuji_server.helper.reference_data_refresher import ReferenceDataRefresher
+from fuji_server.helper.reference_data_reloader import ReferenceDataReloader
+
+
+def get_status():
+    """Return the age and staleness of the reference data.
+    :rtype: Status
+    """
+    return {
+        "reference_data": ReferenceDataRefresher.get_status(),
+        "reference_data_reload": ReferenceDataReloader.get_status(),
+    }, 200
+
+
+def reload_reference_data():
+    """Reload the reference data and metric specifications in the background.
+    :rtype: ReloadStatus
+    """
+    if ReferenceDataReloader.start():
+        return ReferenceDataReloader.get_status(), 202
+    return ReferenceDataReloader.get_status(), 409
@@ -8,6 +8,7 @@ from fuji_server.helper.catalogue_helper import MetaDataCatalogue
 from fuji_server.helper.catalogue_helper_datacite import MetaDataCatalogueDataCite
 from fuji_server.helper.catalogue_helper_google_datasearch import MetaDataCatalogueGoogleDataSearch
 from fuji_server.helper.catalogue_helper_mendeley_data import MetaDataCatalogueMendeleyData
+from fuji_server.helper.catalogue_lookup import CatalogueLookup
 from fuji_server.helper.identifier_helper import IdentifierHelper
 from fuji_server.helper.metadata_collector import MetadataSources
 from fuji_server.models.searchable import Searchable
@@ -192,35 +193,25 @@ class FAIREvaluatorSearchable(FAIREvaluator):
             if self.fuji.pid_url or self.fuji.landing_url:
                 # DataCite only for DOIs
                 pidhelper = IdentifierHelper(self.fuji.pid_url)
+                catalogue_queries = []
                 if self.fuji.pid_scheme:
                     if "doi" in self.fuji.pid_scheme:
-                        datacite_registry_helper = MetaDataCatalogueDataCite(self.fuji.logger)
-                        datacite_registry_helper.query(pidhelper.normalized_id)
-                        if datacite_registry_helper.islisted:
-                            registries_supported.append(datacite_registry_helper.source)
-                if not registries_supported:
-                    google_registry_helper = MetaDataCatalogueGoogleDataSearch(
-                        self.fuji.logger, self.fuji.metadata_merged.get("object_type")
-                    )
-                    google_registry_helper.query([pidhelper.normalized_id, self.fuji.landing_url])
-                    if google_registry_helper.islisted:
-                        registries_supported.append(google_registry_helper.source)
-                else:
-                    self.logger.info(
-                        self.metric_identifier
-                        + " : Dataset already found in registry therefore skipping Google Dataset Search Cache query"
-                    )
-
-                if not registries_supported:
-                    mendeley_registry_helper = MetaDataCatalogueMendeleyData(self.fuji.logger)
-                    mendeley_registry_helper.query([pidhelper.normalized_id, self.fuji.landing_url])
-                    if mendeley_registry_helper.islisted:
-                        registries_supported.append(mendeley_registry_helper.source)
-                else:
-                    self.logger.info(
-                        self.metric_identifier
-                        + " : Dataset already found in registry therefore skipping Mendeley Data query"
+                        catalogue_queries.append((MetaDataCatalogueDataCite(self.fuji.logger), pidhelper.normalized_id))
+                catalogue_queries.append(
+                    (
+                        MetaDataCatalogueGoogleDataSearch(
+                            self.fuji.logger, self.fuji.metadata_merged.get("object_type")
+                        ),
+                        [pidhelper.normalized_id, self.fuji.landing_url],
                     )
+                )
+                catalogue_queries.append(
+                    (MetaDataCatalogueMendeleyData(self.fuji.logger), [pidhelper.normalized_id, self.fuji.landing_url])
+                )
+                # the catalogues are queried concurrently, the first listing one in the above order is reported
+                listing_catalogues = CatalogueLookup.query_concurrently(catalogue_queries)
+                if listing_catalogues:
+                    registries_supported.append(listing_catalogues[0].source)
             else:
                 self.logger.warning(
                     self.metric_identifier
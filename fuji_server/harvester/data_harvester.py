@@ -5,32 +5,52 @@
 import io
 import os
 import re
-import ssl
-import threading
-import urllib
+import time
+from concurrent.futures import wait
 
+import requests
 from idutils import is_url
-from tika import parser
 
+from fuji_server.helper.deadline import AssessmentDeadline
+from fuji_server.helper.http_transport import HTTPTransport
 from fuji_server.helper.identifier_helper import IdentifierHelper
-from fuji_server.helper.request_helper import FUJIHTTPRedirectHandler
+from fuji_server.helper.preprocessor import Preprocessor
 
 
 class DataHarvester:
     LOG_SUCCESS = 25
     LOG_FAILURE = 35
+    # metrics which need the (truncated) data file content, all others only need status, headers and magic bytes
+    # the data content metric is FsF-R1-01MD up to metrics v0.7 and FsF-R1-01M since v0.8
+    CONTENT_METRICS = ["FsF-R1-01MD", "FsF-R1-01M"]
 
-    def __init__(self, data_links, logger, landing_page=None, auth_token=None, auth_token_type="Basic", metrics=None):
+    def __init__(
+        self,
+        data_links,
+        logger,
+        landing_page=None,
+        auth_token=None,
+        auth_token_type="Basic",
+        metrics=None,
+        deadline=None,
+    ):
         self.user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; F-UJI)"
         self.logger = logger
         self.data_links = data_links
         self.auth_token = auth_token
         self.auth_token_type = auth_token_type
         self.metrics = metrics
+        self.deadline = deadline if deadline else AssessmentDeadline()
         self.timeout = 10
+        self.harvest_timeout = Preprocessor.data_harvest_timeout  # deadline in seconds for the data harvesting phase
+        self.min_host_interval = 0.2  # politeness delay in seconds between data requests to the same host
         self.max_download_size = 1000000
+        self.probe_size = 4096
+        self.chunk_size = 65536
+        self.scan_content = True
         self.max_number_per_mime = 5
         self.data = {}
+        self.deadline_exceeded = False  # True if data links have been skipped since a deadline was exceeded
         self.landing_page = landing_page
         self.content_type = None
         self.delay_time = 3
@@ -78,7 +98,29 @@ class DataHarvester:
             print("Content site Byte parsing error: ", str(e))
         return size
 
-    def retrieve_all_data(self, scan_content=True):
+    def needs_content(self):
+        # without metric selection (e.g. harvest requests) content is always scanned
+        if self.metrics is None:
+            return True
+        return any(metric_id in self.metrics for metric_id in self.CONTENT_METRICS)
+
+    def retrieve_all_data(self, scan_content=None):
+        """Retrieve info about a sample of data files
+
+        Parameters
+        ----------
+        scan_content : bool, optional
+            If True the data file content is downloaded (up to max_download_size) and parsed using TIKA,
+            if False data files are only probed using a Range request for status, headers and magic bytes.
+            If None (default) content is only downloaded in case one of the selected metrics needs it
+        """
+        if scan_content is None:
+            scan_content = self.needs_content()
+        self.scan_content = scan_content
+        if not scan_content:
+            self.logger.info(
+                "FsF-R1-01MD : Data content analysis not required by selected metrics, probing data files only"
+            )
         # TODO: prioritise scientific files which can be opened by tika or other parsers for content analysis
         # choose sample of data_links which are accessible the smallest file per mime type (onbe per mime type)
         sorted_files = {}
@@ -113,7 +155,6 @@ class DataHarvester:
 
         # threaded download starts here
         for fmime, ft in sorted_files.items():
-            timeout = 10
             if len(ft) > self.max_number_per_mime:
                 self.logger.warning(
                     f"FsF-F3-01M : Found more than -: {self.max_number_per_mime!s} data links (out of {len(ft)!s}) of type {fmime} will only take {self.max_number_per_mime!s} for content analysis"
@@ -132,31 +173,55 @@ class DataHarvester:
                     urls_to_check[f.get("url")] = f
             # urls_to_check.extend([f.get('url') for f in ft[:self.max_number_per_mime]])
             # urls = [f.get('url') for f in ft[:self.max_number_per_mime]]
-        e = threading.Event()
-        if urls_to_check:
-            # urls_to_check =list(set([u for u in urls_to_check if u]))
-            threads = [
-                threading.Thread(target=self.get_url_data_and_info, args=(url, timeout))
-                for url in urls_to_check.values()
-            ]
-            for thread in threads:
-                thread.start()
-            for ti, thread in enumerate(threads):
-                if ti > 0:
-                    timeout = 1
-                thread.join(timeout)
-                if thread.is_alive():
-                    e.set()
-                thread.join()
-                # thread ends here
-                # print(self.data)
+        if urls_to_check and self.deadline.expired():
+            self.deadline_exceeded = True
+            self.logger.warning("FsF-F3-01M : Assessment deadline exceeded, skipping data harvesting")
+        elif urls_to_check:
+            # downloads run in the worker pool shared by all assessments, they wait in the queue of their host (not in
+            # a worker thread) for the per host limit and the politeness interval, see HTTPTransport.submit
+            # the phase deadline never exceeds the remaining budget of the assessment
+            harvest_timeout = self.deadline.get_timeout(self.harvest_timeout)
+            deadline = time.monotonic() + harvest_timeout
+            with self.deadline.active():
+                futures = [
+                    HTTPTransport.submit(
+                        urldict.get("url") if is_url(urldict.get("url")) else str(self.landing_page),
+                        self.min_host_interval,
+                        self.get_url_data_and_info,
+                        urldict,
+                        self.timeout,
+                        deadline,
+                    )
+                    for urldict in urls_to_check.values()
+                ]
+            done, not_done = wait(futures, timeout=harvest_timeout)
+            for future in not_done:
+                future.cancel()
+            # downloads still running after the deadline are aborted (see read_content) and dropped, their results
+            # must not change the data while the evaluators use it
+            data = {}
+            for urldict, future in zip(urls_to_check.values(), futures):
+                if future in done and future.exception() is None and future.result():
+                    data[urldict.get("url")] = future.result()
+            self.data = data
+            if not_done:
+                self.deadline_exceeded = True
+                self.logger.warning(
+                    f"FsF-F3-01M : Data harvesting deadline of {harvest_timeout:.0f} sec exceeded, skipped -: {len(not_done)!s} data links"
+                )
         return True
 
-    def get_url_data_and_info(self, urldict, timeout):
+    def get_url_data_and_info(self, urldict, timeout, deadline=None):
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            timeout = min(timeout, remaining)
         header = {"Accept": "*/*", "User-Agent": self.user_agent}
         if self.auth_token:
             header["Authorization"] = self.auth_token_type + " " + self.auth_token
-        # header["Range"] = "bytes=0-" + str(self.max_download_size)
+        if not self.scan_content:
+            header["Range"] = "bytes=0-" + str(self.probe_size - 1)
         url = urldict.get("url")
         if url:
             if not is_url(url):
@@ -165,51 +230,55 @@ class DataHarvester:
             response = None
             redirect_status_list = []
             try:
-                context = ssl._create_unverified_context()
-                context.set_ciphers("DEFAULT@SECLEVEL=0")
-                redirect_handler = FUJIHTTPRedirectHandler()
-                opener = urllib.request.build_opener(
-                    urllib.request.HTTPSHandler(context=context),
-                    urllib.request.HTTPHandler(),
-                    redirect_handler,
-                )
-                urllib.request.install_opener(opener)
-                request = urllib.request.Request(url, headers=header)
-                response = opener.open(request, timeout=10)
-                # redirect_list = redirect_handler.redirect_list
-                # redirect_status_list = redirect_handler.redirect_status_list
-                # redirect_url = redirect_handler.redirect_url
-                # request = urllib.request.Request(url, headers=header)
-                # response = urllib.request.urlopen(request, timeout=timeout)
-                self.responses[url] = response
-                redirect_status_list = redirect_handler.status_list
-            except urllib.error.HTTPError as e:
-                self.logger.warning(f"FsF-F3-01M : Content identifier inaccessible -: {url}, HTTPError code {e.code} ")
-                self.logger.warning(f"FsF-R1-01MD : Content identifier inaccessible -: {url}, HTTPError code {e.code} ")
-                self.logger.warning(
-                    f"FsF-R1.3-02D : Content identifier inaccessible -: {url}, HTTPError code {e.code} "
-                )
-                redirect_status_list = [int(e.code)]
-            except urllib.error.URLError as e:
-                self.logger.exception(e.reason)
-                self.logger.warning(
-                    f"FsF-F3-01M : Content identifier inaccessible -: {url}, URLError reason {e.reason} "
-                )
-                self.logger.warning(
-                    f"FsF-R1-01MD : Content identifier inaccessible -: {url}, URLError reason {e.reason} "
-                )
-                self.logger.warning(
-                    f"FsF-R1.3-02D : Content identifier inaccessible -: {url}, URLError reason {e.reason} "
-                )
-                redirect_status_list = redirect_handler.status_list
+                response = HTTPTransport.open(url, headers=header, timeout=timeout)
+                if header.get("Range") and response.status in [405, 416, 501]:
+                    # some servers reject range requests, fall back to a plain streamed GET
+                    response.close()
+                    del header["Range"]
+                    response = HTTPTransport.open(url, headers=header, timeout=timeout)
+                redirect_status_list = response.status_list
+                if response.status >= 400:
+                    code = response.status
+                    response.close()
+                    response = None
+                    self.logger.warning(
+                        f"FsF-F3-01M : Content identifier inaccessible -: {url}, HTTPError code {code} "
+                    )
+                    self.logger.warning(
+                        f"FsF-R1-01MD : Content identifier inaccessible -: {url}, HTTPError code {code} "
+                    )
+                    self.logger.warning(
+                        f"FsF-R1.3-02D : Content identifier inaccessible -: {url}, HTTPError code {code} "
+                    )
+                    redirect_status_list = [int(code)]
+                else:
+                    self.responses[url] = response
+            except requests.exceptions.ConnectionError as e:
+                self.logger.exception(e)
+                self.logger.warning(f"FsF-F3-01M : Content identifier inaccessible -: {url}, URLError reason {e} ")
+                self.logger.warning(f"FsF-R1-01MD : Content identifier inaccessible -: {url}, URLError reason {e} ")
+                self.logger.warning(f"FsF-R1.3-02D : Content identifier inaccessible -: {url}, URLError reason {e} ")
             except Exception as e:
                 self.logger.warning("FsF-F3-01M : Content identifier inaccessible -:" + url + " " + str(e))
                 self.logger.warning("FsF-R1-01MD : Content identifier inaccessible -:" + url + " " + str(e))
                 self.logger.warning("FsF-R1.3-02D : Content identifier inaccessible -:" + url + " " + str(e))
-                redirect_status_list = redirect_handler.status_list
-            self.set_data_info(urldict, response, redirect_status_list)
+            return self.set_data_info(urldict, response, redirect_status_list, deadline)
+
+    def read_content(self, response, size, deadline=None):
+        # reads up to size bytes in chunks, a download still running at the deadline is aborted
+        chunks = []
+        length = 0
+        while length < size:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError("data harvesting deadline exceeded")
+            chunk = response.read(min(self.chunk_size, size - length))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            length += len(chunk)
+        return b"".join(chunks)
 
-    def set_data_info(self, urldict, response, redirect_status_list=[]):
+    def set_data_info(self, urldict, response, redirect_status_list=[], deadline=None):
         fileinfo = {}
         if isinstance(urldict, dict):
             fileinfo = {
@@ -232,6 +301,9 @@ class DataHarvester:
             if response:
                 file_buffer_object = io.BytesIO()
                 rstatus = response.getcode()
+                if rstatus == 206:
+                    # partial content delivered for a probing range request
+                    rstatus = 200
                 fileinfo["status_code"] = rstatus
                 fileinfo["verified"] = False
                 if fileinfo.get("status_code") == 200:
@@ -255,18 +327,47 @@ class DataHarvester:
                     except:
                         fileinfo["header_content_size"] = self.max_download_size
                         pass
-                content = response.read(self.max_download_size)
+                if response.getcode() == 206:
+                    # Content-Length is the size of the range, the full size is given by Content-Range: bytes 0-N/size
+                    range_size = re.search(r"/\s*([0-9]+)\s*$", str(response.headers.get("content-range")))
+                    if range_size:
+                        fileinfo["header_content_size"] = int(range_size[1])
+                try:
+                    content = self.read_content(
+                        response, self.max_download_size if self.scan_content else self.probe_size, deadline
+                    )
+                finally:
+                    response.close()
                 file_buffer_object.write(content)
                 fileinfo["content_size"] = file_buffer_object.getbuffer().nbytes
                 if fileinfo.get("header_content_size"):
                     if fileinfo["content_size"] < fileinfo["header_content_size"]:
                         fileinfo["truncated"] = True
                 if fileinfo["content_size"] > 0:
-                    fileinfo.update(self.tika(file_buffer_object, urldict.get("url")))
+                    if self.scan_content:
+                        fileinfo.update(self.tika(file_buffer_object, urldict.get("url")))
+                    else:
+                        fileinfo.update(self.tika_detect(file_buffer_object, urldict.get("url")))
             else:
                 if len(fileinfo["status_list"]) > 0:
                     fileinfo["status_code"] = fileinfo["status_list"][-1]
-            self.data[urldict.get("url")] = fileinfo
+        return fileinfo
+
+    def tika_detect(self, file_buffer_object, url):
+        # detect the mime type from the magic bytes of a probed file prefix, no content is parsed
+        fileinfo = {"tika_content_type": [], "test_data_content_text": ""}
+        try:
+            from tika import detector
+
+            detected_type = detector.from_buffer(file_buffer_object.getvalue())
+            self.logger.info("{} : Successfully detected data object file type using TIKA".format("FsF-R1.3-02D"))
+        except Exception as e:
+            self.logger.warning("{} : File type detection using TIKA failed -: {}".format("FsF-R1.3-02D", e))
+            detected_type = str(self.content_type)
+        file_buffer_object.close()
+        fileinfo["tika_content_type"].append(str(detected_type).split(";")[0])
+        fileinfo["tika_content_type"] = self.extend_mime_type_list(fileinfo["tika_content_type"])
+        self.logger.info(f"FsF-R1.3-02D : Probed data file -: {url}")
         return fileinfo
 
     def tika(self, file_buffer_object, url):
@@ -276,6 +377,8 @@ class DataHarvester:
         status = None
         try:
             if len(file_buffer_object.getvalue()) > 0:
+                from tika import parser
+
                 parsedFile = parser.from_buffer(file_buffer_object.getvalue())
                 fileinfo["tika_status"] = status = parsedFile.get("status")
                 tika_content_types = parsedFile.get("metadata").get("Content-Type")
@@ -2,6 +2,7 @@
 #
 # SPDX-License-Identifier: MIT
 
+import json
 import os
 import re
 import time
@@ -12,9 +13,13 @@ from github import Auth, Github
 from github.GithubException import UnknownObjectException
 
 import yaml
+from fuji_server.helper.github_cache import GithubCache
+from fuji_server.helper.http_transport import HTTPTransport
 
 
 class GithubHarvester:
+    API_TIMEOUT = 30
+
     def __init__(self, id, logger, host="https://github.com", verbose=True):
         # Read Github API access token from config file.
         config = ConfigParser()
@@ -61,6 +66,7 @@ class GithubHarvester:
             token = config["ACCESS"]["token"]
             if token != "":
                 token_to_use = token
+        self.token = token_to_use
         if token_to_use is not None:  # found a token, one way or another
             auth = Auth.Token(token)
             if self.verbose:
@@ -74,11 +80,64 @@ class GithubHarvester:
                 "FRSM-09-A1 : Running in unauthenticated mode. Capabilities are limited."
             )  # TODO: would be better if it were a general warning!
         if self.host != "https://github.com":
-            base_url = f"{self.host}/api/v3"
-            self.handle = Github(auth=auth, base_url=base_url)
+            self.api_url = f"{self.host}/api/v3"
+            self.handle = Github(auth=auth, base_url=self.api_url)
         else:
+            self.api_url = "https://api.github.com"
             self.handle = Github(auth=auth)
 
+    def get_api_response(self, path, accept="application/vnd.github+json"):
+        """Conditional GET of a GitHub API path, cached responses are revalidated with their ETag. GitHub does not
+        count requests answered with 304 Not Modified against the rate limit.
+
+        Args:
+            path (str): API path, e.g. /repos/{owner}/{repo}
+            accept (str): media type to request
+
+        Returns:
+            str: response body or None if the request failed
+        """
+        url = self.api_url + path
+        cache_key = accept + " " + url
+        headers = {"Accept": accept}
+        if self.token:
+            headers["Authorization"] = "Bearer " + self.token
+        cached = GithubCache.get_response(cache_key)
+        if cached:
+            etag, last_modified, _body = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        response = HTTPTransport.get(url, headers=headers, timeout=self.API_TIMEOUT)
+        if response.status_code == 304 and cached:
+            return cached[2]
+        if response.status_code == 200:
+            GithubCache.set_response(
+                cache_key, response.headers.get("ETag"), response.headers.get("Last-Modified"), response.text
+            )
+            return response.text
+        return None
+
+    def get_head_sha(self):
+        """Returns the SHA of the latest commit of the default branch of the repository, which is used as key of the
+        cached harvesting results. Both requests are answered from the cache if the repository did not change.
+
+        Returns:
+            str: commit SHA or None if it could not be retrieved
+        """
+        try:
+            repo_info = self.get_api_response(f"/repos/{self.repo_id}")
+            if repo_info:
+                default_branch = json.loads(repo_info).get("default_branch")
+                if default_branch:
+                    return self.get_api_response(
+                        f"/repos/{self.repo_id}/commits/{default_branch}", accept="application/vnd.github.sha"
+                    )
+        except Exception as e:
+            print("GitHub commit SHA retrieval error", e)
+        return None
+
     def harvest(self):
         tic = time.perf_counter()
         # check if it's a URL or repo ID
@@ -89,6 +148,15 @@ class GithubHarvester:
             self.username, self.repo_name = self.id.split("/")
         self.repo_id = "/".join([self.username, self.repo_name])
 
+        # an unchanged repository (same commit) is not harvested again
+        head_sha = self.get_head_sha()
+        if head_sha:
+            cached_data = GithubCache.get_result(self.repo_id, head_sha)
+            if cached_data is not None:
+                self.data = cached_data
+                self.logger.info(f"FRSM-09-A1 : Reusing harvesting results of commit {head_sha} of the repository.")
+                return
+
         # access repo via GitHub API
         try:
             repo = self.handle.get_repo(self.repo_id)
@@ -131,6 +199,8 @@ class GithubHarvester:
                 self.data["source_code_samples"] = source_code_samples
 
         self.retrieve_all(repo)
+        if head_sha:
+            GithubCache.set_result(self.repo_id, head_sha, self.data)
         toc = time.perf_counter()
         if self.verbose:
             print(f"Harvesting took {toc - tic:.4f} seconds.")
@@ -2,6 +2,7 @@
 #
 # SPDX-License-Identifier: MIT
 
+import asyncio
 import copy
 import enum
 import hashlib
@@ -10,8 +11,10 @@ import json
 import logging
 import mimetypes
 import re
+import threading
 import urllib
 import warnings
+from concurrent.futures import ThreadPoolExecutor, wait
 from urllib.parse import urljoin, urlparse
 
 import extruct
@@ -23,6 +26,7 @@ from rapidfuzz import fuzz, process
 from tldextract import extract
 
 # from fuji_server.controllers.fair_check import ME
+from fuji_server.helper.deadline import AssessmentDeadline
 from fuji_server.helper.identifier_helper import IdentifierHelper
 from fuji_server.helper.metadata_collector import MetaDataCollector, MetadataOfferingMethods, MetadataSources
 from fuji_server.helper.metadata_collector_datacite import MetaDataCollectorDatacite
@@ -34,8 +38,11 @@ from fuji_server.helper.metadata_collector_ore_atom import MetaDataCollectorOreA
 from fuji_server.helper.metadata_collector_rdf import MetaDataCollectorRdf
 from fuji_server.helper.metadata_collector_xml import MetaDataCollectorXML
 from fuji_server.helper.metadata_mapper import Mapper
+from fuji_server.helper.parsed_artifact_cache import ParsedArtifactCache
 from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.redirect_chain_cache import RedirectChainCache
 from fuji_server.helper.request_helper import AcceptTypes, RequestHelper
+from fuji_server.helper.result_store import AssessmentResultStore
 
 warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
 
@@ -43,6 +50,9 @@ warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
 class MetadataHarvester:
     LOG_SUCCESS = 25
     LOG_FAILURE = 35
+    EXTRUCT_VERSION = ParsedArtifactCache.get_package_version("extruct")
+    PYRDFA_VERSION = ParsedArtifactCache.get_package_version("pyRdfa3")
+    max_concurrent_negotiations = 8
     signposting_relation_types = [
         "describedby",
         "item",
@@ -101,6 +111,8 @@ class MetadataHarvester:
             self.logger = logging.getLogger(self.test_id)
         self.auth_token = auth_token
         self.auth_token_type = auth_token_type
+        # keys of the content which has already been parsed as XML during this assessment (see RequestHelper)
+        self.checked_content_keys = set()
         self.landing_html = None
         self.landing_url = None
         self.landing_origin = None
@@ -110,6 +122,8 @@ class MetadataHarvester:
         self.landing_redirect_list = []  # urlsvisited during redirects
         self.landing_redirect_status_list = []  # list with stati
         self.landing_content_type = None
+        # ETag, Last-Modified and content digest of the landing page
+        self.landing_validators = None
         self.origin_url = None
         self.pid_url = None
         self.redirect_url = None  # usually the landing page url
@@ -745,7 +759,11 @@ class MetadataHarvester:
                 except Exception:
                     pass
 
-                extracted = extruct.extract(extruct_target, syntaxes=syntaxes, encoding="utf-8")
+                cache_key = ParsedArtifactCache.get_key(extruct_target, "extruct", self.EXTRUCT_VERSION, *syntaxes)
+                extracted = ParsedArtifactCache.get(cache_key)
+                if extracted is None:
+                    extracted = extruct.extract(extruct_target, syntaxes=syntaxes, encoding="utf-8")
+                    ParsedArtifactCache.set(cache_key, extracted)
 
             except Exception as e:
                 extracted = {}
@@ -794,6 +812,8 @@ class MetadataHarvester:
                 requestHelper.setAuthToken(self.auth_token, self.auth_token_type)
                 # requestHelper.setAcceptType(AcceptTypes.html_xml)  # request
                 requestHelper.setAcceptType(AcceptTypes.default)  # request
+                # the landing page is requested directly if the PID has been resolved by a previous assessment
+                requestHelper.setResolvedRedirectChain(RedirectChainCache.get(idhelper.get_resolution_key()))
                 _neg_source, _landingpage_html = requestHelper.content_negotiate(
                     self.logger_target.get("pid"), ignore_html=False
                 )
@@ -809,6 +829,9 @@ class MetadataHarvester:
                 if requestHelper.redirect_url and requestHelper.response_status in [200, 202, 203]:
                     self.isLandingPageAccessible = True
                     self.landing_url = requestHelper.redirect_url
+                    # a reused resolution is not stored again, it expires after the TTL of its first resolution
+                    if requestHelper.response_status == 200 and not requestHelper.isRedirectChainCached():
+                        RedirectChainCache.set(idhelper.get_resolution_key(), requestHelper.getRedirectChain())
                     if self.pid_url in self.pid_collector:
                         self.pid_collector[self.pid_url]["verified"] = True
                         self.pid_collector[self.pid_url]["resolved_url"] = self.landing_url
@@ -848,6 +871,9 @@ class MetadataHarvester:
                     self.landing_content_type = requestHelper.content_type
                     self.landing_redirect_list = requestHelper.redirect_list
                     self.landing_redirect_status_list = requestHelper.redirect_status_list
+                    self.landing_validators = AssessmentResultStore.get_validators(
+                        requestHelper.response_header, requestHelper.content_digest
+                    )
                 elif response_status in [401, 402, 403]:
                     self.logger.warning(
                         self.logger_target.get("pid")
@@ -1047,34 +1073,42 @@ class MetadataHarvester:
                             rdfa_html = self.landing_html
                             pass
                         rdfa_html = self.clean_html_language_tag(rdfa_html)
-                        rdfabuffer = io.StringIO(rdfa_html)
-                        # rdflib is no longer supporting RDFa: https://stackoverflow.com/questions/68500028/parsing-htmlrdfa-in-rdflib
-                        # https://github.com/RDFLib/rdflib/discussions/1582
-
-                        rdfa_graph = pyRdfa(media_type="text/html").graph_from_source(rdfabuffer)
-                        # rdfa_graph = rdflib.Graph().parse(data=rdfa_html, format='rdfa')
-                        # filter rdfagraph drop images
-                        clean_rdfa_graph = rdflib.Graph()
-                        img_triple_found = False
-                        image_suffix = [".jpg", ".jpeg", ".png", ".tif", ".gif", ".svg", ".png"]
-                        for s, o, p in list(rdfa_graph):
-                            if not any(x in s for x in image_suffix):
-                                clean_rdfa_graph.add((s, o, p))
-                            else:
-                                img_triple_found
-                        if img_triple_found:
-                            self.logger.info(
-                                self.logger_target.get("metadata_properties")
-                                + " : Ignoring RDFa triples indicating image links in HTML"
-                            )
-                        rdfa_graph = clean_rdfa_graph
                         rdfa_collector = MetaDataCollectorRdf(
                             loggerinst=self.logger, target_url=self.landing_url, source=rdfasource
                         )
-                        try:
-                            rdfa_dict = rdfa_collector.get_metadata_from_graph(rdfa_graph)
-                        except Exception as e:
-                            print("RDFa Graph error: ", e)
+                        rdfa_cache_key = rdfa_collector.get_parse_cache_key(
+                            rdfa_html, "rdfa", self.PYRDFA_VERSION, self.landing_url
+                        )
+                        cached_rdfa = rdfa_collector.get_cached_parse(rdfa_cache_key)
+                        if cached_rdfa is not None:
+                            rdfa_dict = cached_rdfa["metadata"]
+                        else:
+                            rdfabuffer = io.StringIO(rdfa_html)
+                            # rdflib is no longer supporting RDFa: https://stackoverflow.com/questions/68500028/parsing-htmlrdfa-in-rdflib
+                            # https://github.com/RDFLib/rdflib/discussions/1582
+
+                            rdfa_graph = pyRdfa(media_type="text/html").graph_from_source(rdfabuffer)
+                            # rdfa_graph = rdflib.Graph().parse(data=rdfa_html, format='rdfa')
+                            # filter rdfagraph drop images
+                            clean_rdfa_graph = rdflib.Graph()
+                            img_triple_found = False
+                            image_suffix = [".jpg", ".jpeg", ".png", ".tif", ".gif", ".svg", ".png"]
+                            for s, o, p in list(rdfa_graph):
+                                if not any(x in s for x in image_suffix):
+                                    clean_rdfa_graph.add((s, o, p))
+                                else:
+                                    img_triple_found
+                            if img_triple_found:
+                                self.logger.info(
+                                    self.logger_target.get("metadata_properties")
+                                    + " : Ignoring RDFa triples indicating image links in HTML"
+                                )
+                            rdfa_graph = clean_rdfa_graph
+                            try:
+                                rdfa_dict = rdfa_collector.get_metadata_from_graph(rdfa_graph)
+                                rdfa_collector.set_cached_parse(rdfa_cache_key, rdfa_dict)
+                            except Exception as e:
+                                print("RDFa Graph error: ", e)
                         if len(rdfa_dict) > 0:
                             # self.metadata_sources.append((rdfasource, 'embedded'))
                             self.add_metadata_source(rdfasource)
@@ -1245,56 +1279,62 @@ class MetadataHarvester:
             )
         self.check_pidtest_repeat()
 
+    def collect_metadata_external_rdf_negotiated(self, targeturl, xml_parsed_event=None):
+        source = MetadataSources.RDF_NEGOTIATED
+        self.logger.info(
+            self.logger_target.get("metadata_properties")
+            + " : Trying to retrieve RDF metadata through content negotiation from URL -: "
+            + str(targeturl)
+        )
+        neg_rdf_collector = MetaDataCollectorRdf(loggerinst=self.logger, target_url=targeturl, source=source)
+        neg_rdf_collector.set_auth_token(self.auth_token, self.auth_token_type)
+        neg_rdf_collector.xml_parsed_event = xml_parsed_event
+        neg_rdf_collector.checked_content_keys = self.checked_content_keys
+        source_rdf, rdf_dict = neg_rdf_collector.parse_metadata()
+        # in case F-UJi was redirected and the landing page content negotiation doesnt return anything try the origin URL
+        if not rdf_dict:
+            if self.origin_url is not None and self.origin_url != targeturl:
+                neg_rdf_collector.target_url = self.origin_url
+                source_rdf, rdf_dict = neg_rdf_collector.parse_metadata()
+        return neg_rdf_collector, source_rdf, rdf_dict
+
+    def merge_metadata_external_rdf_negotiated(self, targeturl, neg_rdf_collector, source_rdf, rdf_dict):
+        self.namespace_uri.extend(neg_rdf_collector.getNamespaces())
+        rdf_dict = self.exclude_null(rdf_dict)
+        if rdf_dict:
+            self.logger.log(
+                self.LOG_SUCCESS,
+                self.logger_target.get("metadata_properties")
+                + " : Found Linked Data metadata -: "
+                + str(rdf_dict.keys()),
+            )
+            # self.metadata_sources.append((source_rdf, 'negotiated'))
+            self.add_metadata_source(source_rdf)
+            self.merge_metadata(
+                rdf_dict,
+                targeturl,
+                source_rdf,
+                neg_rdf_collector.metadata_format,
+                neg_rdf_collector.getContentType(),
+                neg_rdf_collector.main_entity_format,
+                neg_rdf_collector.getNamespaces(),
+            )
+
+        else:
+            self.logger.info(self.logger_target.get("metadata_properties") + " : Linked Data metadata UNAVAILABLE")
+
     def retrieve_metadata_external_rdf_negotiated(self, target_url_list=[]):
         # ========= retrieve rdf metadata namespaces by content negotiation ========
         if self.is_harvesting_method_allowed(MetadataOfferingMethods.CONTENT_NEGOTIATION):
-            source = MetadataSources.RDF_NEGOTIATED
             # if self.pid_scheme == 'purl':
             #    targeturl = self.pid_url
             # else:
             #    targeturl = self.landing_url
             # print('TARGET URLS:',target_url_list)
-
             for targeturl in target_url_list:
-                self.logger.info(
-                    self.logger_target.get("metadata_properties")
-                    + " : Trying to retrieve RDF metadata through content negotiation from URL -: "
-                    + str(targeturl)
+                self.merge_metadata_external_rdf_negotiated(
+                    targeturl, *self.collect_metadata_external_rdf_negotiated(targeturl)
                 )
-                neg_rdf_collector = MetaDataCollectorRdf(loggerinst=self.logger, target_url=targeturl, source=source)
-                neg_rdf_collector.set_auth_token(self.auth_token, self.auth_token_type)
-                if neg_rdf_collector is not None:
-                    source_rdf, rdf_dict = neg_rdf_collector.parse_metadata()
-                    # in case F-UJi was redirected and the landing page content negotiation doesnt return anything try the origin URL
-                    if not rdf_dict:
-                        if self.origin_url is not None and self.origin_url != targeturl:
-                            neg_rdf_collector.target_url = self.origin_url
-                            source_rdf, rdf_dict = neg_rdf_collector.parse_metadata()
-                    self.namespace_uri.extend(neg_rdf_collector.getNamespaces())
-                    rdf_dict = self.exclude_null(rdf_dict)
-                    if rdf_dict:
-                        self.logger.log(
-                            self.LOG_SUCCESS,
-                            self.logger_target.get("metadata_properties")
-                            + " : Found Linked Data metadata -: "
-                            + str(rdf_dict.keys()),
-                        )
-                        # self.metadata_sources.append((source_rdf, 'negotiated'))
-                        self.add_metadata_source(source_rdf)
-                        self.merge_metadata(
-                            rdf_dict,
-                            targeturl,
-                            source_rdf,
-                            neg_rdf_collector.metadata_format,
-                            neg_rdf_collector.getContentType(),
-                            neg_rdf_collector.main_entity_format,
-                            neg_rdf_collector.getNamespaces(),
-                        )
-
-                    else:
-                        self.logger.info(
-                            self.logger_target.get("metadata_properties") + " : Linked Data metadata UNAVAILABLE"
-                        )
         else:
             self.logger.info(
                 self.logger_target.get("metadata_properties")
@@ -1302,48 +1342,58 @@ class MetadataHarvester:
                 + str(MetadataSources.RDF_NEGOTIATED.value.get("label"))
             )
 
+    def collect_metadata_external_schemaorg_negotiated(self, target_url):
+        # ========= retrieve json-ld/schema.org metadata namespaces by content negotiation ========
+        self.logger.info(
+            self.logger_target.get("metadata_properties")
+            + " : Trying to retrieve schema.org JSON-LD metadata through content negotiation from URL -: "
+            + str(target_url)
+        )
+        schemaorg_collector_negotiated = MetaDataCollectorRdf(
+            loggerinst=self.logger, target_url=target_url, source=MetadataSources.SCHEMAORG_NEGOTIATED
+        )
+        schemaorg_collector_negotiated.setAcceptType(AcceptTypes.jsonld)
+        source_schemaorg, schemaorg_dict = schemaorg_collector_negotiated.parse_metadata()
+        return schemaorg_collector_negotiated, source_schemaorg, schemaorg_dict
+
+    def merge_metadata_external_schemaorg_negotiated(
+        self, target_url, schemaorg_collector_negotiated, source_schemaorg, schemaorg_dict
+    ):
+        schemaorg_dict = self.exclude_null(schemaorg_dict)
+        if schemaorg_dict:
+            self.namespace_uri.extend(schemaorg_collector_negotiated.namespaces)
+            # self.metadata_sources.append((source_schemaorg, 'negotiated'))
+            self.add_metadata_source(source_schemaorg)
+
+            # add object type for future reference
+            self.merge_metadata(
+                schemaorg_dict,
+                target_url,
+                source_schemaorg,
+                schemaorg_collector_negotiated.metadata_format,
+                "application/ld+json",
+                "http://www.schema.org",
+                schemaorg_collector_negotiated.namespaces,
+            )
+
+            self.logger.log(
+                self.LOG_SUCCESS,
+                self.logger_target.get("metadata_properties")
+                + " : Found Schema.org metadata through content negotiation-: "
+                + str(schemaorg_dict.keys()),
+            )
+        else:
+            self.logger.info(
+                self.logger_target.get("metadata_properties")
+                + " : Schema.org metadata through content negotiation UNAVAILABLE"
+            )
+
     def retrieve_metadata_external_schemaorg_negotiated(self, target_url_list=[]):
         if self.is_harvesting_method_allowed(MetadataOfferingMethods.CONTENT_NEGOTIATION):
             for target_url in target_url_list:
-                # ========= retrieve json-ld/schema.org metadata namespaces by content negotiation ========
-                self.logger.info(
-                    self.logger_target.get("metadata_properties")
-                    + " : Trying to retrieve schema.org JSON-LD metadata through content negotiation from URL -: "
-                    + str(target_url)
-                )
-                schemaorg_collector_negotiated = MetaDataCollectorRdf(
-                    loggerinst=self.logger, target_url=target_url, source=MetadataSources.SCHEMAORG_NEGOTIATED
+                self.merge_metadata_external_schemaorg_negotiated(
+                    target_url, *self.collect_metadata_external_schemaorg_negotiated(target_url)
                 )
-                schemaorg_collector_negotiated.setAcceptType(AcceptTypes.jsonld)
-                source_schemaorg, schemaorg_dict = schemaorg_collector_negotiated.parse_metadata()
-                schemaorg_dict = self.exclude_null(schemaorg_dict)
-                if schemaorg_dict:
-                    self.namespace_uri.extend(schemaorg_collector_negotiated.namespaces)
-                    # self.metadata_sources.append((source_schemaorg, 'negotiated'))
-                    self.add_metadata_source(source_schemaorg)
-
-                    # add object type for future reference
-                    self.merge_metadata(
-                        schemaorg_dict,
-                        target_url,
-                        source_schemaorg,
-                        schemaorg_collector_negotiated.metadata_format,
-                        "application/ld+json",
-                        "http://www.schema.org",
-                        schemaorg_collector_negotiated.namespaces,
-                    )
-
-                    self.logger.log(
-                        self.LOG_SUCCESS,
-                        self.logger_target.get("metadata_properties")
-                        + " : Found Schema.org metadata through content negotiation-: "
-                        + str(schemaorg_dict.keys()),
-                    )
-                else:
-                    self.logger.info(
-                        self.logger_target.get("metadata_properties")
-                        + " : Schema.org metadata through content negotiation UNAVAILABLE"
-                    )
         else:
             self.logger.info(
                 self.logger_target.get("metadata_properties")
@@ -1351,59 +1401,70 @@ class MetadataHarvester:
                 + str(MetadataSources.SCHEMAORG_NEGOTIATED.value.get("label"))
             )
 
+    def collect_metadata_external_xml_negotiated(self, target_url):
+        self.logger.info(
+            self.logger_target.get("metadata_properties")
+            + " : Trying to retrieve XML metadata through content negotiation from URL -: "
+            + str(target_url)
+        )
+        negotiated_xml_collector = MetaDataCollectorXML(
+            loggerinst=self.logger,
+            target_url=target_url,
+            link_type=MetadataOfferingMethods.CONTENT_NEGOTIATION,
+        )
+        negotiated_xml_collector.set_auth_token(self.auth_token, self.auth_token_type)
+        negotiated_xml_collector.checked_content_keys = self.checked_content_keys
+        source_neg_xml, metadata_neg_dict = negotiated_xml_collector.parse_metadata()
+        return negotiated_xml_collector, source_neg_xml, metadata_neg_dict
+
+    def merge_metadata_external_xml_negotiated(
+        self, target_url, negotiated_xml_collector, source_neg_xml, metadata_neg_dict
+    ):
+        # print('### ',metadata_neg_dict)
+        neg_namespace = "unknown xml"
+        metadata_neg_dict = self.exclude_null(metadata_neg_dict)
+        if len(negotiated_xml_collector.getNamespaces()) > 0:
+            self.namespace_uri.extend(negotiated_xml_collector.getNamespaces())
+            neg_namespace = negotiated_xml_collector.getNamespaces()[0]
+        self.linked_namespace_uri.update(negotiated_xml_collector.getLinkedNamespaces())
+        # print('LINKED NS XML ',self.linked_namespace_uri)
+        if metadata_neg_dict:
+            # self.metadata_sources.append((source_neg_xml, 'negotiated'))
+            self.add_metadata_source(source_neg_xml)
+            self.merge_metadata(
+                metadata_neg_dict,
+                self.landing_url,
+                source_neg_xml,
+                negotiated_xml_collector.metadata_format,
+                negotiated_xml_collector.getContentType(),
+                neg_namespace,
+            )
+            ####
+            self.logger.log(
+                self.LOG_SUCCESS,
+                self.logger_target.get("metadata_properties")
+                + " : Found XML metadata through content negotiation-: "
+                + str(metadata_neg_dict.keys()),
+            )
+            self.namespace_uri.extend(negotiated_xml_collector.getNamespaces())
+        # also add found xml namespaces without recognized data
+        elif len(negotiated_xml_collector.getNamespaces()) > 0:
+            self.merge_metadata(
+                {},
+                self.landing_url,
+                source_neg_xml,
+                negotiated_xml_collector.metadata_format,
+                negotiated_xml_collector.getContentType(),
+                neg_namespace,
+            )
+
     def retrieve_metadata_external_xml_negotiated(self, target_url_list=[]):
         if self.is_harvesting_method_allowed(MetadataOfferingMethods.CONTENT_NEGOTIATION):
             # print('TARGET URLS:',target_url_list)
             for target_url in target_url_list:
-                self.logger.info(
-                    self.logger_target.get("metadata_properties")
-                    + " : Trying to retrieve XML metadata through content negotiation from URL -: "
-                    + str(target_url)
-                )
-                negotiated_xml_collector = MetaDataCollectorXML(
-                    loggerinst=self.logger,
-                    target_url=target_url,
-                    link_type=MetadataOfferingMethods.CONTENT_NEGOTIATION,
+                self.merge_metadata_external_xml_negotiated(
+                    target_url, *self.collect_metadata_external_xml_negotiated(target_url)
                 )
-                negotiated_xml_collector.set_auth_token(self.auth_token, self.auth_token_type)
-                source_neg_xml, metadata_neg_dict = negotiated_xml_collector.parse_metadata()
-                # print('### ',metadata_neg_dict)
-                neg_namespace = "unknown xml"
-                metadata_neg_dict = self.exclude_null(metadata_neg_dict)
-                if len(negotiated_xml_collector.getNamespaces()) > 0:
-                    self.namespace_uri.extend(negotiated_xml_collector.getNamespaces())
-                    neg_namespace = negotiated_xml_collector.getNamespaces()[0]
-                self.linked_namespace_uri.update(negotiated_xml_collector.getLinkedNamespaces())
-                # print('LINKED NS XML ',self.linked_namespace_uri)
-                if metadata_neg_dict:
-                    # self.metadata_sources.append((source_neg_xml, 'negotiated'))
-                    self.add_metadata_source(source_neg_xml)
-                    self.merge_metadata(
-                        metadata_neg_dict,
-                        self.landing_url,
-                        source_neg_xml,
-                        negotiated_xml_collector.metadata_format,
-                        negotiated_xml_collector.getContentType(),
-                        neg_namespace,
-                    )
-                    ####
-                    self.logger.log(
-                        self.LOG_SUCCESS,
-                        self.logger_target.get("metadata_properties")
-                        + " : Found XML metadata through content negotiation-: "
-                        + str(metadata_neg_dict.keys()),
-                    )
-                    self.namespace_uri.extend(negotiated_xml_collector.getNamespaces())
-                # also add found xml namespaces without recognized data
-                elif len(negotiated_xml_collector.getNamespaces()) > 0:
-                    self.merge_metadata(
-                        {},
-                        self.landing_url,
-                        source_neg_xml,
-                        negotiated_xml_collector.metadata_format,
-                        negotiated_xml_collector.getContentType(),
-                        neg_namespace,
-                    )
         else:
             self.logger.info(
                 self.logger_target.get("metadata_properties")
@@ -1455,49 +1516,63 @@ class MetadataHarvester:
                         "http://www.openarchives.org/ore/terms",
                     )
 
+    def get_datacite_target_url(self):
+        # in case use_datacite id false use the landing page URL for content negotiation, otherwise the pid url
+        if self.use_datacite is True and self.pid_url:
+            return self.pid_url
+        else:
+            return self.landing_url
+
+    def collect_metadata_external_datacite(self, datacite_target_url):
+        dcite_collector = MetaDataCollectorDatacite(
+            mapping=Mapper.DATACITE_JSON_MAPPING, loggerinst=self.logger, pid_url=datacite_target_url
+        )
+        source_dcitejsn, dcitejsn_dict = dcite_collector.parse_metadata()
+        return dcite_collector, source_dcitejsn, dcitejsn_dict
+
+    def merge_metadata_external_datacite(self, datacite_target_url, dcite_collector, source_dcitejsn, dcitejsn_dict):
+        dcitejsn_dict = self.exclude_null(dcitejsn_dict)
+        if dcitejsn_dict:
+            # self.metadata_sources.append((source_dcitejsn, 'negotiated'))
+            self.add_metadata_source(source_dcitejsn)
+            self.logger.log(
+                self.LOG_SUCCESS,
+                self.logger_target.get("metadata_properties")
+                + " : Found Datacite metadata -: "
+                + str(dcitejsn_dict.keys()),
+            )
+
+            self.namespace_uri.extend(dcite_collector.getNamespaces())
+
+            self.merge_metadata(
+                dcitejsn_dict,
+                datacite_target_url,
+                source_dcitejsn,
+                dcite_collector.metadata_format,
+                dcite_collector.getContentType(),
+                "http://datacite.org/schema",
+                dcite_collector.getNamespaces(),
+            )
+        else:
+            self.logger.info(self.logger_target.get("metadata_properties") + " : Datacite metadata UNAVAILABLE")
+
+    def log_missing_datacite_target_url(self):
+        self.logger.info(
+            self.logger_target.get("metadata_properties")
+            + " : No target URL (PID or landing page) given, therefore Datacite metadata (json) not requested."
+        )
+
     def retrieve_metadata_external_datacite(self):
         if self.is_harvesting_method_allowed(MetadataOfferingMethods.CONTENT_NEGOTIATION):
             # if self.pid_scheme:
             # ================= datacite by content negotiation ===========
-            # in case use_datacite id false use the landing page URL for content negotiation, otherwise the pid url
-            if self.use_datacite is True and self.pid_url:
-                datacite_target_url = self.pid_url
-            else:
-                datacite_target_url = self.landing_url
+            datacite_target_url = self.get_datacite_target_url()
             if datacite_target_url:
-                dcite_collector = MetaDataCollectorDatacite(
-                    mapping=Mapper.DATACITE_JSON_MAPPING, loggerinst=self.logger, pid_url=datacite_target_url
+                self.merge_metadata_external_datacite(
+                    datacite_target_url, *self.collect_metadata_external_datacite(datacite_target_url)
                 )
-                source_dcitejsn, dcitejsn_dict = dcite_collector.parse_metadata()
-                dcitejsn_dict = self.exclude_null(dcitejsn_dict)
-                if dcitejsn_dict:
-                    # self.metadata_sources.append((source_dcitejsn, 'negotiated'))
-                    self.add_metadata_source(source_dcitejsn)
-                    self.logger.log(
-                        self.LOG_SUCCESS,
-                        self.logger_target.get("metadata_properties")
-                        + " : Found Datacite metadata -: "
-                        + str(dcitejsn_dict.keys()),
-                    )
-
-                    self.namespace_uri.extend(dcite_collector.getNamespaces())
-
-                    self.merge_metadata(
-                        dcitejsn_dict,
-                        datacite_target_url,
-                        source_dcitejsn,
-                        dcite_collector.metadata_format,
-                        dcite_collector.getContentType(),
-                        "http://datacite.org/schema",
-                        dcite_collector.getNamespaces(),
-                    )
-                else:
-                    self.logger.info(self.logger_target.get("metadata_properties") + " : Datacite metadata UNAVAILABLE")
             else:
-                self.logger.info(
-                    self.logger_target.get("metadata_properties")
-                    + " : No target URL (PID or landing page) given, therefore Datacite metadata (json) not requested."
-                )
+                self.log_missing_datacite_target_url()
         else:
             self.logger.info(
                 self.logger_target.get("metadata_properties")
@@ -1505,6 +1580,53 @@ class MetadataHarvester:
                 + str(MetadataSources.DATACITE_JSON_NEGOTIATED.value.get("label"))
             )
 
+    def retrieve_metadata_external_negotiated(self, target_url_list=[]):
+        # content negotiation requests are independent of each other, therefore all of them are sent concurrently
+        # while the results are merged in the same order as by the sequential retrieve_metadata_external_* methods
+        if not self.is_harvesting_method_allowed(MetadataOfferingMethods.CONTENT_NEGOTIATION):
+            self.retrieve_metadata_external_xml_negotiated(target_url_list)
+            self.retrieve_metadata_external_schemaorg_negotiated(target_url_list)
+            self.retrieve_metadata_external_rdf_negotiated(target_url_list)
+            self.retrieve_metadata_external_datacite()
+            return
+        datacite_target_url = self.get_datacite_target_url()
+        # RDF collectors skip XML content which has already been parsed by a XML collector
+        xml_parsed_event = threading.Event()
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_negotiations) as executor:
+            xml_futures = [
+                AssessmentDeadline.run_in_context(executor, self.collect_metadata_external_xml_negotiated, target_url)
+                for target_url in target_url_list
+            ]
+            schemaorg_futures = [
+                AssessmentDeadline.run_in_context(
+                    executor, self.collect_metadata_external_schemaorg_negotiated, target_url
+                )
+                for target_url in target_url_list
+            ]
+            rdf_futures = [
+                AssessmentDeadline.run_in_context(
+                    executor, self.collect_metadata_external_rdf_negotiated, target_url, xml_parsed_event
+                )
+                for target_url in target_url_list
+            ]
+            datacite_future = None
+            if datacite_target_url:
+                datacite_future = AssessmentDeadline.run_in_context(
+                    executor, self.collect_metadata_external_datacite, datacite_target_url
+                )
+            wait(xml_futures)
+            xml_parsed_event.set()
+            for target_url, xml_future in zip(target_url_list, xml_futures):
+                self.merge_metadata_external_xml_negotiated(target_url, *xml_future.result())
+            for target_url, schemaorg_future in zip(target_url_list, schemaorg_futures):
+                self.merge_metadata_external_schemaorg_negotiated(target_url, *schemaorg_future.result())
+            for target_url, rdf_future in zip(target_url_list, rdf_futures):
+                self.merge_metadata_external_rdf_negotiated(target_url, *rdf_future.result())
+            if datacite_future:
+                self.merge_metadata_external_datacite(datacite_target_url, *datacite_future.result())
+            else:
+                self.log_missing_datacite_target_url()
+
     def get_connected_metadata_links(self):
         connected_metadata_links = []
         # get all links which lead to metadata are given by signposting, typed links, guessing or in html href
@@ -1581,6 +1703,7 @@ class MetadataHarvester:
                             pref_mime_type=metadata_link["type"],
                         )
                         if typed_rdf_collector is not None:
+                            typed_rdf_collector.checked_content_keys = self.checked_content_keys
                             source_rdf, rdf_dict = typed_rdf_collector.parse_metadata()
                             self.namespace_uri.extend(typed_rdf_collector.getNamespaces())
                             rdf_dict = self.exclude_null(rdf_dict)
@@ -1633,6 +1756,7 @@ class MetadataHarvester:
                             pref_mime_type=metadata_link.get("type"),
                         )
                         if linked_xml_collector is not None:
+                            linked_xml_collector.checked_content_keys = self.checked_content_keys
                             source_linked_xml, linked_xml_dict = linked_xml_collector.parse_metadata()
                             lkd_namespace = "unknown xml"
                             if linked_xml_collector.is_xml:
@@ -1716,11 +1840,9 @@ class MetadataHarvester:
                     else:
                         target_url_list = [target_url]
                 if target_url_list:
-                    target_url_list = set(tu.split("#")[0] for tu in target_url_list if tu is not None)
-                    self.retrieve_metadata_external_xml_negotiated(target_url_list)
-                    self.retrieve_metadata_external_schemaorg_negotiated(target_url_list)
-                    self.retrieve_metadata_external_rdf_negotiated(target_url_list)
-                    self.retrieve_metadata_external_datacite()
+                    # unique but ordered to merge results in a deterministic order
+                    target_url_list = list(dict.fromkeys(tu.split("#")[0] for tu in target_url_list if tu is not None))
+                    self.retrieve_metadata_external_negotiated(target_url_list)
                     if not repeat_mode:
                         self.retrieve_metadata_external_linked_metadata()
                         self.retrieve_metadata_external_oai_ore()
@@ -1733,6 +1855,12 @@ class MetadataHarvester:
                 + " : Skipped EXTERNAL metadata identification, no landing page URL or HTML content could be determined"
             )
 
+    async def retrieve_metadata_embedded_async(self):
+        await asyncio.to_thread(self.retrieve_metadata_embedded)
+
+    async def retrieve_metadata_external_async(self, target_url=None, repeat_mode=False):
+        await asyncio.to_thread(self.retrieve_metadata_external, target_url, repeat_mode)
+
     def get_preferred_links(self, linklist):
         # prefer links which look like the landing page url
         preferred_links = []
@@ -21,9 +21,15 @@ class MetaDataCatalogue:
         Class method to return Sources
     query(pid)
         Method to access the metadata catalog given a parameter of PID
+    query_batch(pids)
+        Method to look up the listing state of several PIDs, used by CatalogueLookup
+    get_cache_scope()
+        Method to return the part of the query settings the answers of query_batch depend on
     """
 
     apiURI = None
+    # maximum number of PIDs the catalogue can look up with a single query
+    batch_size = 1
 
     # Using enum class create enumerations of metadata catalogs
 
@@ -62,3 +68,28 @@ class MetaDataCatalogue:
         """
         response = None
         return response
+
+    def query_batch(self, pids):
+        """Method to look up the listing state of several PIDs
+        Parameters
+        ----------
+        pids:list
+            A list of PIDs, at most batch_size
+
+        Returns
+        -------
+        dict
+            PID -> True (listed), False (not listed) or None (unknown, e.g. catalogue not available)
+        """
+        return {pid: None for pid in pids}
+
+    def get_cache_scope(self):
+        """Method to return the part of the query settings (e.g. the object type) the answers of query_batch depend on,
+        answers of different scopes are cached separately by CatalogueLookup
+
+        Returns
+        -------
+        str
+            Scope of the answers or None if they only depend on the PID
+        """
+        return None
@@ -4,9 +4,9 @@
 
 import logging
 
-import requests
-
 from fuji_server.helper.catalogue_helper import MetaDataCatalogue
+from fuji_server.helper.catalogue_lookup import CatalogueLookup
+from fuji_server.helper.http_transport import HTTPTransport
 
 
 class MetaDataCatalogueDataCite(MetaDataCatalogue):
@@ -22,10 +22,13 @@ class MetaDataCatalogueDataCite(MetaDataCatalogue):
     -------
     query(pid)
         Method to check whether the metadata given by PID is listed in Datacite
+    query_batch(pids)
+        Method to look up several DOIs with a single DataCite API request
     """
 
     islisted = False
     apiURI = "https://api.datacite.org/dois"
+    batch_size = 100
 
     def __init__(self, logger: logging.Logger | None = None):
         """
@@ -50,17 +53,45 @@ class MetaDataCatalogueDataCite(MetaDataCatalogue):
             session response
         """
         response = None
+        self.islisted = bool(CatalogueLookup.lookup(self, [pid]).get(str(pid)))
+        return response
+
+    def query_batch(self, pids):
+        """Method to look up several DOIs with a single DataCite API request
+        Parameters
+        ----------
+        pids:list
+            A list of DOIs
+
+        Returns
+        -------
+        dict
+            DOI -> True (listed), False (not listed) or None (unknown)
+        """
+        listed = {pid: None for pid in pids}
         try:
-            res = requests.get(self.apiURI + "/" + pid, timeout=5)
-            self.logger.info("FsF-F4-01M : Querying DataCite API for -:" + str(pid))
-            if res.status_code == 200:
-                self.islisted = True
-                self.logger.info("FsF-F4-01M : Found identifier in DataCite catalogue -:" + str(pid))
-            elif res.status_code == 404:
-                self.logger.info("FsF-F4-01M : Identifier not listed in DataCite catalogue -:" + str(pid))
+            if len(pids) == 1:
+                pid = pids[0]
+                res = HTTPTransport.get(self.apiURI + "/" + pid, timeout=5)
+                self.logger.info("FsF-F4-01M : Querying DataCite API for -:" + str(pid))
+                if res.status_code == 200:
+                    listed[pid] = True
+                    self.logger.info("FsF-F4-01M : Found identifier in DataCite catalogue -:" + str(pid))
+                elif res.status_code == 404:
+                    listed[pid] = False
+                    self.logger.info("FsF-F4-01M : Identifier not listed in DataCite catalogue -:" + str(pid))
+                else:
+                    self.logger.error("FsF-F4-01M : DataCite API not available -:" + str(res.status_code))
             else:
-                self.logger.error("FsF-F4-01M : DataCite API not available -:" + str(res.status_code))
+                res = HTTPTransport.get(
+                    self.apiURI, params={"ids": ",".join(pids), "page[size]": len(pids)}, timeout=10
+                )
+                self.logger.info("FsF-F4-01M : Querying DataCite API for -:" + str(len(pids)) + " DOIs")
+                if res.status_code == 200:
+                    found = {str(record.get("id")).lower() for record in res.json().get("data", [])}
+                    listed = {pid: pid.lower() in found for pid in pids}
+                else:
+                    self.logger.error("FsF-F4-01M : DataCite API not available -:" + str(res.status_code))
         except Exception as e:
             self.logger.error("FsF-F4-01M : DataCite API not available or returns errors -:" + str(e))
-
-        return response
+        return listed
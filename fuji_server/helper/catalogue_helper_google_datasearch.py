@@ -9,11 +9,11 @@ import sqlite3 as sl
 from random import randint
 from time import sleep
 
-import pandas as pd
-import requests
 from bs4 import BeautifulSoup
 
 from fuji_server.helper.catalogue_helper import MetaDataCatalogue
+from fuji_server.helper.catalogue_lookup import CatalogueLookup
+from fuji_server.helper.http_transport import HTTPTransport
 from fuji_server.helper.preprocessor import Preprocessor
 
 
@@ -29,6 +29,10 @@ class MetaDataCatalogueGoogleDataSearch(MetaDataCatalogue):
     -------
     query(pid)
         Method to check whether the metadata given by PID is listed in Google Data Search
+    query_batch(pids)
+        Method to look up several PIDs in the Google Data Search cache DB with a single query
+    get_cache_scope()
+        Method to return whether PIDs not found in the cache DB are checked using the Google custom search API
     create_list(google_cache_file)
     create_cache_db(google_cache_file)
     random_sample(limit)
@@ -36,6 +40,9 @@ class MetaDataCatalogueGoogleDataSearch(MetaDataCatalogue):
     """
 
     # apiURI = 'https://api.datacite.org/dois'
+    # limited by the maximum number of SQLite host parameters
+    batch_size = 500
+
     def __init__(self, logger: logging.Logger | None = None, object_type=None):
         self.islisted = False
 
@@ -48,6 +55,8 @@ class MetaDataCatalogueGoogleDataSearch(MetaDataCatalogue):
         self.object_type = object_type
 
     def random_sample(self, limit):
+        import pandas as pd
+
         sample = []
         try:
             con = sl.connect(self.google_cache_db_path)
@@ -62,34 +71,10 @@ class MetaDataCatalogueGoogleDataSearch(MetaDataCatalogue):
         # print(sys.getsizeof(Preprocessor.google_data_dois))
         pidlist = [p for p in pidlist if p is not None]
         response = None
-        found_google_links = None
-        if not os.path.exists(self.google_cache_db_path):
-            self.logger.warning(
-                "FsF-F4-01M : Google Search Cache DB does not exist, see F-UJI installation instructions"
-            )
-        else:
-            try:
-                con = sl.connect(self.google_cache_db_path)
-                with con:
-                    dbquery = (
-                        "SELECT LOWER(uri) FROM google_links where uri IN("
-                        + ", ".join(f"'{str(pid).lower()}'" for pid in pidlist)
-                        + ")"
-                    )
-
-                    dbres = con.execute(dbquery)
-                    found_google_links = dbres.fetchall()
-            except Exception as e:
-                self.logger.warning("FsF-F4-01M : Google Search Cache DB Query Error: -:" + str(e))
-
+        listed = CatalogueLookup.lookup(self, pidlist)
+        found_google_links = [pid for pid, pid_listed in listed.items() if pid_listed]
         if found_google_links:
             self.islisted = True
-        elif self.google_custom_search_id and self.google_custom_search_api_key:
-            for url_to_test in pidlist:
-                found_at_google = self.query_google_custom_search(url_to_test, pidlist)
-                if found_at_google:
-                    self.islisted = True
-                    break
         # do this on your own risk..
         """else:
             for url_to_test in pidlist:
@@ -107,7 +92,63 @@ class MetaDataCatalogueGoogleDataSearch(MetaDataCatalogue):
 
         return response
 
+    def query_batch(self, pids):
+        """Method to look up several PIDs in the Google Data Search cache DB with a single query,
+        PIDs which are not found there are checked using the Google custom search API if configured
+
+        Parameters
+        ----------
+        pids:list
+            A list of PID
+
+        Returns
+        -------
+        dict
+            PID -> True (listed), False (not listed) or None (unknown)
+        """
+        listed = {pid: None for pid in pids}
+        if not os.path.exists(self.google_cache_db_path):
+            self.logger.warning(
+                "FsF-F4-01M : Google Search Cache DB does not exist, see F-UJI installation instructions"
+            )
+            return listed
+        try:
+            con = sl.connect(self.google_cache_db_path)
+            with con:
+                dbquery = "SELECT LOWER(uri) FROM google_links where uri IN(" + ", ".join("?" for _ in pids) + ")"
+                dbres = con.execute(dbquery, [str(pid).lower() for pid in pids])
+                found_google_links = {row[0] for row in dbres.fetchall()}
+            con.close()
+            listed = {pid: str(pid).lower() in found_google_links for pid in pids}
+        except Exception as e:
+            self.logger.warning("FsF-F4-01M : Google Search Cache DB Query Error: -:" + str(e))
+            return listed
+        if self.google_custom_search_id and self.google_custom_search_api_key:
+            for url_to_test in [pid for pid, pid_listed in listed.items() if not pid_listed]:
+                if self.query_google_custom_search(url_to_test, [url_to_test]):
+                    listed[url_to_test] = True
+        return listed
+
+    def get_cache_scope(self):
+        """Method to return whether PIDs not found in the cache DB are checked using the Google custom search API,
+        which is only done for datasets
+
+        Returns
+        -------
+        str
+            'custom_search' or None
+        """
+        if (
+            self.google_custom_search_id
+            and self.google_custom_search_api_key
+            and str(self.object_type).strip().lower() == "dataset"
+        ):
+            return "custom_search"
+        return None
+
     def create_cache_db(self, google_cache_file):
+        import pandas as pd
+
         gs = pd.read_csv(google_cache_file)
         # google_cache_db_path = os.path.join(Preprocessor.fuji_server_dir, 'data','google_cache.db')
         con = sl.connect(self.google_cache_db_path)
@@ -139,7 +180,7 @@ class MetaDataCatalogueGoogleDataSearch(MetaDataCatalogue):
         }
         found_url_in_google = False
         try:
-            response = requests.get(google, headers=headers, cookies={"CONSENT": "YES+1"})
+            response = HTTPTransport.get(google, headers=headers, cookies={"CONSENT": "YES+1"}, timeout=10)
             soup = BeautifulSoup(response.content, "html.parser")
             not_indexed = re.compile("did not match any documents")
             if soup(text=not_indexed):
@@ -167,7 +208,7 @@ class MetaDataCatalogueGoogleDataSearch(MetaDataCatalogue):
                         + "&key="
                         + self.google_custom_search_api_key
                     )
-                    res = requests.get(google_url)
+                    res = HTTPTransport.get(google_url, timeout=10)
                     if res:
                         try:
                             google_json = res.json()
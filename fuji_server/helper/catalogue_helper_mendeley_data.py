@@ -7,6 +7,8 @@ import logging
 import requests
 
 from fuji_server.helper.catalogue_helper import MetaDataCatalogue
+from fuji_server.helper.catalogue_lookup import CatalogueLookup
+from fuji_server.helper.http_transport import HTTPTransport
 
 
 class MetaDataCatalogueMendeleyData(MetaDataCatalogue):
@@ -22,6 +24,8 @@ class MetaDataCatalogueMendeleyData(MetaDataCatalogue):
     -------
     query(pidlist)
         Method to check whether the metadata given by PID is listed in Mendeley Data
+    query_batch(pids)
+        Method to look up the listing state of PIDs, one request per PID
     """
 
     islisted = False
@@ -29,6 +33,7 @@ class MetaDataCatalogueMendeleyData(MetaDataCatalogue):
 
     def __init__(self, logger: logging.Logger | None = None):
         self.logger = logger
+        self.islisted = False
         self.source = self.getEnumSourceNames().MENDELEY_DATA.value
 
     def query(self, pidlist):
@@ -44,32 +49,41 @@ class MetaDataCatalogueMendeleyData(MetaDataCatalogue):
             session response
         """
         response = None
-        for pid in pidlist:
-            try:
-                if pid:
-                    res = requests.get(self.apiURI + "/" + requests.utils.quote(str(pid)), timeout=1)
-                    self.logger.info("FsF-F4-01M : Querying Mendeley Data API for -:" + str(pid))
-                    if res.status_code == 200:
-                        resp = res.json()
-                        if resp.get("results"):
-                            for result in resp.get("results"):
-                                if (
-                                    str(pid).lower() == str(result.get("doi")).lower()
-                                    or str(pid).lower() == str(result.get("containerURI")).lower()
-                                ):
-                                    self.islisted = True
-                                    self.logger.info(
-                                        "FsF-F4-01M : Found identifier in Mendeley Data catalogue -:" + str(pid)
-                                    )
-                                    break
-                            if not self.islisted:
-                                self.logger.info(
-                                    "FsF-F4-01M : Identifier not listed in Mendeley Data catalogue -:" + str(pid)
-                                )
+        listed = CatalogueLookup.lookup(self, pidlist)
+        self.islisted = any(listed.values())
+        return response
+
+    def query_batch(self, pids):
+        """Method to look up the listing state of PIDs, the Mendeley Data API is queried once per PID
+        Parameters
+        ----------
+        pids:list
+            A list of PID
 
-                    else:
-                        self.logger.error("FsF-F4-01M : Mendeley Data API not available -:" + str(res.status_code))
+        Returns
+        -------
+        dict
+            PID -> True (listed), False (not listed) or None (unknown)
+        """
+        listed = {pid: None for pid in pids}
+        for pid in pids:
+            try:
+                res = HTTPTransport.get(self.apiURI + "/" + requests.utils.quote(str(pid)), timeout=1)
+                self.logger.info("FsF-F4-01M : Querying Mendeley Data API for -:" + str(pid))
+                if res.status_code == 200:
+                    listed[pid] = False
+                    for result in res.json().get("results") or []:
+                        if (
+                            str(pid).lower() == str(result.get("doi")).lower()
+                            or str(pid).lower() == str(result.get("containerURI")).lower()
+                        ):
+                            listed[pid] = True
+                            self.logger.info("FsF-F4-01M : Found identifier in Mendeley Data catalogue -:" + str(pid))
+                            break
+                    if not listed[pid]:
+                        self.logger.info("FsF-F4-01M : Identifier not listed in Mendeley Data catalogue -:" + str(pid))
+                else:
+                    self.logger.error("FsF-F4-01M : Mendeley Data API not available -:" + str(res.status_code))
             except Exception as e:
                 self.logger.error("FsF-F4-01M : Mendeley Data API not available or returns errors: " + str(e))
-
-        return response
+        return listed
@@ -0,0 +1,134 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import wait
+
+from fuji_server.helper.deadline import AssessmentDeadline, DeadlineExceededError
+from fuji_server.helper.http_transport import HTTPTransport
+
+
+class CatalogueLookup:
+    """
+    Process wide cache of catalogue listing states shared by all assessments and the lookup layer of the
+    MetaDataCatalogue classes. Listed (positive) and not listed (negative) answers are cached with separate TTLs,
+    unknown answers (catalogue not available) are not cached. Answers are keyed by the catalogue source, its cache
+    scope (e.g. Google Dataset Search answers with and without the custom search fallback) and the PID. Cache misses
+    are sent to the catalogue in batches of its batch_size, several catalogues are queried concurrently
+
+    ...
+
+    Attributes
+    ----------
+    positive_ttl : int
+        Number of seconds a 'listed' answer is reused
+    negative_ttl : int
+        Number of seconds a 'not listed' answer is reused
+    max_entries : int
+        Maximum number of cached answers, the least recently stored ones are dropped first
+    timeout : int
+        Maximum number of seconds to wait for concurrently queried catalogues
+
+    Methods
+    -------
+    configure(positive_ttl, negative_ttl, max_entries)
+        Sets the cache parameters
+    lookup(catalogue, pids)
+        Returns the listing state of the PIDs in a catalogue, querying only uncached PIDs in batches
+    query_concurrently(queries)
+        Runs the query() methods of several catalogues concurrently
+    prefetch(catalogues, pids)
+        Bulk lookup of many PIDs in several catalogues, e.g. to prepare batch assessments
+    """
+
+    positive_ttl = 604800
+    negative_ttl = 86400
+    max_entries = 100000
+    timeout = 30
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, positive_ttl=None, negative_ttl=None, max_entries=None):
+        if positive_ttl is not None:
+            cls.positive_ttl = int(positive_ttl)
+        if negative_ttl is not None:
+            cls.negative_ttl = int(negative_ttl)
+        if max_entries is not None:
+            cls.max_entries = int(max_entries)
+
+    @classmethod
+    def get_key(cls, catalogue, pid):
+        return catalogue.source, catalogue.get_cache_scope(), str(pid).strip().lower()
+
+    @classmethod
+    def get(cls, catalogue, pid):
+        key = cls.get_key(catalogue, pid)
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                return None
+            expires, listed = entry
+            if expires < time.monotonic():
+                del cls._entries[key]
+                return None
+            return listed
+
+    @classmethod
+    def set(cls, catalogue, pid, listed):
+        if listed is None:
+            return
+        ttl = cls.positive_ttl if listed else cls.negative_ttl
+        key = cls.get_key(catalogue, pid)
+        with cls._lock:
+            cls._entries[key] = (time.monotonic() + ttl, bool(listed))
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > cls.max_entries:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def lookup(cls, catalogue, pids):
+        # returns a dict pid -> True (listed), False (not listed) or None (unknown)
+        pids = list(dict.fromkeys(str(pid) for pid in pids if pid))
+        listed = {pid: cls.get(catalogue, pid) for pid in pids}
+        missing = [pid for pid, state in listed.items() if state is None]
+        batch_size = max(int(catalogue.batch_size), 1)
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start : start + batch_size]
+            answers = catalogue.query_batch(batch)
+            for pid in batch:
+                listed[pid] = answers.get(pid)
+                cls.set(catalogue, pid, listed[pid])
+        return listed
+
+    @classmethod
+    def query_concurrently(cls, queries):
+        # queries is a list of (catalogue, query argument) tuples, the results are set in the catalogues' islisted
+        executor = HTTPTransport.get_executor()
+        futures = [AssessmentDeadline.run_in_context(executor, catalogue.query, arg) for catalogue, arg in queries]
+        try:
+            timeout = AssessmentDeadline.get_current_timeout(cls.timeout)
+        except DeadlineExceededError:
+            timeout = 0
+        not_done = wait(futures, timeout=timeout).not_done
+        for future in not_done:
+            future.cancel()
+        return [catalogue for catalogue, _arg in queries if catalogue.islisted]
+
+    @classmethod
+    def prefetch(cls, catalogues, pids):
+        # returns a dict catalogue source -> dict pid -> listing state, the answers are cached for later assessments
+        executor = HTTPTransport.get_executor()
+        futures = {
+            catalogue.source: AssessmentDeadline.run_in_context(executor, cls.lookup, catalogue, pids)
+            for catalogue in catalogues
+        }
+        return {source: future.result() for source, future in futures.items()}
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._entries = OrderedDict()
@@ -0,0 +1,216 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import copy
+import hashlib
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from fuji_server.helper.sqlite_store import SQLiteStore
+
+
+def get_content_key(*parts):
+    # stable fingerprint, unlike hash() it is the same in all processes
+    return hashlib.sha256("\n".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def get_entry_size(entry):
+    # raw content plus, if it differs, the parsed response; parsed JSON is measured by its pickled size as the
+    # entries of the ParsedArtifactCache, the objects in memory are larger
+    content = entry.get("response_content")
+    size = get_value_size(content)
+    parsed = entry.get("parse_response")
+    if parsed is not None and parsed is not content:
+        size += get_value_size(parsed)
+    return size
+
+
+def get_value_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except (pickle.PickleError, TypeError, AttributeError, RecursionError):
+        return sys.getsizeof(value)
+
+
+class LRUContentCache:
+    """
+    In-process least recently used cache of checked content, bounded by the total size of the cached content
+
+    ...
+
+    Attributes
+    ----------
+    max_bytes : int
+        Maximum total size of all entries
+    ttl : int
+        Number of seconds an entry is reused
+    size : int
+        Current total size of all entries
+    """
+
+    def __init__(self, max_bytes=100000000, ttl=600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, size, entry = item
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.size -= size
+                return None
+            self._entries.move_to_end(key)
+        # parsed JSON may be modified by collectors, so each reader gets its own copy
+        if isinstance(entry.get("parse_response"), (dict, list)):
+            entry = dict(entry, parse_response=copy.deepcopy(entry["parse_response"]))
+        return entry
+
+    def set(self, key, entry):
+        # an entry stored meanwhile by a concurrent request is kept
+        size = get_entry_size(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, size, entry)
+            self.size += size
+            while self.size > self.max_bytes:
+                _key, (_expires, evicted_size, _entry) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            self.size = 0
+
+
+class SQLiteContentCache:
+    """
+    Checked content cache stored in a SQLite file which can be shared by all worker processes of a host,
+    a local stand-in for a network key value store. Entries are pickled, the least recently stored ones are
+    evicted once the total size exceeds max_bytes
+
+    ...
+
+    Attributes
+    ----------
+    path : str
+        Path of the SQLite database file
+    max_bytes : int
+        Maximum total size of all pickled entries
+    ttl : int
+        Number of seconds an entry is reused
+    """
+
+    def __init__(self, path, max_bytes=1000000000, ttl=600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._store = SQLiteStore(
+            "Content cache",
+            ["CREATE TABLE IF NOT EXISTS content (key TEXT PRIMARY KEY, entry BLOB, size INTEGER, expires REAL)"],
+        )
+        self._store.configure(path)
+        # running total of the entry sizes, recounted on eviction since other processes share the database
+        self._total_size = 0
+
+    def get(self, key):
+        try:
+            row = self._store.execute(
+                "SELECT entry FROM content WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+            return pickle.loads(row[0]) if row else None
+        except (sqlite3.Error, pickle.PickleError) as e:
+            self._store.print_error(e)
+            return None
+
+    def set(self, key, entry):
+        try:
+            data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+            if len(data) > self.max_bytes:
+                return
+            with self._store.lock:
+                cursor = self._store.execute(
+                    "INSERT OR IGNORE INTO content VALUES (?, ?, ?, ?)", (key, data, len(data), time.time() + self.ttl)
+                )
+                self._total_size += len(data) if cursor.rowcount > 0 else 0
+                if self._store.is_eviction_due() or self._total_size > self.max_bytes:
+                    self.evict()
+        except (sqlite3.Error, pickle.PickleError) as e:
+            self._store.print_error(e)
+
+    def evict(self):
+        with self._store.lock:
+            self._store.execute("DELETE FROM content WHERE expires <= ?", (time.time(),))
+            total_size = self._store.execute("SELECT COALESCE(SUM(size), 0) FROM content").fetchone()[0]
+            if total_size > self.max_bytes:
+                for key, size in self._store.execute("SELECT key, size FROM content ORDER BY expires").fetchall():
+                    self._store.execute("DELETE FROM content WHERE key = ?", (key,))
+                    total_size -= size
+                    if total_size <= self.max_bytes:
+                        break
+            self._total_size = total_size
+
+    def clear(self):
+        with self._store.lock:
+            self._store.execute("DELETE FROM content")
+            self._total_size = 0
+
+
+class TieredContentCache:
+    """
+    Two tier checked content cache: a fast in-process LRU in front of an optional shared tier (e.g. a
+    SQLiteContentCache) which is filled on writes and promotes its hits to the local tier
+
+    ...
+
+    Methods
+    -------
+    get(key)
+        Returns the cached entry or None
+    set(key, entry)
+        Stores an entry in both tiers
+    """
+
+    def __init__(self, local=None, shared=None):
+        self.local = local if local is not None else LRUContentCache()
+        self.shared = shared
+
+    def get(self, key):
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self.local.set(key, entry)
+                # the promoted entry is handed out as a copy like any local hit
+                entry = self.local.get(key) or entry
+        return entry
+
+    def set(self, key, entry):
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(key, entry)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
@@ -0,0 +1,99 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import contextlib
+import contextvars
+import time
+
+import requests
+
+
+class DeadlineExceededError(requests.exceptions.Timeout):
+    """Raised instead of sending a request once the time budget of the assessment is used up"""
+
+
+class AssessmentDeadline:
+    """
+    Time budget of a single assessment. The deadline is passed to the harvesters and activated for the
+    assessment phases; while it is active every outbound request of HTTPTransport gets at most the remaining
+    budget as timeout and no request is sent after the deadline. Worker threads inherit the active deadline
+    when their task is submitted with run_in_context()
+
+    ...
+
+    Attributes
+    ----------
+    budget : float
+        Total number of seconds available for the assessment, None for unlimited
+    expires_at : float
+        time.monotonic() value at which the budget is used up or None
+
+    Methods
+    -------
+    remaining()
+        Returns the remaining number of seconds or None if unlimited
+    expired()
+        Returns True if the budget is used up
+    get_timeout(timeout)
+        Returns the given timeout capped by the remaining budget
+    activate()
+        Makes the deadline the active one of the current context
+    active()
+        Context manager activating the deadline for a block
+    get_current_timeout(timeout)
+        Returns the given timeout capped by the active deadline of the current context
+    run_in_context(executor, fn, *args)
+        Submits fn to an executor so that it runs with the deadline active in the current context
+    """
+
+    _current = contextvars.ContextVar("fuji_assessment_deadline", default=None)
+
+    def __init__(self, budget=None):
+        self.budget = float(budget) if budget else None
+        self.expires_at = time.monotonic() + self.budget if self.budget else None
+
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0)
+
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def get_timeout(self, timeout=None):
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if remaining <= 0:
+            raise DeadlineExceededError(f"Assessment deadline of {self.budget!s} sec exceeded")
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+    def activate(self):
+        return self._current.set(self)
+
+    @contextlib.contextmanager
+    def active(self):
+        token = self.activate()
+        try:
+            yield self
+        finally:
+            self._current.reset(token)
+
+    @classmethod
+    def get_current(cls):
+        return cls._current.get()
+
+    @classmethod
+    def get_current_timeout(cls, timeout=None):
+        deadline = cls.get_current()
+        if deadline is None:
+            return timeout
+        return deadline.get_timeout(timeout)
+
+    @staticmethod
+    def run_in_context(executor, fn, *args):
+        # each task needs its own copy of the context since a context can not be entered by two threads
+        return executor.submit(contextvars.copy_context().run, fn, *args)
@@ -0,0 +1,115 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import sqlite3
+import threading
+
+from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.sqlite_store import SQLiteStore
+
+
+class DOIPrefixIndex:
+    """
+    Process wide index of DOI prefixes and their registration agencies (DataCite, Crossref etc.). The index is seeded
+    from the shipped doi_prefixes.tsv and from the agencies learned by earlier lookups, which are stored in a SQLite
+    file shared by all worker processes. Only unknown prefixes are looked up at the resolver, concurrent lookups of
+    the same prefix are coalesced into one request
+
+    ...
+
+    Attributes
+    ----------
+    timeout : int
+        Maximum number of seconds to wait for the lookup of a prefix started by another thread
+
+    Methods
+    -------
+    configure(path)
+        Sets the database file of learned prefixes
+    get_agency(prefix, resolver)
+        Returns the registration agency of a prefix, unknown prefixes are looked up by calling resolver(prefix)
+    learn(prefix, agency)
+        Adds a prefix to the index and the database file
+    """
+
+    timeout = 30
+    _index = None
+    _pending = {}
+    _store = SQLiteStore(
+        "DOI prefix index", ["CREATE TABLE IF NOT EXISTS prefixes (prefix TEXT PRIMARY KEY, agency TEXT)"]
+    )
+    _lock = threading.RLock()
+
+    @classmethod
+    def configure(cls, path=None, timeout=None):
+        with cls._lock:
+            if timeout is not None:
+                cls.timeout = int(timeout)
+            cls._store.configure(path)
+            cls._index = None
+
+    @classmethod
+    def get_learned(cls, prefix=None):
+        # returns a dict prefix -> agency of the learned prefixes (or of the given prefix only)
+        try:
+            if prefix is None:
+                cursor = cls._store.execute("SELECT prefix, agency FROM prefixes")
+            else:
+                cursor = cls._store.execute("SELECT prefix, agency FROM prefixes WHERE prefix = ?", (prefix,))
+            return dict(cursor.fetchall()) if cursor is not None else {}
+        except sqlite3.Error as e:
+            cls._store.print_error(e)
+            return {}
+
+    @classmethod
+    def get_index(cls):
+        with cls._lock:
+            if cls._index is None:
+                index = dict(Preprocessor.get_doi_prefixes())
+                index.update(cls.get_learned())
+                cls._index = index
+            return cls._index
+
+    @classmethod
+    def learn(cls, prefix, agency):
+        if not prefix or not agency:
+            return
+        with cls._lock:
+            cls.get_index()[prefix] = agency
+            try:
+                cls._store.execute("INSERT OR REPLACE INTO prefixes VALUES (?, ?)", (prefix, agency))
+            except sqlite3.Error as e:
+                cls._store.print_error(e)
+
+    @classmethod
+    def get_agency(cls, prefix, resolver=None):
+        prefix = str(prefix or "").strip().lower()
+        if not prefix.startswith("10."):
+            return None
+        with cls._lock:
+            agency = cls.get_index().get(prefix)
+            if agency or resolver is None:
+                return agency
+            lookup = cls._pending.get(prefix)
+            is_leader = lookup is None
+            if is_leader:
+                lookup = cls._pending[prefix] = threading.Event()
+        if not is_leader:
+            lookup.wait(cls.timeout)
+            return cls.get_index().get(prefix)
+        try:
+            # another worker process may have learned the prefix meanwhile
+            agency = cls.get_learned(prefix).get(prefix) or resolver(prefix)
+            cls.learn(prefix, agency)
+            return agency
+        finally:
+            with cls._lock:
+                del cls._pending[prefix]
+            lookup.set()
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._index = None
+            cls._pending = {}
@@ -0,0 +1,129 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import pickle
+import sqlite3
+import time
+
+from fuji_server.helper.sqlite_store import SQLiteStore
+
+
+class GithubCache:
+    """
+    Persistent cache of GitHub API responses and GitHub harvesting results shared by all worker processes.
+    Responses are stored with their ETag and Last-Modified validators so that they can be revalidated with
+    conditional requests, which GitHub does not count against the rate limit if answered with 304 Not Modified.
+    Harvesting results are keyed by repository and commit SHA. Without a configured file an in-memory database of
+    the process is used
+
+    ...
+
+    Attributes
+    ----------
+    max_age : int
+        Number of seconds after which unused responses and results are evicted
+
+    Methods
+    -------
+    configure(path, max_age)
+        Sets the database file and the maximum age of the entries
+    get_response(url)
+        Returns the cached (etag, last_modified, body) of a URL or None
+    set_response(url, etag, last_modified, body)
+        Stores a response
+    get_result(repo_id, sha)
+        Returns the cached harvesting result of a repository at a commit or None
+    set_result(repo_id, sha, result)
+        Stores a harvesting result
+    evict()
+        Removes responses and results which have not been used for max_age seconds
+    """
+
+    max_age = 2592000
+    _store = SQLiteStore(
+        "GitHub cache",
+        [
+            "CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, "
+            "used REAL)",
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result BLOB, used REAL)",
+        ],
+        in_memory=True,
+    )
+
+    @classmethod
+    def configure(cls, path=None, max_age=None):
+        if max_age is not None:
+            cls.max_age = int(max_age)
+        cls._store.configure(path)
+
+    @classmethod
+    def get_result_key(cls, repo_id, sha):
+        return str(repo_id).lower() + "@" + str(sha)
+
+    @classmethod
+    def get_response(cls, url):
+        try:
+            with cls._store.lock:
+                row = cls._store.execute(
+                    "SELECT etag, last_modified, body FROM responses WHERE url = ?", (url,)
+                ).fetchone()
+                if row:
+                    cls._store.execute("UPDATE responses SET used = ? WHERE url = ?", (time.time(), url))
+            return row
+        except sqlite3.Error as e:
+            cls._store.print_error(e)
+            return None
+
+    @classmethod
+    def set_response(cls, url, etag, last_modified, body):
+        if not etag and not last_modified:
+            return
+        try:
+            with cls._store.lock:
+                cls._store.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (url, etag, last_modified, body, time.time()),
+                )
+                if cls._store.is_eviction_due():
+                    cls.evict()
+        except sqlite3.Error as e:
+            cls._store.print_error(e)
+
+    @classmethod
+    def get_result(cls, repo_id, sha):
+        key = cls.get_result_key(repo_id, sha)
+        try:
+            with cls._store.lock:
+                row = cls._store.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+                if row:
+                    cls._store.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+            return pickle.loads(row[0]) if row else None
+        except (sqlite3.Error, pickle.UnpicklingError) as e:
+            cls._store.print_error(e)
+            return None
+
+    @classmethod
+    def set_result(cls, repo_id, sha, result):
+        try:
+            with cls._store.lock:
+                cls._store.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                    (cls.get_result_key(repo_id, sha), pickle.dumps(result), time.time()),
+                )
+                if cls._store.is_eviction_due():
+                    cls.evict()
+        except (sqlite3.Error, pickle.PicklingError) as e:
+            cls._store.print_error(e)
+
+    @classmethod
+    def evict(cls):
+        with cls._store.lock:
+            cls._store.execute("DELETE FROM responses WHERE used < ?", (time.time() - cls.max_age,))
+            cls._store.execute("DELETE FROM results WHERE used < ?", (time.time() - cls.max_age,))
+
+    @classmethod
+    def clear(cls):
+        with cls._store.lock:
+            cls._store.execute("DELETE FROM responses")
+            cls._store.execute("DELETE FROM results")
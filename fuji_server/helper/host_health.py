@@ -0,0 +1,126 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+
+class HostUnavailableError(requests.exceptions.ConnectionError):
+    """Raised without sending a request if the circuit breaker of a host is open"""
+
+
+class HostHealthRegistry:
+    """
+    Process wide registry of host health shared by all assessments. Connection level failures
+    (DNS failures, refused or reset connections, connect timeouts) are counted per host, once failure_threshold
+    consecutive failures occurred the circuit breaker of the host opens and requests fail fast during cooldown
+    seconds. Afterwards a single trial request is let through, its success closes the circuit again. A trial whose
+    outcome is never recorded (e.g. a request cut short by the assessment deadline) expires after trial_timeout seconds
+
+    ...
+
+    Attributes
+    ----------
+    cooldown : int
+        Number of seconds during which requests to a failing host are refused
+    failure_threshold : int
+        Number of consecutive failures opening the circuit, DNS failures open it immediately
+    trial_timeout : int
+        Number of seconds after which another trial request is let through if the outcome of the previous one has
+        not been recorded
+
+    Methods
+    -------
+    configure(cooldown, failure_threshold)
+        Sets the circuit breaker parameters
+    check(url)
+        Raises a HostUnavailableError if the circuit of the URL's host is open
+    record_success(url)
+        Marks the host as healthy
+    record_failure(url, error)
+        Counts a connection failure of the host and opens the circuit if necessary
+    record_unknown(url)
+        Ends a trial request of the host whose outcome tells nothing about the host, the circuit stays open
+    """
+
+    cooldown = 60
+    failure_threshold = 2
+    trial_timeout = 60
+    _hosts = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, cooldown=None, failure_threshold=None):
+        if cooldown is not None:
+            cls.cooldown = int(cooldown)
+        if failure_threshold is not None:
+            cls.failure_threshold = max(int(failure_threshold), 1)
+
+    @classmethod
+    def get_host(cls, url):
+        return urlparse(url).netloc.lower()
+
+    @classmethod
+    def is_dns_failure(cls, error):
+        error = str(error)
+        return "NameResolutionError" in error or "[Errno -2]" in error or "[Errno -3]" in error
+
+    @classmethod
+    def check(cls, url):
+        host = cls.get_host(url)
+        with cls._lock:
+            state = cls._hosts.get(host)
+            if state is None or state["open_until"] is None:
+                return
+            now = time.monotonic()
+            if now < state["open_until"] or (state["trial"] is not None and now < state["trial"] + cls.trial_timeout):
+                raise HostUnavailableError(f"Host {host} unavailable (circuit open) after error: {state['error']}")
+            # cool-down is over (or the previous trial got lost), let a single trial request through
+            state["trial"] = now
+
+    @classmethod
+    def record_success(cls, url):
+        host = cls.get_host(url)
+        with cls._lock:
+            cls._hosts.pop(host, None)
+
+    @classmethod
+    def record_failure(cls, url, error):
+        host = cls.get_host(url)
+        with cls._lock:
+            # trial is the time.monotonic() start of the running trial request or None
+            state = cls._hosts.setdefault(host, {"failures": 0, "open_until": None, "trial": None, "error": None})
+            state["failures"] += 1
+            state["error"] = str(error)
+            if state["trial"] is not None or state["failures"] >= cls.failure_threshold or cls.is_dns_failure(error):
+                state["open_until"] = time.monotonic() + cls.cooldown
+                state["trial"] = None
+
+    @classmethod
+    def record_unknown(cls, url):
+        host = cls.get_host(url)
+        with cls._lock:
+            state = cls._hosts.get(host)
+            if state is not None and state["trial"] is not None:
+                # the host is tried again after another cool-down
+                state["open_until"] = time.monotonic() + cls.cooldown
+                state["trial"] = None
+
+    @classmethod
+    def get_unavailable_hosts(cls):
+        now = time.monotonic()
+        with cls._lock:
+            return [
+                host
+                for host, state in cls._hosts.items()
+                if state["open_until"] is not None and now < state["open_until"]
+            ]
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._hosts = {}
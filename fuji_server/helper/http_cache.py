@@ -0,0 +1,312 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import email.utils
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import time
+
+from requests.structures import CaseInsensitiveDict
+
+from fuji_server.helper.http_transport import HTTPTransport, TransportResponse
+from fuji_server.helper.sqlite_store import SQLiteStore
+
+
+class CachedResponse(TransportResponse):
+    """TransportResponse served from the persistent HTTP cache"""
+
+    def __init__(self, url, status, headers, body, redirects):
+        self.response = None
+        self.status = status
+        self.code = status
+        self.headers = CaseInsensitiveDict(headers)
+        self.url = url
+        self.redirect_url = redirects.get("redirect_url")
+        self.redirect_list = redirects.get("redirect_list", [])
+        self.redirect_status_list = [tuple(r) for r in redirects.get("redirect_status_list", [])]
+        self.status_list = redirects.get("status_list", [])
+        self.body = io.BytesIO(body)
+        self._message = None
+
+    def read(self, amt=None):
+        return self.body.read(amt)
+
+    def close(self):
+        self.body.close()
+
+
+class CachingResponse:
+    """Wraps a TransportResponse and stores its body in the HTTP cache once it has been read completely"""
+
+    def __init__(self, tp_response, key):
+        self.tp_response = tp_response
+        self.key = key
+        self.chunks = []
+        self.size = 0
+        self.complete = False
+
+    def __getattr__(self, name):
+        return getattr(self.tp_response, name)
+
+    def read(self, amt=None):
+        data = self.tp_response.read(amt)
+        if not data or amt is None:
+            self.complete = True
+        if self.size + len(data) > HTTPCache.max_entry_size:
+            self.chunks = None
+        if self.chunks is not None:
+            self.chunks.append(data)
+            self.size += len(data)
+        return data
+
+    def close(self):
+        self.tp_response.close()
+        if self.complete and self.chunks is not None:
+            HTTPCache.store(self.key, self.tp_response, b"".join(self.chunks))
+            self.chunks = None
+
+
+class HTTPCache:
+    """
+    Persistent on disk (SQLite) cache of HTTP responses which is shared by all assessments.
+    Freshness is determined by Cache-Control, Expires and Last-Modified headers, stale entries are revalidated
+    using ETag (If-None-Match) and Last-Modified (If-Modified-Since)
+
+    ...
+
+    Attributes
+    ----------
+    max_size : int
+        Maximum total size of all cached bodies in bytes, least recently used entries are evicted first
+    max_age : int
+        Maximum age of cached entries in seconds, older entries are evicted
+    default_ttl : int
+        Maximum heuristic freshness lifetime in seconds of responses which only have a Last-Modified header,
+        responses without any freshness information are stored but revalidated on every use
+    max_entry_size : int
+        Maximum body size of a single cached response in bytes
+
+    Methods
+    -------
+    configure(path, max_size, max_age, default_ttl)
+        Enables the cache using the given database file
+    get_key(url, headers)
+        Returns the cache key for a request or None if the request may not be cached
+    lookup(key)
+        Returns a cached entry as dict or None
+    open(url, headers, timeout, bypass)
+        Returns a fresh or revalidated CachedResponse or a CachingResponse wrapping a new TransportResponse
+    store(key, tp_response, body)
+        Stores a completely read response
+    evict()
+        Removes expired entries and shrinks the cache to max_size
+    """
+
+    max_size = 500000000
+    max_age = 604800
+    default_ttl = 3600
+    max_entry_size = 10000000
+    _store = SQLiteStore(
+        "HTTP cache",
+        [
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT, "
+            "redirects TEXT, body BLOB, size INTEGER, etag TEXT, last_modified TEXT, stored REAL, expires REAL, "
+            "accessed REAL)",
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)",
+        ],
+    )
+    # running total of the cached body sizes, recounted on eviction since other processes share the database
+    _total_size = 0
+
+    @classmethod
+    def configure(cls, path, max_size=None, max_age=None, default_ttl=None):
+        with cls._store.lock:
+            if max_size is not None:
+                cls.max_size = int(max_size)
+            if max_age is not None:
+                cls.max_age = int(max_age)
+            if default_ttl is not None:
+                cls.default_ttl = int(default_ttl)
+            cls._store.configure(path)
+            cls._total_size = 0
+            if cls.is_enabled():
+                try:
+                    cls.evict()
+                except sqlite3.Error as e:
+                    cls._store.print_error(e)
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._store.is_enabled()
+
+    @classmethod
+    def get_key(cls, url, headers):
+        # responses to authenticated requests are private and never cached
+        headers = CaseInsensitiveDict(headers or {})
+        if not cls.is_enabled() or headers.get("Authorization"):
+            return None
+        return hashlib.sha256((str(url) + "\n" + str(headers.get("Accept"))).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get_expiry(cls, headers, now=None):
+        # returns the time until which a response is fresh or None if it may not be stored
+        if now is None:
+            now = time.time()
+        headers = CaseInsensitiveDict(headers)
+        directives = {}
+        for directive in str(headers.get("Cache-Control", "")).lower().split(","):
+            name, _, value = directive.strip().partition("=")
+            if name:
+                directives[name] = value.strip('" ')
+        if "no-store" in directives or "private" in directives or headers.get("Vary", "").strip() == "*":
+            return None
+        if "no-cache" in directives:
+            return now
+        try:
+            age = int(headers.get("Age", 0))
+        except ValueError:
+            age = 0
+        for name in ["s-maxage", "max-age"]:
+            if re.match(r"^[0-9]+$", directives.get(name, "")):
+                return now + int(directives[name]) - age
+        try:
+            if headers.get("Expires"):
+                expires = email.utils.parsedate_to_datetime(headers.get("Expires")).timestamp()
+                if headers.get("Date"):
+                    expires = now + expires - email.utils.parsedate_to_datetime(headers.get("Date")).timestamp()
+                return expires
+        except (TypeError, ValueError):
+            # invalid dates like "0" or "-1" mean already expired
+            return now
+        try:
+            if headers.get("Last-Modified"):
+                # heuristic freshness: 10% of the time since the last modification
+                last_modified = email.utils.parsedate_to_datetime(headers.get("Last-Modified")).timestamp()
+                return now + min(max(now - last_modified, 0) / 10, cls.default_ttl)
+        except (TypeError, ValueError):
+            pass
+        # no freshness information: stored, but revalidated before every use
+        return now
+
+    @classmethod
+    def lookup(cls, key):
+        if key is None or not cls.is_enabled():
+            return None
+        try:
+            with cls._store.lock:
+                row = cls._store.execute(
+                    "SELECT url, status, headers, redirects, body, etag, last_modified, expires FROM responses "
+                    "WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is None:
+                    return None
+                cls._store.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            cls._store.print_error(e)
+            return None
+        return dict(
+            zip(["url", "status", "headers", "redirects", "body", "etag", "last_modified", "expires"], row, strict=True)
+        )
+
+    @classmethod
+    def get_response(cls, entry):
+        return CachedResponse(
+            entry["url"], entry["status"], json.loads(entry["headers"]), entry["body"], json.loads(entry["redirects"])
+        )
+
+    @classmethod
+    def open(cls, url, headers=None, timeout=10, bypass=False):
+        key = None if bypass else cls.get_key(url, headers)
+        entry = cls.lookup(key)
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry["expires"] > time.time():
+                return cls.get_response(entry)
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        tp_response = HTTPTransport.open(url, headers=headers, timeout=timeout)
+        if entry is not None and tp_response.status == 304:
+            tp_response.close()
+            cls.refresh(key, entry, tp_response.headers)
+            return cls.get_response(entry)
+        if key is not None and tp_response.status == 200 and cls.get_expiry(tp_response.headers) is not None:
+            return CachingResponse(tp_response, key)
+        return tp_response
+
+    @classmethod
+    def refresh(cls, key, entry, headers):
+        # a 304 response updates the freshness of the cached entry
+        cached_headers = CaseInsensitiveDict(json.loads(entry["headers"]))
+        for name in ["Cache-Control", "Expires", "Date", "ETag", "Last-Modified", "Age"]:
+            if headers.get(name):
+                cached_headers[name] = headers.get(name)
+        expires = cls.get_expiry(cached_headers)
+        try:
+            if expires is None:
+                cls._store.execute("DELETE FROM responses WHERE key = ?", (key,))
+            else:
+                entry["headers"] = json.dumps(dict(cached_headers))
+                cls._store.execute(
+                    "UPDATE responses SET headers = ?, expires = ?, stored = ? WHERE key = ?",
+                    (entry["headers"], expires, time.time(), key),
+                )
+        except sqlite3.Error as e:
+            cls._store.print_error(e)
+
+    @classmethod
+    def store(cls, key, tp_response, body):
+        expires = cls.get_expiry(tp_response.headers)
+        if expires is None or not cls.is_enabled():
+            return
+        redirects = {
+            "redirect_url": tp_response.redirect_url,
+            "redirect_list": tp_response.redirect_list,
+            "redirect_status_list": tp_response.redirect_status_list,
+            "status_list": tp_response.status_list,
+        }
+        now = time.time()
+        try:
+            with cls._store.lock:
+                previous = cls._store.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                cls._store.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        tp_response.url,
+                        tp_response.status,
+                        json.dumps(dict(tp_response.headers)),
+                        json.dumps(redirects),
+                        body,
+                        len(body),
+                        tp_response.headers.get("ETag"),
+                        tp_response.headers.get("Last-Modified"),
+                        now,
+                        expires,
+                        now,
+                    ),
+                )
+                cls._total_size += len(body) - (previous[0] if previous else 0)
+                if cls._store.is_eviction_due() or cls._total_size > cls.max_size:
+                    cls.evict()
+        except sqlite3.Error as e:
+            cls._store.print_error(e)
+
+    @classmethod
+    def evict(cls):
+        with cls._store.lock:
+            cls._store.execute("DELETE FROM responses WHERE stored < ?", (time.time() - cls.max_age,))
+            total_size = cls._store.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total_size > cls.max_size:
+                for key, size in cls._store.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+                    cls._store.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    total_size -= size
+                    if total_size <= cls.max_size:
+                        break
+            cls._total_size = total_size
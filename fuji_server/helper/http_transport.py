@@ -0,0 +1,329 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import contextlib
+import contextvars
+import http.client
+import ssl
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from fuji_server.helper.deadline import AssessmentDeadline
+from fuji_server.helper.host_health import HostHealthRegistry
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+class FUJIHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter using the permissive TLS context F-UJI applies to harvested (not API) hosts"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = HTTPTransport.get_unverified_ssl_context()
+        return super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, *args, **kwargs):
+        kwargs["ssl_context"] = HTTPTransport.get_unverified_ssl_context()
+        return super().proxy_manager_for(*args, **kwargs)
+
+
+class TransportResponse:
+    """
+    Wraps a streamed requests.Response and exposes the subset of the urllib response interface
+    (info(), getheaders(), geturl(), status, read()) as well as the redirect information
+    formerly collected by the urllib redirect handler
+
+    ...
+
+    Attributes
+    ----------
+    status : int
+        HTTP status code of the final response
+    headers : requests.structures.CaseInsensitiveDict
+        Headers of the final response
+    url : str
+        URL of the final response
+    redirect_url : str
+        Last URL F-UJI has been redirected to or None
+    redirect_list : list
+        List of URLs F-UJI has been redirected to
+    redirect_status_list : list
+        List of (URL, status code) tuples of all redirects
+    status_list : list
+        List of status codes of all redirects
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.status = response.status_code
+        self.code = response.status_code
+        self.headers = response.headers
+        self.url = response.url
+        self.redirect_url = None
+        self.redirect_list = []
+        self.redirect_status_list = []
+        self.status_list = []
+        chain = [*response.history, response]
+        for i, hop in enumerate(response.history):
+            newurl = chain[i + 1].url
+            self.redirect_url = newurl
+            self.redirect_list.append(newurl)
+            self.redirect_status_list.append((newurl, hop.status_code))
+            self.status_list.append(hop.status_code)
+        self._message = None
+
+    def info(self):
+        if self._message is None:
+            self._message = http.client.HTTPMessage()
+            for name, value in self.headers.items():
+                self._message[name] = value
+        return self._message
+
+    def getheaders(self):
+        return list(self.headers.items())
+
+    def geturl(self):
+        return self.url
+
+    def getcode(self):
+        return self.status
+
+    def read(self, amt=None):
+        return self.response.raw.read(amt, decode_content=True)
+
+    def close(self):
+        self.response.close()
+
+
+class HTTPTransport:
+    """
+    Process wide HTTP transport, all outgoing requests share per host connection pools so that
+    TCP connections and TLS sessions are reused (keep-alive) across requests and assessments
+
+    ...
+
+    Methods
+    -------
+    session(verify)
+        Returns a requests session bound to the shared connection pools
+    open(url, headers, timeout, method, verify)
+        Streams the response of a request and returns a TransportResponse
+    get(url, **kwargs)
+        Simple requests.get replacement for API calls using the shared connection pools
+    get_executor()
+        Returns the process wide bounded worker pool shared by all assessments
+    submit(url, interval, fn, *args)
+        Queues a task requesting the host of the URL and returns its Future, the task is passed to the worker pool
+        once the host is free and the politeness interval since the last queued task of the host has passed
+    """
+
+    pool_connections = 100  # number of hosts for which connection pools are kept
+    pool_maxsize = 10  # number of kept-alive connections per host
+    max_redirects = 10
+    max_requests_per_host = 4  # number of requests concurrently waiting for the same host
+    max_workers = 32  # number of worker threads shared by all concurrent assessments
+    # host -> number of requests in progress, guarded by _host_condition
+    _host_requests = {}
+    # host -> deque of (future, context, fn, args, interval) of submitted tasks waiting for the host
+    _host_queues = {}
+    _host_next_request = {}
+    _host_timers = {}
+    _host_condition = threading.Condition()
+    # host whose request slot is held by the queued task running in the thread
+    _local = threading.local()
+    _executor = None
+    _unverified_ssl_context = None
+    _adapters = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_unverified_ssl_context(cls):
+        if cls._unverified_ssl_context is None:
+            context = ssl._create_unverified_context()
+            context.set_ciphers("DEFAULT@SECLEVEL=0")
+            cls._unverified_ssl_context = context
+        return cls._unverified_ssl_context
+
+    @classmethod
+    def get_adapter(cls, verify=True):
+        with cls._lock:
+            if verify not in cls._adapters:
+                adapter_class = HTTPAdapter if verify else FUJIHTTPAdapter
+                cls._adapters[verify] = adapter_class(
+                    pool_connections=cls.pool_connections, pool_maxsize=cls.pool_maxsize, pool_block=False
+                )
+            return cls._adapters[verify]
+
+    @classmethod
+    def session(cls, verify=True):
+        # sessions are cheap; a new one per request keeps cookies separated while the pools are shared
+        session = requests.Session()
+        adapter = cls.get_adapter(verify)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.verify = verify
+        session.max_redirects = cls.max_redirects
+        return session
+
+    @classmethod
+    def get_host(cls, url):
+        return urlparse(url).netloc.lower()
+
+    @classmethod
+    @contextlib.contextmanager
+    def host_request(cls, url):
+        # at most max_requests_per_host requests to the same host are in progress, a queued task already holds the
+        # request slot of its host
+        host = cls.get_host(url)
+        if getattr(cls._local, "host", None) == host:
+            yield
+            return
+        with cls._host_condition:
+            while cls._host_requests.get(host, 0) >= cls.max_requests_per_host:
+                cls._host_condition.wait()
+            cls._host_requests[host] = cls._host_requests.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            cls.release_host(host)
+
+    @classmethod
+    def release_host(cls, host):
+        with cls._host_condition:
+            cls._host_requests[host] -= 1
+            if not cls._host_requests[host]:
+                del cls._host_requests[host]
+            cls._host_condition.notify_all()
+        cls.dispatch(host)
+
+    @classmethod
+    def get_executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.max_workers, thread_name_prefix="fuji-transport")
+            return cls._executor
+
+    @classmethod
+    def submit(cls, url, interval, fn, *args):
+        # the worker threads never wait for a host: tasks wait in the queue of their host instead, each task runs in
+        # a copy of the submitting context (see AssessmentDeadline.run_in_context)
+        future = Future()
+        host = cls.get_host(url)
+        with cls._host_condition:
+            cls._host_queues.setdefault(host, deque()).append((future, contextvars.copy_context(), fn, args, interval))
+        cls.dispatch(host)
+        return future
+
+    @classmethod
+    def dispatch(cls, host):
+        # passes the queued tasks of the host to the worker pool while the host is free and polite to request
+        with cls._host_condition:
+            cls._host_timers.pop(host, None)
+            queue = cls._host_queues.get(host)
+            while queue:
+                if cls._host_requests.get(host, 0) >= cls.max_requests_per_host:
+                    # the task finishing a request of the host dispatches again
+                    return
+                now = time.monotonic()
+                start = cls._host_next_request.get(host, now)
+                if start > now:
+                    if host not in cls._host_timers:
+                        timer = threading.Timer(start - now, cls.dispatch, [host])
+                        timer.daemon = True
+                        cls._host_timers[host] = timer
+                        timer.start()
+                    return
+                future, context, fn, args, interval = queue.popleft()
+                if not future.set_running_or_notify_cancel():
+                    # cancelled while waiting, e.g. by the data harvesting deadline
+                    continue
+                cls._host_requests[host] = cls._host_requests.get(host, 0) + 1
+                cls._host_next_request[host] = now + interval
+                cls.get_executor().submit(cls.run_queued, host, future, context, fn, args)
+            cls._host_queues.pop(host, None)
+
+    @classmethod
+    def run_queued(cls, host, future, context, fn, args):
+        cls._local.host = host
+        try:
+            result = context.run(fn, *args)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            cls._local.host = None
+            cls.release_host(host)
+
+    @classmethod
+    def send(cls, session, method, url, **kwargs):
+        # the timeout is capped by the remaining budget of the active assessment deadline
+        timeout = kwargs.get("timeout")
+        kwargs["timeout"] = AssessmentDeadline.get_current_timeout(timeout)
+        # requests to hosts which recently failed on connection level fail fast (circuit breaker), slow responses
+        # (read timeouts) are no connection failures
+        HostHealthRegistry.check(url)
+        try:
+            with cls.host_request(url):
+                response = session.request(method, url, **kwargs)
+        except requests.exceptions.ConnectTimeout as e:
+            # a timeout shortened by the assessment deadline says nothing about the host
+            if kwargs["timeout"] == timeout:
+                HostHealthRegistry.record_failure(url, e)
+            else:
+                HostHealthRegistry.record_unknown(url)
+            raise
+        except requests.exceptions.ReadTimeout:
+            # the host accepted the connection but is slow to answer this request, e.g. a large record
+            HostHealthRegistry.record_success(url)
+            raise
+        except requests.exceptions.ConnectionError as e:
+            if isinstance(e.args[0] if e.args else None, urllib3.exceptions.ReadTimeoutError):
+                # read timeout while the response body is downloaded
+                HostHealthRegistry.record_success(url)
+            else:
+                HostHealthRegistry.record_failure(url, e)
+            raise
+        except Exception:
+            # the host is reachable, e.g. too many redirects
+            HostHealthRegistry.record_success(url)
+            raise
+        HostHealthRegistry.record_success(url)
+        return response
+
+    @classmethod
+    def open(cls, url, headers=None, timeout=10, method="GET", verify=False):
+        response = cls.send(
+            cls.session(verify), method, url, headers=headers, timeout=timeout, stream=True, allow_redirects=True
+        )
+        return TransportResponse(response)
+
+    @classmethod
+    def get(cls, url, verify=True, **kwargs):
+        return cls.send(cls.session(verify), "GET", url, **kwargs)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            for adapter in cls._adapters.values():
+                adapter.close()
+            cls._adapters = {}
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False, cancel_futures=True)
+                cls._executor = None
+        with cls._host_condition:
+            for timer in cls._host_timers.values():
+                timer.cancel()
+            for queue in cls._host_queues.values():
+                for future, *_task in queue:
+                    future.cancel()
+            cls._host_timers = {}
+            cls._host_queues = {}
+            cls._host_next_request = {}
@@ -1,19 +1,34 @@
 # SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
 #
 # SPDX-License-Identifier: MIT
+import functools
 import json
 import re
 import urllib
 import uuid
+from typing import NamedTuple
 
 import hashid
 from idutils import detect_identifier_schemes, is_urn, normalize_pid
 from idutils import to_url as _to_url
 
+from fuji_server.helper.doi_prefix_index import DOIPrefixIndex
 from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.redirect_chain_cache import RedirectChainCache
 from fuji_server.helper.request_helper import AcceptTypes, RequestHelper
 
 
+class IdentifierAnalysis(NamedTuple):
+    """Immutable result of the analysis of an identifier string by IdentifierHelper.analyse()"""
+
+    identifier: str
+    normalized_id: str
+    identifier_schemes: tuple
+    preferred_schema: str
+    identifier_url: str
+    is_persistent: bool
+
+
 class IdentifierHelper:
     # List of PIDS e.g. those listed in datacite schema
     VALID_PIDS = {
@@ -41,8 +56,6 @@ class IdentifierHelper:
     # TODO: check if this is needed.. if so ..complete and add check to FAIRcheck
     IDENTIFIERS_PIDS = r"https://identifiers.org/[provider_code/]namespace:accession"
 
-    IDENTIFIERS_ORG_DATA = Preprocessor.get_identifiers_org_data()
-    DOI_PREFIXES = Preprocessor.get_doi_prefixes()
     identifier_schemes = []
     preferred_schema = None  # the preferred schema
     identifier_url = None
@@ -64,131 +77,173 @@ class IdentifierHelper:
         "urn:nbn:nl": "www.persistent-identifier.nl/",
     }
 
-    # check if the urn is a urn plus resolver URL
-    def check_resolver_urn(self, idstring):
-        ret = False
+    GENERIC_IDENTIFIERS_ORG_PATTERN = re.compile(r"^([a-z0-9\._]+):(.+)")
+    URN_RESOLVER_PATTERN = re.compile(r"(urn:(?:nbn|doi|lex|):[a-z]+)", re.IGNORECASE)
+    # see: https://www.icann.org/en/system/files/files/octo-002-14oct19-en.pdf :
+    # One of the Handle System's main features is that prefixes do not include names. Dr. Kahn
+    # explains that the Handle System "does not rely on name semantics". For example, organization
+    # names are usually not included in handle prefixes. To date, except for a few special (and
+    # primarily administrative) cases, prefixes contain only digits.
+    # Therefore:
+    # handle_regexp = re.compile(r"(hdl:\s*|(?:https?://)?hdl\.handle\.net/)?([^/.]+(?:\.[^/.]+)*)/(.+)$")
+    HANDLE_PATTERN = re.compile(r"(hdl:\s*|(?:https?://)?hdl\.handle\.net/)?([0-9]+(?:\.[0-9]+)*)/(.+)$", flags=re.I)
+    HASH_TYPE_PATTERN = re.compile(r"^(sha|md5|blake)", re.IGNORECASE)
+    # maximum number of memoized identifier analyses
+    ANALYSIS_CACHE_SIZE = 20000
+    _identifiers_org_patterns = None
+    _hashid = None
+
+    def __init__(self, idstring, logger=None):
+        self.identifier = idstring
+        self.normalized_id = None
+        self.logger = logger
+        if self.identifier and isinstance(self.identifier, str):
+            analysis = self.analyse(self.identifier)
+            self.identifier = analysis.identifier
+            self.normalized_id = analysis.normalized_id
+            self.identifier_schemes = list(analysis.identifier_schemes)
+            self.preferred_schema = analysis.preferred_schema
+            self.identifier_url = analysis.identifier_url
+            self.is_persistent = analysis.is_persistent
+
+    @classmethod
+    def reset(cls):
+        # the identifiers.org data has been reloaded
+        cls._identifiers_org_patterns = None
+        cls.analyse.cache_clear()
+
+    @classmethod
+    def get_identifiers_org_patterns(cls):
+        # precompiled identifiers.org namespace patterns, None for patterns Python cannot compile
+        if cls._identifiers_org_patterns is None:
+            patterns = {}
+            for prefix, namespace in Preprocessor.get_identifiers_org_data().items():
+                try:
+                    patterns[prefix] = re.compile(namespace["pattern"])
+                except (re.error, KeyError, TypeError):
+                    patterns[prefix] = None
+            cls._identifiers_org_patterns = patterns
+        return cls._identifiers_org_patterns
+
+    @classmethod
+    @functools.lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+    def analyse(cls, idstring):
+        # identifier analysis without resolution, the results are memoized since the same identifiers are analysed
+        # by the harvesters and evaluators over and over again
+        identifier = idstring
+        normalized_id = None
+        identifier_schemes = []
+        preferred_schema = None
+        identifier_url = None
+        is_persistent = False
+        idparts = urllib.parse.urlparse(identifier)
+        if len(identifier) > 4 and not identifier.isnumeric():
+            # workaround to identify nbn urns given together with standard resolver urls:
+            resolver_urn = cls.get_resolver_urn(identifier)
+            if resolver_urn:
+                identifier_schemes = ["url", "urn"]
+                preferred_schema = "urn"
+                normalized_id, identifier_url = resolver_urn
+            # workaround to resolve lsids:
+            # idutils.LANDING_URLS['lsid'] ='http://www.lsid.info/resolver/?lsid={pid}'
+            # workaround to recognize https purls and arks
+            if "/purl.archive.org/" in identifier:
+                identifier = identifier.replace("/purl.archive.org/", "/purl.org/")
+            if "https://purl." in identifier or "/ark:" in identifier:
+                identifier = identifier.replace("https:", "http:")
+            # workaround to identify arks properly:
+            identifier = identifier.replace("/ark:", "/ark:/")
+            identifier = identifier.replace("/ark://", "/ark:/")
+
+            if cls.is_uuid(identifier):
+                identifier_schemes = ["uuid"]
+                preferred_schema = "uuid"
+            if cls.is_hash(identifier):
+                identifier_schemes = ["hash"]
+                preferred_schema = "hash"
+
+            if not identifier_schemes or identifier_schemes == ["url"]:
+                # w3id check
+                if idparts.scheme == "https" and idparts.netloc in ["w3id.org", "www.w3id.org"] and idparts.path != "":
+                    identifier_schemes = ["w3id", "url"]
+                    preferred_schema = "w3id"
+                    identifier_url = identifier
+                    normalized_id = identifier
+                # identifiers.org
+
+                elif idparts.netloc == "identifiers.org":
+                    idorgparts = idparts.path.split("/")
+                    if len(idorgparts) == 3:
+                        identifier = idorgparts[1] + ":" + idorgparts[2]
+
+                idmatch = cls.GENERIC_IDENTIFIERS_ORG_PATTERN.search(identifier)
+                if idmatch:
+                    found_prefix = idmatch[1]
+                    found_suffix = idmatch[2]
+                    if found_prefix not in cls.NON_IDENTIFIERS_ORG_KEYS:
+                        pattern = cls.get_identifiers_org_patterns().get(found_prefix)
+                        if pattern and pattern.search(found_suffix):
+                            identifier_schemes = ["identifiers.org", found_prefix]
+                            preferred_schema = found_prefix
+                            identifier_url = "https://identifiers.org/" + str(identifier)
+
+                            """identifier_url = str(
+                                Preprocessor.get_identifiers_org_data()[found_prefix]["url_pattern"]
+                            ).replace("{$id}", found_suffix)"""
+                            normalized_id = found_prefix.lower() + ":" + found_suffix
+
+            # idutils check
+            if not identifier_schemes:
+                identifier_schemes = detect_identifier_schemes(identifier)
+                if "url" not in identifier_schemes and idparts.scheme in ["http", "https"]:
+                    identifier_schemes.append("url")
+            # verify handles
+            if "handle" in identifier_schemes:
+                if not cls.verify_handle(identifier):
+                    identifier_schemes.remove("handle")
+            # preferred schema
+            if identifier_schemes:
+                if len(identifier_schemes) > 1:
+                    if "url" in identifier_schemes:  # ['doi', 'url']
+                        # move url to end of list
+                        identifier_schemes.append(identifier_schemes.pop(identifier_schemes.index("url")))
+                preferred_schema = identifier_schemes[0]
+                if not normalized_id:
+                    normalized_id = normalize_pid(identifier, preferred_schema)
+                if not identifier_url:
+                    identifier_url = cls.to_url(identifier, preferred_schema)
+            if preferred_schema in cls.VALID_PIDS or preferred_schema in Preprocessor.get_identifiers_org_data():
+                is_persistent = True
+        return IdentifierAnalysis(
+            identifier,
+            normalized_id or identifier,
+            tuple(identifier_schemes),
+            preferred_schema,
+            identifier_url,
+            is_persistent,
+        )
+
+    @classmethod
+    def get_resolver_urn(cls, idstring):
+        # check if the urn is a urn plus resolver URL, returns the urn and its URL
         if "urn:" in idstring and not idstring.startswith("urn:"):
             try:
-                urnsplit = re.split(r"(urn:(?:nbn|doi|lex|):[a-z]+)", idstring, re.IGNORECASE)
+                urnsplit = cls.URN_RESOLVER_PATTERN.split(idstring, maxsplit=1)
                 if len(urnsplit) > 1:
                     urnid = urnsplit[1]
                     candidateurn = urnid + str(urnsplit[2])
                     candresolver = re.sub(r"https?://", "", urnsplit[0])
-                    if candresolver in self.URN_RESOLVER.values():
+                    if candresolver in cls.URN_RESOLVER.values():
                         if is_urn(candidateurn):
-                            self.identifier_schemes = ["url", "urn"]
-                            self.preferred_schema = "urn"
-                            self.normalized_id = candidateurn
-                            self.identifier_url = "https://" + candresolver + candidateurn
-                            ret = True
+                            return candidateurn, "https://" + candresolver + candidateurn
             except Exception as e:
                 print("URN parsing error", e)
-        return ret
+        return None
 
-    def __init__(self, idstring, logger=None):
-        self.identifier = idstring
-        self.normalized_id = None
-        self.logger = logger
-        if self.identifier and isinstance(self.identifier, str):
-            idparts = urllib.parse.urlparse(self.identifier)
-            if len(self.identifier) > 4 and not self.identifier.isnumeric():
-                # workaround to identify nbn urns given together with standard resolver urls:
-                self.check_resolver_urn(self.identifier)
-                # workaround to resolve lsids:
-                # idutils.LANDING_URLS['lsid'] ='http://www.lsid.info/resolver/?lsid={pid}'
-                # workaround to recognize https purls and arks
-                if "/purl.archive.org/" in self.identifier:
-                    self.identifier = self.identifier.replace("/purl.archive.org/", "/purl.org/")
-                if "https://purl." in self.identifier or "/ark:" in self.identifier:
-                    self.identifier = self.identifier.replace("https:", "http:")
-                # workaround to identify arks properly:
-                self.identifier = self.identifier.replace("/ark:", "/ark:/")
-                self.identifier = self.identifier.replace("/ark://", "/ark:/")
-                generic_identifiers_org_pattern = r"^([a-z0-9\._]+):(.+)"
-
-                if self.is_uuid():
-                    self.identifier_schemes = ["uuid"]
-                    self.preferred_schema = "uuid"
-                    self.is_persistent = False
-                if self.is_hash():
-                    self.identifier_schemes = ["hash"]
-                    self.preferred_schema = "hash"
-                    self.is_persistent = False
-
-                if not self.identifier_schemes or self.identifier_schemes == ["url"]:
-                    # w3id check
-                    if (
-                        idparts.scheme == "https"
-                        and idparts.netloc in ["w3id.org", "www.w3id.org"]
-                        and idparts.path != ""
-                    ):
-                        self.identifier_schemes = ["w3id", "url"]
-                        self.preferred_schema = "w3id"
-                        self.identifier_url = self.identifier
-                        self.normalized_id = self.identifier
-                    # identifiers.org
-
-                    elif idparts.netloc == "identifiers.org":
-                        idorgparts = idparts.path.split("/")
-                        if len(idorgparts) == 3:
-                            self.identifier = idorgparts[1] + ":" + idorgparts[2]
-
-                    idmatch = re.search(generic_identifiers_org_pattern, self.identifier)
-                    if idmatch:
-                        found_prefix = idmatch[1]
-                        found_suffix = idmatch[2]
-                        if (
-                            found_prefix in self.IDENTIFIERS_ORG_DATA.keys()
-                            and found_prefix not in self.NON_IDENTIFIERS_ORG_KEYS
-                        ):
-                            if re.search(self.IDENTIFIERS_ORG_DATA[found_prefix]["pattern"], found_suffix):
-                                self.identifier_schemes = ["identifiers.org", found_prefix]
-                                self.preferred_schema = found_prefix
-                                self.identifier_url = "https://identifiers.org/" + str(self.identifier)
-
-                                """self.identifier_url = str(
-                                    self.IDENTIFIERS_ORG_DATA[found_prefix]["url_pattern"]
-                                ).replace("{$id}", found_suffix)"""
-                                self.normalized_id = found_prefix.lower() + ":" + found_suffix
-
-                # idutils check
-                if not self.identifier_schemes:
-                    self.identifier_schemes = detect_identifier_schemes(self.identifier)
-                    if "url" not in self.identifier_schemes and idparts.scheme in ["http", "https"]:
-                        self.identifier_schemes.append("url")
-                # verify handles
-                if "handle" in self.identifier_schemes:
-                    if not self.verify_handle(self.identifier):
-                        self.identifier_schemes.remove("handle")
-                # identifiers.org check
-                if self.identifier_schemes:
-                    # preferred schema
-                    if self.identifier_schemes:
-                        if len(self.identifier_schemes) > 0:
-                            if len(self.identifier_schemes) > 1:
-                                if "url" in self.identifier_schemes:  # ['doi', 'url']
-                                    # move url to end of list
-                                    self.identifier_schemes.append(
-                                        self.identifier_schemes.pop(self.identifier_schemes.index("url"))
-                                    )
-                                    # self.identifier_schemes.remove('url')
-                            self.preferred_schema = self.identifier_schemes[0]
-                            if not self.normalized_id:
-                                self.normalized_id = normalize_pid(self.identifier, self.preferred_schema)
-                            if not self.identifier_url:
-                                self.identifier_url = self.to_url(self.identifier, self.preferred_schema)
-                            # print('IDURL ',self.identifier_url, self.preferred_schema)
-                if (
-                    self.preferred_schema in self.VALID_PIDS
-                    or self.preferred_schema in self.IDENTIFIERS_ORG_DATA.keys()
-                ):
-                    self.is_persistent = True
-            if not self.normalized_id:
-                self.normalized_id = self.identifier
-
-    def is_uuid(self):
+    @staticmethod
+    def is_uuid(idstring):
         try:
-            uuid_version = uuid.UUID(self.identifier).version
+            uuid_version = uuid.UUID(idstring).version
             if uuid_version is not None:
                 return True
             else:
@@ -196,30 +251,23 @@ class IdentifierHelper:
         except ValueError:
             return False
 
-    def is_hash(self):
+    @classmethod
+    def is_hash(cls, idstring):
         try:
-            hash = hashid.HashID()
+            if cls._hashid is None:
+                cls._hashid = hashid.HashID()
             validhash = False
-            for hashtype in hash.identifyHash(self.identifier):
-                if re.search(r"^(sha|md5|blake)", hashtype.name, re.IGNORECASE):
+            for hashtype in cls._hashid.identifyHash(idstring):
+                if cls.HASH_TYPE_PATTERN.search(hashtype.name):
                     validhash = True
             return validhash
         except Exception:
             return False
 
-    def verify_handle(self, val, includeparams=True):
+    @classmethod
+    def verify_handle(cls, val, includeparams=True):
         # additional checks for handles since the syntax is very generic
         try:
-            # see: https://www.icann.org/en/system/files/files/octo-002-14oct19-en.pdf :
-            # One of the Handle System's main features is that prefixes do not include names. Dr. Kahn
-            # explains that the Handle System "does not rely on name semantics". For example, organization
-            # names are usually not included in handle prefixes. To date, except for a few special (and
-            # primarily administrative) cases, prefixes contain only digits.
-            # Therefore:
-            # handle_regexp = re.compile(r"(hdl:\s*|(?:https?://)?hdl\.handle\.net/)?([^/.]+(?:\.[^/.]+)*)/(.+)$")
-            handle_regexp = re.compile(
-                r"(hdl:\s*|(?:https?://)?hdl\.handle\.net/)?([0-9]+(?:\.[0-9]+)*)/(.+)$", flags=re.I
-            )
             ures = urllib.parse.urlparse(val)
             if ures:
                 if ures.query:
@@ -231,7 +279,7 @@ class IdentifierHelper:
                                 val = param
                         except Exception:
                             pass
-            m = handle_regexp.match(val)
+            m = cls.HANDLE_PATTERN.match(val)
             if m:
                 return True
             else:
@@ -240,7 +288,8 @@ class IdentifierHelper:
             print("handle verification error: " + str(e))
             return False
 
-    def to_url(self, id, schema):
+    @staticmethod
+    def to_url(id, schema):
         idurl = None
         try:
             if schema == "ark":
@@ -256,11 +305,17 @@ class IdentifierHelper:
     def get_resolved_url(self, pid_collector={}):
         candidate_pid = self.identifier_url
         if candidate_pid not in pid_collector or not pid_collector:
+            # resolutions of the same PID are shared by all assessments
+            cached_chain = RedirectChainCache.get(self.get_resolution_key())
+            if cached_chain:
+                return cached_chain.get("redirect_url"), cached_chain.get("status_list")
             try:
                 requestHelper = RequestHelper(candidate_pid, self.logger)
                 requestHelper.setAcceptType(AcceptTypes.default)  # request
                 requestHelper.content_negotiate("FsF-F1-02D", ignore_html=False)
                 if requestHelper.response_content:
+                    if requestHelper.response_status == 200:
+                        RedirectChainCache.set(self.get_resolution_key(), requestHelper.getRedirectChain())
                     return requestHelper.redirect_url, requestHelper.status_list
                 else:
                     return None, requestHelper.status_list
@@ -270,6 +325,16 @@ class IdentifierHelper:
         else:
             return pid_collector[candidate_pid].get("landing_page")
 
+    def get_resolution_key(self):
+        # key of the landing page resolution of a PID in the RedirectChainCache
+        if self.is_persistent and self.normalized_id:
+            normalized_id = str(self.normalized_id)
+            # DOIs and handles are case insensitive
+            if self.preferred_schema in ["doi", "handle"]:
+                normalized_id = normalized_id.lower()
+            return str(self.preferred_schema) + ":" + normalized_id
+        return None
+
     def get_preferred_schema(self):
         return self.preferred_schema
 
@@ -285,18 +350,21 @@ class IdentifierHelper:
     def get_agency(self):  # registration agency for doi
         agency = None
         if self.preferred_schema == "doi":
-            prefix = self.normalized_id.split("/")[0]
-            if prefix not in self.DOI_PREFIXES:
-                try:
-                    requestHelper = RequestHelper("https://doi.org/ra/" + prefix, self.logger)
-                    requestHelper.setAcceptType(AcceptTypes.default)  # request
-                    requestHelper.content_negotiate("FsF-F1-02D", ignore_html=False)
-                    if requestHelper.response_content:
-                        auth_json = json.loads(requestHelper.response_content)
-                        agency = auth_json[0].get("RA")
-                        Preprocessor.add_doi_prefix(prefix, agency)
-                except Exception as e:
-                    print("DOI authority lookup error", e)
+            agency = DOIPrefixIndex.get_agency(self.normalized_id.split("/")[0], self.lookup_agency)
+        return agency
+
+    def lookup_agency(self, prefix):
+        # asks the DOI resolver for the registration agency of a prefix which is not in the DOIPrefixIndex
+        agency = None
+        try:
+            requestHelper = RequestHelper("https://doi.org/ra/" + prefix, self.logger)
+            requestHelper.setAcceptType(AcceptTypes.default)  # request
+            requestHelper.content_negotiate("FsF-F1-02D", ignore_html=False)
+            if requestHelper.response_content:
+                auth_json = json.loads(requestHelper.response_content)
+                agency = auth_json[0].get("RA")
+        except Exception as e:
+            print("DOI authority lookup error", e)
         return agency
 
     def get_identifier_info(self, pidcollector={}, resolve=True):
@@ -1,13 +1,17 @@
 # SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
 #
 # SPDX-License-Identifier: MIT
+import functools
 import json
 import logging
 import re
+import threading
 from pathlib import Path
 
 from tldextract import extract
 
+from fuji_server.helper.packed_table import PackedRecords
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,6 +19,9 @@ logger = logging.getLogger(__name__)
 
 
 class LinkedVocabHelper:
+    # scheme and host of an IRI, the domain parts of a host are extracted once
+    HOST_REGEX = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://[^/?#]*")
+    HOST_CACHE_SIZE = 10000
     fuji_server_dir = Path(__file__).parent.parent  # project_root
     linked_vocabs_dir = fuji_server_dir / "data/linked_vocabs"
 
@@ -46,9 +53,15 @@ class LinkedVocabHelper:
                 reg_ontologies = json.load(reg_file)
                 self.linked_vocab_dict.update(reg_ontologies)
 
+    @staticmethod
+    @functools.lru_cache(maxsize=HOST_CACHE_SIZE)
+    def extract_host(host):
+        return extract(host)
+
     def split_iri(self, iri):
         ret = {}
-        domainparts = extract(iri)
+        host = self.HOST_REGEX.match(iri)
+        domainparts = self.extract_host(host[0]) if host else extract(iri)
         if domainparts.domain == "urn" and len(iri.split(":")) > 2 and domainparts.suffix == "":
             ret["domain"] = domainparts.domain
             ret["subdomain"] = iri.split(":")[1]
@@ -136,57 +149,172 @@ class LinkedVocabHelper:
         return len(result)
 
     def get_linked_vocab_by_iri(self, IRI, isnamespaceIRI=False, firstonly=True):
+        return LinkedVocabMatcher.get_matcher(self.linked_vocab_index).match(IRI, isnamespaceIRI)
+
+
+class LinkedVocabMatcher:
+    """
+    Compiled form of a linked vocab index which classifies IRIs by the vocab (ontology, registry entry) they belong to.
+    The entries of a (domain, subdomain) of the index are compiled once on their first use: their regexes are
+    precompiled, their path patterns and namespaces are put into lookup tables and the entries themselves are packed
+    (see PackedRecords). An IRI is then matched by looking up the substrings of the pattern lengths at each '/' of its
+    path instead of testing every entry of its subdomain, only the regexes of the entries whose pattern occurs in the
+    path are evaluated. The results are memoized per IRI, the
+    index is treated as read-only once it is matched against (reloads replace the index, see ReferenceDataReloader)
+
+    ...
+
+    Attributes
+    ----------
+    MATCH_CACHE_SIZE : int
+        Maximum number of memoized IRI matches per index
+
+    Methods
+    -------
+    get_matcher(linked_vocab_index)
+        Returns the matcher of a linked vocab index
+    match(IRI, isnamespaceIRI)
+        Returns the index entry of the vocab of an IRI or None, an entry of the IRI itself (namespace) is preferred
+        to entries whose pattern matches the IRI, of several matching entries the last one is returned
+    compile()
+        Compiles all (domain, subdomain) entries of the index
+    reset()
+        Removes all matchers
+    """
+
+    MATCH_CACHE_SIZE = 100000
+    # matchers of the last few indexes, older indexes have been replaced by a reload
+    MAX_MATCHERS = 4
+    _matchers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, linked_vocab_index):
+        self.linked_vocab_index = linked_vocab_index
+        self.helper = LinkedVocabHelper(linked_vocab_index)
+        self.buckets = {}
+        self.match = functools.lru_cache(maxsize=self.MATCH_CACHE_SIZE)(self.match_iri)
+
+    @classmethod
+    def get_matcher(cls, linked_vocab_index):
+        matcher = cls._matchers.get(id(linked_vocab_index))
+        if matcher is None or matcher.linked_vocab_index is not linked_vocab_index:
+            with cls._lock:
+                matcher = cls._matchers.get(id(linked_vocab_index))
+                if matcher is None or matcher.linked_vocab_index is not linked_vocab_index:
+                    matcher = cls(linked_vocab_index)
+                    cls._matchers.pop(id(linked_vocab_index), None)
+                    while len(cls._matchers) >= cls.MAX_MATCHERS:
+                        cls._matchers.pop(next(iter(cls._matchers)))
+                    cls._matchers[id(linked_vocab_index)] = matcher
+        return matcher
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._matchers = {}
+
+    @staticmethod
+    def search_prefixes(prefixes, path, positions):
+        # adds the positions of all prefixes which occur in the path starting at a '/', prefixes is a pair of a
+        # prefix -> positions table and the sorted prefix lengths (a flat table is far smaller than a character trie)
+        table, lengths = prefixes
+        start = path.find("/")
+        while start != -1:
+            for length in lengths:
+                if start + length > len(path):
+                    break
+                found = table.get(path[start : start + length])
+                if found:
+                    positions.update(found)
+            start = path.find("/", start + 1)
+
+    def compile_bucket(self, entries):
+        bucket = {
+            "entries": PackedRecords(entries),
+            "namespaces": {},
+            "regexes": [],
+            "paths": {},
+            "namespace_paths": {},
+        }
+        # patterns not starting with '/' (e.g. of URNs) are tested by substring search: (position, pattern) lists
+        bucket["other_paths"], bucket["other_namespace_paths"] = [], []
+        compiled_regexes = {}
+        for position, reg_res in enumerate(entries):
+            bucket["namespaces"].setdefault(reg_res.get("namespace"), []).append(position)
+            pattern = reg_res.get("pattern")
+            comb_regex = None
+            if pattern:
+                prefix = pattern.split("$1")[0]
+                for prefixes, others, check in [
+                    ("paths", "other_paths", prefix),
+                    ("namespace_paths", "other_namespace_paths", prefix.rstrip("/#")),
+                ]:
+                    if check.startswith("/"):
+                        bucket[prefixes].setdefault(check, []).append(position)
+                    else:
+                        bucket[others].append((position, check))
+                if reg_res.get("regex"):
+                    comb_regex = reg_res.get("regex").lstrip("^").rstrip("$")
+                else:
+                    comb_regex = prefix.replace("?", r"\?").rstrip("/#")
+                if comb_regex not in compiled_regexes:
+                    try:
+                        compiled_regexes[comb_regex] = re.compile(comb_regex)
+                    except re.error as e:
+                        logger.warning("Invalid linked vocab pattern " + str(comb_regex) + ": " + str(e))
+                        compiled_regexes[comb_regex] = None
+                comb_regex = compiled_regexes[comb_regex]
+            bucket["regexes"].append(comb_regex)
+        for prefixes in ["paths", "namespace_paths"]:
+            bucket[prefixes] = (bucket[prefixes], sorted({len(prefix) for prefix in bucket[prefixes]}))
+        return bucket
+
+    def get_bucket(self, domain, subdomain, entries=None):
+        bucket = self.buckets.get((domain, subdomain))
+        if bucket is None:
+            if entries is None:
+                entries = (self.linked_vocab_index.get(domain) or {}).get(subdomain)
+            if not entries:
+                return None
+            bucket = self.buckets[(domain, subdomain)] = self.compile_bucket(entries)
+        return bucket
+
+    def compile(self):
+        for domain, subdomains in self.linked_vocab_index.items():
+            for subdomain, entries in subdomains.items():
+                self.get_bucket(domain, subdomain, entries)
+
+    def match_iri(self, IRI, isnamespaceIRI=False):
         IRI = IRI.strip()
         if isnamespaceIRI:
             IRI = IRI.rstrip("/#/:")
-        iri_parts = self.split_iri(IRI)
-        onto_match = []
-        final_onto_match = None
-        tested_patterns = []
-        iri_domain = iri_parts.get("domain")
-        if self.linked_vocab_index.get(iri_domain):
-            if self.linked_vocab_index[iri_domain].get(iri_parts.get("subdomain")):
-                for reg_res in self.linked_vocab_index[iri_domain][iri_parts.get("subdomain")]:
-                    # full match
-                    if reg_res.get("namespace") == IRI:
-                        onto_match.append({"score": len(iri_parts.get("path")), "match": reg_res})
-                    else:
-                        # print(reg_res.get('pattern').replace('$1',''), iri_parts.get('path'))
-                        if reg_res.get("pattern"):
-                            pattern_check = False
-                            if isnamespaceIRI:
-                                # print(reg_res.get('pattern').split('$1')[0].rstrip('/#') , iri_parts.get('path').rstrip('/#'))
-                                if reg_res.get("pattern").split("$1")[0].rstrip("/#") in iri_parts.get("path").rstrip(
-                                    "/#"
-                                ):
-                                    pattern_check = True
-                            else:
-                                if reg_res.get("pattern").split("$1")[0] in iri_parts.get("path"):
-                                    pattern_check = True
-                            if pattern_check:
-                                if reg_res.get("regex"):
-                                    comb_regex = reg_res.get("regex").lstrip("^").rstrip("$")
-                                else:
-                                    if "?" in reg_res.get("pattern"):
-                                        reg_res["pattern"] = reg_res.get("pattern").replace("?", r"\?")
-                                    comb_regex = reg_res.get("pattern").split("$1")[0].rstrip("/#")
-
-                                if comb_regex not in tested_patterns:
-                                    tested_patterns.append(comb_regex)
-                                    comb_match = re.search(comb_regex, iri_parts.get("path"))
-                                    score = self.get_overlap(
-                                        iri_parts.get("path"), reg_res.get("pattern").split("$1")[0]
-                                    )
-                                if comb_match:
-                                    # if len(comb_match.groups()) > 0:
-                                    #    if comb_match[1]:
-                                    #        print('++++++',comb_match[1],reg_res.get('namespace'))
-                                    #        reg_res['namespace'] = IRI.split(comb_match[1])[0] + comb_match[1]
-                                    onto_match.append({"score": score, "match": reg_res})
-            maxscore = 0
-            if onto_match:
-                for ont_m in onto_match:
-                    if ont_m["score"] >= maxscore:
-                        final_onto_match = ont_m["match"]
-
-        return final_onto_match
+        iri_parts = self.helper.split_iri(IRI)
+        bucket = self.get_bucket(iri_parts.get("domain"), iri_parts.get("subdomain"))
+        if bucket is None:
+            return None
+        # an entry of the IRI itself (namespace) is preferred to entries whose pattern matches the IRI
+        full_matches = bucket["namespaces"].get(IRI)
+        if full_matches:
+            return bucket["entries"][max(full_matches)]
+        positions = set()
+        path = iri_parts.get("path")
+        if path is not None:
+            if isnamespaceIRI:
+                path = path.rstrip("/#")
+                prefixes, others = bucket["namespace_paths"], bucket["other_namespace_paths"]
+            else:
+                prefixes, others = bucket["paths"], bucket["other_paths"]
+            self.search_prefixes(prefixes, path, positions)
+            positions.update(position for position, check in others if check in path)
+        # regexes are only tested for entries whose pattern occurs in the path, of several matching entries the last
+        # one of the index wins
+        tested_regexes = {}
+        for position in sorted(positions, reverse=True):
+            comb_regex = bucket["regexes"][position]
+            if comb_regex is None:
+                continue
+            if comb_regex not in tested_regexes:
+                tested_regexes[comb_regex] = comb_regex.search(iri_parts.get("path")) is not None
+            if tested_regexes[comb_regex]:
+                return bucket["entries"][position]
+        return None
@@ -10,6 +10,7 @@ from urlextract import URLExtract
 from fuji_server.helper import metadata_mapper
 from fuji_server.helper.linked_vocab_helper import LinkedVocabHelper
 from fuji_server.helper.metadata_mapper import Mapper
+from fuji_server.helper.parsed_artifact_cache import ParsedArtifactCache
 from fuji_server.helper.preprocessor import Preprocessor
 
 
@@ -227,9 +228,19 @@ class MetaDataCollector:
         Return the namespaces of the metadata.
     getNamespacesfromIRIs(meta_source)
         Return the Namespaces given the Internatiolized Resource Identifiers(IRIs)
+    get_parse_cache_key(content, *context)
+        Return the key of the cached parse result of the given content
+    get_cached_parse(key)
+        Return a cached parse result as dict with key 'metadata' and restore the collector attributes stored with it
+    set_cached_parse(key, metadata)
+        Store a parse result together with the collector attributes
     """
 
     metadata_mapping: Mapper | None
+    # increase if the parse output of a collector changes, cached parse results of older versions are not reused
+    COLLECTOR_VERSION = 1
+    # attributes set while parsing which are cached together with the parsed metadata
+    PARSE_CACHE_ATTRIBUTES = ["metadata_format", "content_type", "namespaces", "linked_namespaces"]
 
     def __init__(
         self,
@@ -261,6 +272,8 @@ class MetaDataCollector:
         self.auth_token_type = "Basic"
         self.auth_token = None
         self.accept_type = None
+        # keys of the content parsed as XML during the assessment, shared by the collectors of a harvester
+        self.checked_content_keys = None
 
     @classmethod
     def getEnumSourceNames(cls) -> MetadataSources:
@@ -324,6 +337,23 @@ class MetaDataCollector:
                     if found_lov:
                         self.linked_namespaces[found_lov.get("namespace")] = found_lov
 
+    def get_parse_cache_key(self, content, *context):
+        return ParsedArtifactCache.get_key(content, type(self).__name__, self.COLLECTOR_VERSION, *context)
+
+    def get_cached_parse(self, key):
+        artifact = ParsedArtifactCache.get(key)
+        if artifact is None:
+            return None
+        for name, value in artifact["attributes"].items():
+            setattr(self, name, value)
+        if self.logger:
+            self.logger.info("FsF-F2-01M : Reusing metadata parsed before from identical content")
+        return artifact
+
+    def set_cached_parse(self, key, metadata):
+        attributes = {name: getattr(self, name, None) for name in self.PARSE_CACHE_ATTRIBUTES}
+        ParsedArtifactCache.set(key, {"metadata": metadata, "attributes": attributes})
+
     def set_auth_token(self, authtoken, authtokentype):
         self.auth_token = authtoken
         self.auth_token_type = authtokentype
@@ -26,7 +26,6 @@ class MetaDataCollectorMicroData(MetaDataCollector):
     """
 
     source_name = None
-    SCHEMA_ORG_CREATIVEWORKS = Preprocessor.get_schema_org_creativeworks()
 
     def __init__(self, sourcemetadata, mapping, loggerinst):
         """
@@ -62,7 +61,7 @@ class MetaDataCollectorMicroData(MetaDataCollector):
             if len(self.source_metadata) > 1:
                 try:
                     for sm in self.source_metadata:
-                        if str(sm.get("type").split("/")[-1]).lower() in self.SCHEMA_ORG_CREATIVEWORKS:
+                        if str(sm.get("type").split("/")[-1]).lower() in Preprocessor.get_schema_org_creativeworks():
                             ext_meta = sm
                 except:
                     pass
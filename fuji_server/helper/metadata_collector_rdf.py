@@ -8,7 +8,6 @@ import urllib
 
 import dateutil
 import rdflib
-import requests
 from idutils import is_url
 from rdflib import RDFS, SKOS, Namespace
 from rdflib.namespace import (
@@ -19,6 +18,7 @@ from rdflib.namespace import (
     SDO,  # schema.org
 )
 
+from fuji_server.helper.http_transport import HTTPTransport
 from fuji_server.helper.metadata_collector import MetaDataCollector, MetadataFormats, MetadataSources
 from fuji_server.helper.metadata_mapper import Mapper
 from fuji_server.helper.preprocessor import Preprocessor
@@ -58,11 +58,18 @@ class MetaDataCollectorRdf(MetaDataCollector):
         Method to get the content type attribute in the class
     get_metadata_from_graph(g)
         Method to get all metadata from a graph object
+    parse_rdf_response(rdf_response)
+        Method to parse the metadata from a RDF or JSON-LD response
     """
 
     target_url = None
-    SCHEMA_ORG_CONTEXT = Preprocessor.get_schema_org_context()
-    SCHEMA_ORG_CREATIVEWORKS = Preprocessor.get_schema_org_creativeworks()
+    PARSE_CACHE_ATTRIBUTES = [
+        "metadata_format",
+        "source_name",
+        "main_entity_format",
+        "namespaces",
+        "linked_namespaces",
+    ]
 
     def __init__(self, loggerinst, target_url=None, source=None, json_ld_content=None, pref_mime_type=None):
         """
@@ -91,6 +98,8 @@ class MetaDataCollectorRdf(MetaDataCollector):
         # self.rdf_graph = rdf_graph
         self.accept_type = AcceptTypes.rdf
         self.pref_mime_type = pref_mime_type
+        # set while XML collectors run concurrently; XML responses are checked once they have finished
+        self.xml_parsed_event = None
 
     def getAllURIS(self, graph):
         founduris = []
@@ -204,8 +213,7 @@ class MetaDataCollectorRdf(MetaDataCollector):
         """
         # self.source_name = self.getEnumSourceNames().LINKED_DATA.value
         # self.logger.info('FsF-F2-01M : Trying to request RDF metadata from -: {}'.format(self.source_name))
-        rdf_metadata = dict()
-        rdf_response_graph = None
+        cache_key = None
         # if self.rdf_graph is None:
         if not self.json_ld_content and self.target_url:
             if not self.accept_type:
@@ -213,15 +221,15 @@ class MetaDataCollectorRdf(MetaDataCollector):
             requestHelper: RequestHelper = RequestHelper(self.target_url, self.logger)
             requestHelper.setAcceptType(self.accept_type)
             requestHelper.setAuthToken(self.auth_token, self.auth_token_type)
+            requestHelper.setCheckedContentKeys(self.checked_content_keys)
             if self.pref_mime_type:
                 requestHelper.addAcceptType(self.pref_mime_type)
             neg_format, rdf_response = requestHelper.content_negotiate("FsF-F2-01M")
             self.metadata_format = neg_format
             if requestHelper.checked_content_hash:
-                if (
-                    requestHelper.checked_content.get(requestHelper.checked_content_hash).get("checked")
-                    and "xml" in requestHelper.content_type
-                ):
+                if self.xml_parsed_event is not None and "xml" in str(requestHelper.content_type):
+                    self.xml_parsed_event.wait(60)
+                if requestHelper.is_content_checked() and "xml" in requestHelper.content_type:
                     requestHelper.response_content = None
                     self.logger.info("FsF-F2-01M : Ignoring RDF since content already has been parsed as XML")
             if requestHelper.response_content is not None:
@@ -232,6 +240,35 @@ class MetaDataCollectorRdf(MetaDataCollector):
             rdf_response = self.json_ld_content
         if self.content_type is not None:
             self.content_type = self.content_type.split(";", 1)[0]
+            # the parse result also depends on the collector settings and the base URL of relative IRIs
+            cache_key = self.get_parse_cache_key(
+                rdf_response,
+                self.content_type,
+                self.accept_type,
+                self.pref_mime_type,
+                self.resolved_url,
+                self.source_name,
+                bool(self.json_ld_content),
+            )
+        cached_parse = self.get_cached_parse(cache_key)
+        if cached_parse is not None:
+            rdf_metadata = cached_parse["metadata"]
+        else:
+            rdf_metadata = self.parse_rdf_response(rdf_response)
+            self.set_cached_parse(cache_key, rdf_metadata)
+        return self.source_name, rdf_metadata
+
+    def parse_rdf_response(self, rdf_response):
+        """Parse the metadata given a RDF (or JSON-LD) response.
+
+        Returns
+        ------
+        dict
+            a dictionary of metadata in RDF graph
+        """
+        rdf_metadata = dict()
+        rdf_response_graph = None
+        if self.content_type is not None:
             # handle JSON-LD
             json_types = ["application/ld+json", "application/json", "application/vnd.schemaorg.ld+json"]
             if self.content_type in json_types or self.pref_mime_type in json_types:
@@ -399,8 +436,7 @@ class MetaDataCollectorRdf(MetaDataCollector):
 
         if not rdf_metadata:
             rdf_metadata = self.get_metadata_from_graph(rdf_response_graph)
-
-        return self.source_name, rdf_metadata
+        return rdf_metadata
 
     def get_sparqled_metadata(self, g):
         """Get the default metadata given the RDF graph.
@@ -480,7 +516,7 @@ class MetaDataCollectorRdf(MetaDataCollector):
         elif meta.get("object_type"):
             # Ignore non CreativeWork schema.org types' metadata
             if "schema.org" in meta["object_type"]:
-                if meta["object_type"].split("/")[-1].lower() not in self.SCHEMA_ORG_CREATIVEWORKS:
+                if meta["object_type"].split("/")[-1].lower() not in Preprocessor.get_schema_org_creativeworks():
                     self.logger.info(
                         "FsF-F2-01M : Ignoring SPARQLed metadata: seems to be non CreativeWork schema.org type: "
                         + str(meta["object_type"])
@@ -1099,7 +1135,7 @@ class MetaDataCollectorRdf(MetaDataCollector):
                     try:
                         distgraph = rdflib.Graph()
                         disturl = str(dist)
-                        distresponse = requests.get(disturl, headers={"Accept": "application/rdf+xml"})
+                        distresponse = HTTPTransport.get(disturl, headers={"Accept": "application/rdf+xml"}, timeout=10)
                         if distresponse.text:
                             distgraph.parse(data=distresponse.text, format="application/rdf+xml")
                             extdist = list(distgraph[: RDF.type : DCAT.Distribution])
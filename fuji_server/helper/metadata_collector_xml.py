@@ -4,7 +4,7 @@
 
 import re
 
-import lxml
+import lxml.etree
 from idutils import is_url, is_urn
 
 from fuji_server.helper.metadata_collector import MetaDataCollector, MetadataFormats, MetadataOfferingMethods
@@ -29,11 +29,15 @@ class MetaDataCollectorXML(MetaDataCollector):
     --------
     parse_metadata()
         Method to parse the  XML metadata given the data
+    parse_xml(xml_response)
+        Method to parse the XML metadata from a XML document
     get_mapped_xml_metadata(tree, mapping)
         Get mapped xml metadata
 
     """
 
+    PARSE_CACHE_ATTRIBUTES = ["namespaces", "linked_namespaces"]
+
     def __init__(self, loggerinst, target_url=None, link_type="linked", pref_mime_type=None):
         """
         Parameters
@@ -88,13 +92,8 @@ class MetaDataCollectorXML(MetaDataCollector):
             a dictionary of XML metadata
         """
         xml_metadata = None
-        xml_mapping = None
-        metatree = None
-        envelope_metadata = {}
         self.content_type = "application/xml"
 
-        XSI = "http://www.w3.org/2001/XMLSchema-instance"
-
         if self.link_type == MetadataOfferingMethods.TYPED_LINKS:
             source_name = self.getEnumSourceNames().XML_TYPED_LINKS
         # elif self.link_type == 'guessed':
@@ -106,6 +105,7 @@ class MetaDataCollectorXML(MetaDataCollector):
         requestHelper = RequestHelper(self.target_url, self.logger)
         requestHelper.setAcceptType(AcceptTypes.xml)
         requestHelper.setAuthToken(self.auth_token, self.auth_token_type)
+        requestHelper.setCheckedContentKeys(self.checked_content_keys)
         if self.pref_mime_type:
             requestHelper.addAcceptType(self.pref_mime_type)
         # self.logger.info('FsF-F2-01M : Sending request to access metadata from -: {}'.format(self.target_url))
@@ -120,124 +120,149 @@ class MetaDataCollectorXML(MetaDataCollector):
                 self.logger.info("FsF-F2-01M : Expected XML but content negotiation responded -: " + str(neg_format))
             else:
                 self.is_xml = True
-                try:
-                    parser = lxml.etree.XMLParser(strip_cdata=False, recover=True)
-                    tree = lxml.etree.XML(xml_response, parser)
-                    root_element = tree.tag
-                    if root_element.endswith("}OAI-PMH"):
-                        self.logger.info(
-                            "FsF-F2-01M : Found OAI-PMH type XML envelope, unpacking 'metadata' element for further processing"
-                        )
-                        metatree = tree.find(".//{*}metadata/*")
-                    elif root_element.endswith("}mets"):
-                        self.logger.info(
-                            "FsF-F2-01M : Found METS type XML envelope, unpacking all 'xmlData' elements for further processing"
-                        )
-                        envelope_metadata = self.get_mapped_xml_metadata(tree, Mapper.XML_MAPPING_METS.value)
-                        metatree = tree.find(".//{*}dmdSec/{*}mdWrap/{*}xmlData/*")
-                    elif root_element.endswith("}GetRecordsResponse"):
-                        self.logger.info(
-                            "FsF-F2-01M : Found OGC CSW GetRecords type XML envelope, unpacking 'SearchResults' element for further processing"
-                        )
-                        metatree = tree.find(".//{*}SearchResults/*")
-                    elif root_element.endswith("}GetRecordByIdResponse"):
-                        self.logger.info(
-                            "FsF-F2-01M : Found OGC CSW GetRecordByIdResponse type XML envelope, unpacking metadata element for further processing"
-                        )
-                        metatree = tree.find(".//*")
-                    elif root_element.endswith("}DIDL"):
-                        self.logger.info(
-                            "FsF-F2-01M : Found DIDL (MPEG21) type XML envelope, unpacking metadata element for further processing"
-                        )
-                        metatree = tree.find(".//{*}Item/{*}Component/{*}Resource/*")
-                    else:
-                        metatree = tree
-                except Exception as e:
-                    self.logger.info("FsF-F2-01M : XML parsing failed -: " + str(e))
-                    print("FsF-F2-01M : XML parsing failed -: " + str(e))
-                if metatree is not None:
-                    # self.setURIValues(metatree)
-                    # print(list(set(self.getURIValues())))
-
-                    self.logger.info(
-                        "FsF-F2-01M : Found some XML properties, trying to identify (domain) specific format to parse"
-                    )
-                    root_namespace = None
-                    nsmatch = re.match(r"^\{(.+)\}(.+)$", metatree.tag)
-                    schema_locations = set(metatree.xpath("//*/@xsi:schemaLocation", namespaces={"xsi": XSI}))
-                    for schema_location in schema_locations:
-                        self.namespaces.extend(re.split(r"\s", re.sub(r"\s+", r" ", schema_location)))
-                        # self.namespaces = re.split('\s', schema_location)
-                    element_namespaces = set(metatree.xpath("//namespace::*"))
-                    for el_ns in element_namespaces:
-                        if len(el_ns) == 2:
-                            if el_ns[1] not in self.namespaces:
-                                self.namespaces.append(el_ns[1])
-                    if nsmatch:
-                        root_namespace = nsmatch[1]
-                        root_element = nsmatch[2]
-                        # put the root namespace at the start f list
-                        self.namespaces.insert(0, root_namespace)
-                    if root_element == "codeBook":
-                        xml_mapping = Mapper.XML_MAPPING_DDI_CODEBOOK.value
-                        self.logger.info("FsF-F2-01M : Identified DDI codeBook XML based on root tag")
-                        self.namespaces.append("ddi:codebook:2_5")
-                    elif root_element in ["StudyUnit", "DDIInstance"]:
-                        xml_mapping = Mapper.XML_MAPPING_DDI_STUDYUNIT.value
-                        self.logger.info("FsF-F2-01M : Identified DDI StudyUnit XML based on root tag")
-                        self.namespaces.append("ddi:studyunit:3_2")
-                    elif root_element == "CMD":
-                        xml_mapping = Mapper.XML_MAPPING_CMD.value
-                        self.logger.info("FsF-F2-01M : Identified Clarin CMDI XML based on root tag")
-                        self.namespaces.append("http://www.clarin.eu/cmd/")
-                    elif root_element == "DIF":
-                        xml_mapping = Mapper.XML_MAPPING_DIF.value
-                        self.logger.info(
-                            "FsF-F2-01M : Identified Directory Interchange Format (DIF) XML based on root tag"
-                        )
-                        self.namespaces.append("http://gcmd.gsfc.nasa.gov/Aboutus/xml/dif/")
-                    elif root_element == "dc" or any(
-                        "http://dublincore.org/schemas/xmls/" in s for s in self.namespaces
-                    ):
-                        xml_mapping = Mapper.XML_MAPPING_DUBLIN_CORE.value
-                        self.logger.info("FsF-F2-01M : Identified Dublin Core XML based on root tag or namespace")
-                        self.namespaces.append("http://purl.org/dc/elements/1.1/")
-                    elif root_element == "mods":
-                        xml_mapping = Mapper.XML_MAPPING_MODS.value
-                        self.logger.info("FsF-F2-01M : Identified MODS XML based on root tag")
-                        self.namespaces.append("http://www.loc.gov/mods/")
-                    elif root_element == "eml":
-                        xml_mapping = Mapper.XML_MAPPING_EML.value
-                        self.logger.info("FsF-F2-01M : Identified EML XML based on root tag")
-                        self.namespaces.append("eml://ecoinformatics.org/eml-2.0.0")
-                    elif root_element in ["MD_Metadata", "MI_Metadata"]:
-                        xml_mapping = Mapper.XML_MAPPING_GCMD_ISO.value
-                        self.logger.info("FsF-F2-01M : Identified ISO 19115 XML based on root tag")
-                        self.namespaces.append("http://www.isotc211.org/2005/gmd")
-                    elif root_element == "rss":
-                        self.logger.info("FsF-F2-01M : Identified RSS/GEORSS XML based on root tag")
-                        self.namespaces.append("http://www.georss.org/georss/")
-                    elif root_element == "ead":
-                        xml_mapping = Mapper.XML_MAPPING_EAD.value
-                        self.logger.info("FsF-F2-01M : Identified EAD XML based on root tag")
-                        self.namespaces.append("http://ead3.archivists.org/schema/")
-                    elif root_element == "TEI":
-                        xml_mapping = Mapper.XML_MAPPING_TEI.value
-                        self.logger.info("FsF-F2-01M : Identified TEI XML based on root tag")
-                        self.namespaces.append("http://www.tei-c.org/ns/1.0")
-                    elif root_namespace:
-                        if "datacite.org/schema" in root_namespace:
-                            xml_mapping = Mapper.XML_MAPPING_DATACITE.value
-                            self.logger.info("FsF-F2-01M : Identified DataCite XML based on namespace")
-                    # print('XML Details: ',(self.target_url,root_namespace, root_element, type(root_element),xml_mapping))
-                    linkeduris = self.getAllURIs(metatree)
-                    self.setLinkedNamespaces(linkeduris)
-                    if xml_mapping is None:
-                        self.logger.info("FsF-F2-01M : Could not identify (domain) specific XML format to parse")
+                cache_key = self.get_parse_cache_key(xml_response)
+                cached_parse = self.get_cached_parse(cache_key)
+                if cached_parse is not None:
+                    xml_metadata = cached_parse["metadata"]
                 else:
-                    self.logger.info(
-                        "FsF-F2-01M : Could not find XML properties, could not identify specific XML format to parse"
-                    )
+                    xml_metadata = self.parse_xml(xml_response)
+                    self.set_cached_parse(cache_key, xml_metadata)
+
+        if xml_metadata:
+            requestHelper.mark_content_checked()
+            self.logger.info("FsF-F2-01M : Found some metadata in XML -: " + (str(xml_metadata.keys())))
+        else:
+            self.logger.info("FsF-F2-01M : Could not identify metadata properties in XML")
+        return source_name, xml_metadata
+
+    def parse_xml(self, xml_response):
+        """Parse XML metadata, unpacks known envelopes and identifies the (domain) specific XML format.
+
+        Returns
+        ------
+        dict
+            a dictionary of XML metadata
+        """
+        xml_metadata = None
+        xml_mapping = None
+        metatree = None
+        envelope_metadata = {}
+        XSI = "http://www.w3.org/2001/XMLSchema-instance"
+
+        try:
+            parser = lxml.etree.XMLParser(strip_cdata=False, recover=True)
+            tree = lxml.etree.XML(xml_response, parser)
+            root_element = tree.tag
+            if root_element.endswith("}OAI-PMH"):
+                self.logger.info(
+                    "FsF-F2-01M : Found OAI-PMH type XML envelope, unpacking 'metadata' element for further processing"
+                )
+                metatree = tree.find(".//{*}metadata/*")
+            elif root_element.endswith("}mets"):
+                self.logger.info(
+                    "FsF-F2-01M : Found METS type XML envelope, unpacking all 'xmlData' elements for further processing"
+                )
+                envelope_metadata = self.get_mapped_xml_metadata(tree, Mapper.XML_MAPPING_METS.value)
+                metatree = tree.find(".//{*}dmdSec/{*}mdWrap/{*}xmlData/*")
+            elif root_element.endswith("}GetRecordsResponse"):
+                self.logger.info(
+                    "FsF-F2-01M : Found OGC CSW GetRecords type XML envelope, unpacking 'SearchResults' element for further processing"
+                )
+                metatree = tree.find(".//{*}SearchResults/*")
+            elif root_element.endswith("}GetRecordByIdResponse"):
+                self.logger.info(
+                    "FsF-F2-01M : Found OGC CSW GetRecordByIdResponse type XML envelope, unpacking metadata element for further processing"
+                )
+                metatree = tree.find(".//*")
+            elif root_element.endswith("}DIDL"):
+                self.logger.info(
+                    "FsF-F2-01M : Found DIDL (MPEG21) type XML envelope, unpacking metadata element for further processing"
+                )
+                metatree = tree.find(".//{*}Item/{*}Component/{*}Resource/*")
+            else:
+                metatree = tree
+        except Exception as e:
+            self.logger.info("FsF-F2-01M : XML parsing failed -: " + str(e))
+            print("FsF-F2-01M : XML parsing failed -: " + str(e))
+        if metatree is not None:
+            # self.setURIValues(metatree)
+            # print(list(set(self.getURIValues())))
+
+            self.logger.info(
+                "FsF-F2-01M : Found some XML properties, trying to identify (domain) specific format to parse"
+            )
+            root_namespace = None
+            nsmatch = re.match(r"^\{(.+)\}(.+)$", metatree.tag)
+            schema_locations = set(metatree.xpath("//*/@xsi:schemaLocation", namespaces={"xsi": XSI}))
+            for schema_location in schema_locations:
+                self.namespaces.extend(re.split(r"\s", re.sub(r"\s+", r" ", schema_location)))
+                # self.namespaces = re.split('\s', schema_location)
+            element_namespaces = set(metatree.xpath("//namespace::*"))
+            for el_ns in element_namespaces:
+                if len(el_ns) == 2:
+                    if el_ns[1] not in self.namespaces:
+                        self.namespaces.append(el_ns[1])
+            if nsmatch:
+                root_namespace = nsmatch[1]
+                root_element = nsmatch[2]
+                # put the root namespace at the start f list
+                self.namespaces.insert(0, root_namespace)
+            if root_element == "codeBook":
+                xml_mapping = Mapper.XML_MAPPING_DDI_CODEBOOK.value
+                self.logger.info("FsF-F2-01M : Identified DDI codeBook XML based on root tag")
+                self.namespaces.append("ddi:codebook:2_5")
+            elif root_element in ["StudyUnit", "DDIInstance"]:
+                xml_mapping = Mapper.XML_MAPPING_DDI_STUDYUNIT.value
+                self.logger.info("FsF-F2-01M : Identified DDI StudyUnit XML based on root tag")
+                self.namespaces.append("ddi:studyunit:3_2")
+            elif root_element == "CMD":
+                xml_mapping = Mapper.XML_MAPPING_CMD.value
+                self.logger.info("FsF-F2-01M : Identified Clarin CMDI XML based on root tag")
+                self.namespaces.append("http://www.clarin.eu/cmd/")
+            elif root_element == "DIF":
+                xml_mapping = Mapper.XML_MAPPING_DIF.value
+                self.logger.info("FsF-F2-01M : Identified Directory Interchange Format (DIF) XML based on root tag")
+                self.namespaces.append("http://gcmd.gsfc.nasa.gov/Aboutus/xml/dif/")
+            elif root_element == "dc" or any("http://dublincore.org/schemas/xmls/" in s for s in self.namespaces):
+                xml_mapping = Mapper.XML_MAPPING_DUBLIN_CORE.value
+                self.logger.info("FsF-F2-01M : Identified Dublin Core XML based on root tag or namespace")
+                self.namespaces.append("http://purl.org/dc/elements/1.1/")
+            elif root_element == "mods":
+                xml_mapping = Mapper.XML_MAPPING_MODS.value
+                self.logger.info("FsF-F2-01M : Identified MODS XML based on root tag")
+                self.namespaces.append("http://www.loc.gov/mods/")
+            elif root_element == "eml":
+                xml_mapping = Mapper.XML_MAPPING_EML.value
+                self.logger.info("FsF-F2-01M : Identified EML XML based on root tag")
+                self.namespaces.append("eml://ecoinformatics.org/eml-2.0.0")
+            elif root_element in ["MD_Metadata", "MI_Metadata"]:
+                xml_mapping = Mapper.XML_MAPPING_GCMD_ISO.value
+                self.logger.info("FsF-F2-01M : Identified ISO 19115 XML based on root tag")
+                self.namespaces.append("http://www.isotc211.org/2005/gmd")
+            elif root_element == "rss":
+                self.logger.info("FsF-F2-01M : Identified RSS/GEORSS XML based on root tag")
+                self.namespaces.append("http://www.georss.org/georss/")
+            elif root_element == "ead":
+                xml_mapping = Mapper.XML_MAPPING_EAD.value
+                self.logger.info("FsF-F2-01M : Identified EAD XML based on root tag")
+                self.namespaces.append("http://ead3.archivists.org/schema/")
+            elif root_element == "TEI":
+                xml_mapping = Mapper.XML_MAPPING_TEI.value
+                self.logger.info("FsF-F2-01M : Identified TEI XML based on root tag")
+                self.namespaces.append("http://www.tei-c.org/ns/1.0")
+            elif root_namespace:
+                if "datacite.org/schema" in root_namespace:
+                    xml_mapping = Mapper.XML_MAPPING_DATACITE.value
+                    self.logger.info("FsF-F2-01M : Identified DataCite XML based on namespace")
+            # print('XML Details: ',(self.target_url,root_namespace, root_element, type(root_element),xml_mapping))
+            linkeduris = self.getAllURIs(metatree)
+            self.setLinkedNamespaces(linkeduris)
+            if xml_mapping is None:
+                self.logger.info("FsF-F2-01M : Could not identify (domain) specific XML format to parse")
+        else:
+            self.logger.info(
+                "FsF-F2-01M : Could not find XML properties, could not identify specific XML format to parse"
+            )
         if xml_mapping and metatree is not None:
             xml_metadata = self.get_mapped_xml_metadata(metatree, xml_mapping)
 
@@ -249,15 +274,7 @@ class MetaDataCollectorXML(MetaDataCollector):
         # delete empty properties
         if xml_metadata:
             xml_metadata = {k: v for k, v in xml_metadata.items() if v}
-
-        if xml_metadata:
-            if requestHelper.checked_content_hash:
-                if requestHelper.checked_content.get(requestHelper.checked_content_hash):
-                    requestHelper.checked_content.get(requestHelper.checked_content_hash)["checked"] = True
-            self.logger.info("FsF-F2-01M : Found some metadata in XML -: " + (str(xml_metadata.keys())))
-        else:
-            self.logger.info("FsF-F2-01M : Could not identify metadata properties in XML")
-        return source_name, xml_metadata
+        return xml_metadata
 
     def get_tree_property_list(self, propcontent):
         res = []
@@ -5,7 +5,6 @@
 from urllib.error import HTTPError
 
 import rdflib
-from SPARQLWrapper import RDFXML, SPARQLExceptions, SPARQLWrapper
 
 from fuji_server.helper.metadata_provider import MetadataProvider
 
@@ -50,6 +49,8 @@ class SPARQLMetadataProvider(MetadataProvider):
             Content type of the result of SPARQL query
         """
 
+        from SPARQLWrapper import RDFXML, SPARQLExceptions, SPARQLWrapper
+
         wrapper = SPARQLWrapper(self.endpoint)
         wrapper.setQuery(queryString)
         wrapper.setReturnFormat(RDFXML)
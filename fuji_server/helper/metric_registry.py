@@ -0,0 +1,201 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from typing import NamedTuple
+
+import yaml
+from fuji_server.helper.preprocessor import Preprocessor
+
+
+class MetricSpecification(NamedTuple):
+    """Parsed and indexed content of a metrics YAML file, shared read-only by all assessments and requests"""
+
+    file_name: str
+    mtime: int
+    etag: str
+    config: dict
+    metric_specification: str | None
+    all_metrics_list: list
+    formatted_specification: dict
+    # (agnostic metric identifier, metric, metric tests with agnostic test identifiers) of all valid metrics
+    agnostic_metrics: tuple
+    # metric or metric test identifier -> metric
+    metric_index: dict
+    # wanted fields -> result of get_custom_metrics
+    custom_metrics: dict
+
+
+class MetricRegistry:
+    """
+    Process-wide registry of the metric specifications (metrics_v*.yaml). A file is parsed and indexed once, the
+    agnostic metric and test identifiers, the metric lookup table and the config are kept until the modification
+    time of the file changes. Parsing errors are logged once per file version, not per request
+
+    ...
+
+    Attributes
+    ----------
+    METRIC_REGEX : re.Pattern
+        Matches FsF or FAIR4RS metric identifiers
+    METRIC_TEST_REGEX : re.Pattern
+        Matches FsF or FAIR4RS metric test identifiers
+
+    Methods
+    -------
+    get_file_name(metric_input_file_name)
+        Returns (metric version, metrics YAML file name) of a metric version or file name or None
+    get_specification(metric_input_file_name)
+        Returns the MetricSpecification of a metric version or file name or None
+    get_custom_metrics(specification, wanted_fields)
+        Returns the metrics with the wanted fields keyed by their agnostic identifier
+    clear()
+        Removes all specifications
+    """
+
+    METRIC_REGEX = re.compile(r"^FsF-[FAIR][0-9]?(\.[0-9])?-[0-9]+[MD]+|FRSM-[0-9]+-[FAIR][0-9]?(\.[0-9])?")
+    METRIC_TEST_REGEX = re.compile(
+        r"FsF-[FAIR][0-9]?(\.[0-9])?-[0-9]+[MD]+(-[0-9\+]+[a-z]?)|^FRSM-[0-9]+-[FAIR][0-9]?(\.[0-9])?(?:-[a-zA-Z]+)?(-[0-9]+)?"
+    )
+    FILE_NAME_REGEX = re.compile(r"(metrics_v)?([0-9]+\.[0-9]+)(_[a-z]+)?(\.yaml)?")
+    logger = logging.getLogger(__name__)
+    _specifications = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def get_file_name(cls, metric_input_file_name):
+        ym = cls.FILE_NAME_REGEX.match(str(metric_input_file_name))
+        if not ym:
+            return None
+        metric_version = ym[2]
+        if ym[3]:
+            metric_version = ym[2] + ym[3]
+        metric_file_name = str(metric_input_file_name)
+        if not metric_file_name.endswith(".yaml"):
+            metric_file_name = metric_file_name + ".yaml"
+        if not metric_file_name.startswith("metrics_v"):
+            metric_file_name = "metrics_v" + metric_file_name
+        return metric_version, metric_file_name
+
+    @classmethod
+    def get_specification(cls, metric_input_file_name):
+        file_names = cls.get_file_name(metric_input_file_name)
+        if not file_names:
+            cls.logger.error("Invalid YAML File Name")
+            return None
+        path = os.path.join(Preprocessor.METRIC_YML_PATH, file_names[1])
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError as e:
+            print("ERROR: YAML LOADING ERROR -NOT FOUND")
+            cls.logger.error(e)
+            return None
+        specification = cls._specifications.get(path)
+        if specification is not None and specification.mtime == mtime:
+            return specification
+        with cls._lock:
+            specification = cls._specifications.get(path)
+            if specification is None or specification.mtime != mtime:
+                specification = cls.load(path, mtime)
+                if specification is None:
+                    return None
+                cls._specifications[path] = specification
+        return specification
+
+    @classmethod
+    def load(cls, path, mtime):
+        print("LOADING METRICS  ", path)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            specification = yaml.safe_load(content)
+        except (OSError, yaml.YAMLError) as e:
+            print("ERROR: YAML LOADING ERROR - YAML ERROR")
+            cls.logger.error(e)
+            return None
+        if not specification:
+            print("ERROR: YAML FILE DOES NOT EXIST")
+            return None
+        config = specification.get("config") or {}
+        all_metrics_list = specification.get("metrics")
+        formatted_specification = {}
+        if all_metrics_list:
+            print("NUMBER OF LOADED METRICS  ", len(all_metrics_list))
+            # expected output format of http://localhost:1071/uji/api/v1/metrics
+            formatted_specification = {"total": len(all_metrics_list), "metrics": all_metrics_list}
+        return MetricSpecification(
+            file_name=os.path.basename(path),
+            mtime=mtime,
+            etag=hashlib.sha256(content).hexdigest()[:32],
+            config=config,
+            metric_specification=config.get("metric_specification"),
+            all_metrics_list=all_metrics_list,
+            formatted_specification=formatted_specification,
+            agnostic_metrics=cls.get_agnostic_metrics(all_metrics_list),
+            metric_index=cls.get_metric_index(all_metrics_list),
+            custom_metrics={},
+        )
+
+    @classmethod
+    def get_agnostic_metrics(cls, all_metrics_list):
+        agnostic_metrics = []
+        if not all_metrics_list:
+            cls.logger.error("No YAML defined Metric seems to exist: metric yaml could be malformed")
+            return ()
+        for dictm in all_metrics_list:
+            tm = cls.METRIC_REGEX.search(str(dictm.get("metric_identifier")))
+            if not tm:
+                cls.logger.error("Invalid YAML defined Metric: " + str(dictm.get("metric_identifier")))
+                continue
+            metric_tests = dictm.get("metric_tests")
+            if isinstance(metric_tests, list):
+                agnostic_tests = []
+                for dictt in metric_tests:
+                    # copies, the served specification stays as defined in the YAML file
+                    dictt = dict(dictt)
+                    ttm = cls.METRIC_TEST_REGEX.search(str(dictt.get("metric_test_identifier")))
+                    if ttm:
+                        dictt["agnostic_test_identifier"] = ttm[0]
+                    else:
+                        cls.logger.error(
+                            "Invalid YAML defined Metric Test: " + str(dictt.get("metric_test_identifier"))
+                        )
+                    agnostic_tests.append(dictt)
+                metric_tests = agnostic_tests
+            agnostic_metrics.append((tm[0], dictm, metric_tests))
+        return tuple(agnostic_metrics)
+
+    @classmethod
+    def get_metric_index(cls, all_metrics_list):
+        metric_index = {}
+        for listed_metric in all_metrics_list or []:
+            metric_index[listed_metric.get("metric_identifier")] = listed_metric
+            for metric_test in listed_metric.get("metric_tests") or []:
+                metric_index[metric_test.get("metric_test_identifier")] = listed_metric
+        return metric_index
+
+    @classmethod
+    def get_custom_metrics(cls, specification, wanted_fields):
+        key = tuple(wanted_fields)
+        custom_metrics = specification.custom_metrics.get(key)
+        if custom_metrics is None:
+            custom_metrics = {}
+            for agnostic_identifier, dictm, metric_tests in specification.agnostic_metrics:
+                metric = {k: v for k, v in dictm.items() if k in wanted_fields}
+                if "metric_tests" in metric:
+                    metric["metric_tests"] = metric_tests
+                metric["agnostic_identifier"] = agnostic_identifier
+                metric["metric_identifier"] = dictm.get("metric_identifier")
+                custom_metrics[agnostic_identifier] = metric
+            specification.custom_metrics[key] = custom_metrics
+        return custom_metrics
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._specifications = {}
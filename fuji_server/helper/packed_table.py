@@ -0,0 +1,91 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import pickle
+from array import array
+from collections.abc import Mapping, Sequence
+
+
+class PackedRecords(Sequence):
+    """
+    Read-only list of records (dicts, lists, strings) which are pickled into one bytes buffer. Reading a record
+    only changes the reference count of the buffer object, not of the records, so the pages of a table loaded by
+    the master process stay shared (copy-on-write) with the forked workers (see PreforkServer). A list of dicts
+    instead has its pages copied by each worker as the objects are used. Records are unpickled on every access,
+    the returned objects are copies which may be modified
+
+    ...
+
+    Methods
+    -------
+    get_size()
+        Returns the size of the buffer in bytes
+    """
+
+    def __init__(self, records=()):
+        buffer = bytearray()
+        offsets = array("Q", [0])
+        for record in records:
+            buffer += pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+            offsets.append(len(buffer))
+        self._buffer = bytes(buffer)
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("record index out of range")
+        return pickle.loads(self._buffer[self._offsets[index] : self._offsets[index + 1]])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, str | bytes):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other, strict=True))
+
+    def get_size(self):
+        return len(self._buffer) + self._offsets.itemsize * len(self._offsets)
+
+
+class PackedTable(Mapping):
+    """
+    Read-only dict whose values are packed into PackedRecords, only the keys are kept as objects. Values are
+    unpickled on every access
+
+    ...
+
+    Methods
+    -------
+    get_size()
+        Returns the size of the packed values in bytes
+    """
+
+    def __init__(self, items=()):
+        items = dict(items)
+        self._positions = {key: position for position, key in enumerate(items)}
+        self._records = PackedRecords(items.values())
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __getitem__(self, key):
+        return self._records[self._positions[key]]
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def get_size(self):
+        return self._records.get_size()
@@ -0,0 +1,101 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import importlib.metadata
+import json
+import pickle
+
+from fuji_server.helper.content_cache import LRUContentCache, get_content_key
+
+
+class ParsedArtifactCache:
+    """
+    Process wide cache of parser outputs (extracted metadata dicts, namespaces, graph triples etc.) shared by all
+    assessments. Entries are keyed by the SHA-256 digest of the parsed content plus name and version of the parser,
+    content which has been seen before therefore is not parsed again. Entries are stored pickled so each hit
+    returns a fresh copy the caller may modify
+
+    ...
+
+    Attributes
+    ----------
+    max_size : int
+        Maximum total size of all pickled entries in bytes
+    ttl : int
+        Number of seconds a parse result is reused
+
+    Methods
+    -------
+    configure(max_size, ttl)
+        Sets the size and lifetime limits, drops all entries
+    get_package_version(name)
+        Returns the installed version of a parser library
+    get_key(content, parser, version, *context)
+        Returns the cache key of a parse result or None if the content can not be cached
+    get(key)
+        Returns a copy of the cached parse result or None
+    set(key, artifact)
+        Stores a parse result
+    """
+
+    max_size = 100000000
+    ttl = 3600
+    _cache = LRUContentCache(max_size, ttl)
+
+    @classmethod
+    def configure(cls, max_size=None, ttl=None):
+        if max_size is not None:
+            cls.max_size = int(max_size)
+        if ttl is not None:
+            cls.ttl = int(ttl)
+        cls._cache = LRUContentCache(cls.max_size, cls.ttl)
+
+    @staticmethod
+    def get_package_version(name):
+        # parser libraries are versioned by their distribution, a library upgrade invalidates its cached results
+        try:
+            return importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            return None
+
+    @classmethod
+    def get_digest(cls, content):
+        if isinstance(content, str):
+            content = content.encode("utf-8", errors="surrogatepass")
+        elif not isinstance(content, bytes):
+            # dicts or lists delivered e.g. by extruct
+            content = json.dumps(content, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(content).hexdigest()
+
+    @classmethod
+    def get_key(cls, content, parser, version, *context):
+        if not content:
+            return None
+        try:
+            return get_content_key(cls.get_digest(content), parser, version, *context)
+        except (TypeError, ValueError, UnicodeError):
+            return None
+
+    @classmethod
+    def get(cls, key):
+        if key is None:
+            return None
+        entry = cls._cache.get(key)
+        if entry is None:
+            return None
+        return pickle.loads(entry["response_content"])
+
+    @classmethod
+    def set(cls, key, artifact):
+        if key is None:
+            return
+        try:
+            cls._cache.set(key, {"response_content": pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL)})
+        except (pickle.PickleError, TypeError, AttributeError, RecursionError) as e:
+            print("Parsed artifact cache error: ", e)
+
+    @classmethod
+    def reset(cls):
+        cls._cache.clear()
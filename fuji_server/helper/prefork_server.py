@@ -0,0 +1,229 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import gc
+import os
+import signal
+import time
+
+import uvicorn
+
+from fuji_server.helper.identifier_helper import IdentifierHelper
+from fuji_server.helper.linked_vocab_helper import LinkedVocabMatcher
+from fuji_server.helper.metric_registry import MetricRegistry
+from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.reference_data_reloader import ReferenceDataReloader
+from fuji_server.helper.reference_data_snapshot import ReferenceDataSnapshot
+
+
+class PreforkServer:
+    """
+    Runs the F-UJI server in several worker processes which are forked from a master process after the reference
+    data (linked vocab index, identifiers.org data, licenses, metadata standards, schema.org context, metric
+    specifications etc.) has been loaded and indexed. The workers share the memory pages of the reference data
+    copy-on-write instead of each holding its own copy. To keep the pages shared the garbage collector is disabled
+    while the master loads the data and the data is moved to the permanent generation (gc.freeze) before forking,
+    collections in the workers then do not write to the objects of the master. This does not keep all pages shared:
+    reading an object in a worker still changes its reference count, so the pages of the objects a worker uses are
+    copied on their first use, only the pages of objects a worker never touches stay shared. The largest tables
+    (linked vocab index and its compiled entries, identifiers.org data, licenses) are therefore packed into single
+    buffers (see PackedTable) whose pages are not written by lookups. Crashed workers are restarted.
+    On SIGHUP (sent by a worker for POST /admin/reload) the master reloads the reference data and replaces the
+    workers one by one with workers forked from the reloaded master, so all workers serve the same data
+
+    ...
+
+    Attributes
+    ----------
+    workers : int
+        Number of worker processes, 1 runs the server in the master process without forking
+    graceful_timeout : int
+        Number of seconds the workers get to finish their requests on shutdown or replacement before they are killed
+    poll_interval : float
+        Number of seconds between two checks of the master for exited workers and reload requests
+    worker_number : int
+        Number (0 .. workers - 1) of the worker process, 0 in the master and without forking
+
+    Methods
+    -------
+    configure(workers)
+        Sets the number of workers, disables the garbage collector of the master if workers are forked
+    is_enabled()
+        Returns True if workers are forked
+    preload()
+        Loads and indexes all reference data and freezes it in the permanent generation of the garbage collector
+    run(app, host, port, post_fork)
+        Forks the workers serving the app on a shared socket and supervises them until SIGTERM or SIGINT, SIGHUP
+        reloads the reference data
+    reload(config, sock, post_fork)
+        Reloads the reference data and replaces the workers
+    replace(config, sock, post_fork)
+        Forks new workers and stops the previous ones
+    """
+
+    workers = 1
+    graceful_timeout = 30
+    poll_interval = 0.5
+    worker_number = 0
+    _children = {}
+    # pid -> time.monotonic() deadline of replaced workers which finish their requests
+    _retiring = {}
+    _stopping = False
+    _reload_requested = False
+
+    @classmethod
+    def configure(cls, workers=None):
+        if workers is not None:
+            cls.workers = max(1, int(workers))
+        if cls.is_enabled():
+            # objects allocated and freed while loading would leave holes in the pages shared with the workers
+            gc.disable()
+
+    @classmethod
+    def is_enabled(cls):
+        return cls.workers > 1 and hasattr(os, "fork")
+
+    @classmethod
+    def preload(cls):
+        # reference data which is otherwise parsed on first use, each worker would build its own copy of it
+        if not Preprocessor.linked_vocab_index or not Preprocessor.identifiers_org_data:
+            ReferenceDataSnapshot.retrieve_all()
+        IdentifierHelper.get_identifiers_org_patterns()
+        LinkedVocabMatcher.get_matcher(Preprocessor.linked_vocab_index).compile()
+        if Preprocessor.METRIC_YML_PATH:
+            for file_name in sorted(os.listdir(Preprocessor.METRIC_YML_PATH)):
+                if file_name.startswith("metrics_v") and file_name.endswith(".yaml"):
+                    MetricRegistry.get_specification(file_name)
+        # after a reload the previous tables are in the permanent generation
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        print("Reference data frozen for the workers, objects: ", gc.get_freeze_count())
+
+    @classmethod
+    def run(cls, app, host, port, post_fork=None):
+        config = uvicorn.Config(app, host=host, port=port)
+        sock = config.bind_socket()
+        cls._stopping = False
+        cls._reload_requested = False
+        signal.signal(signal.SIGTERM, cls.stop)
+        signal.signal(signal.SIGINT, cls.stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, cls.request_reload)
+        for number in range(cls.workers):
+            cls.spawn(number, config, sock, post_fork)
+        while cls._children:
+            if cls._reload_requested and not cls._stopping:
+                cls._reload_requested = False
+                cls.reload(config, sock, post_fork)
+            cls.kill_retiring()
+            try:
+                # polling, a blocking wait is resumed after the SIGHUP handler and would delay the reload
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            if not pid:
+                time.sleep(cls.poll_interval)
+                continue
+            if cls._retiring.pop(pid, None) is not None:
+                continue
+            number = cls._children.pop(pid, None)
+            if number is not None and not cls._stopping:
+                print(
+                    "Worker " + str(number) + " (" + str(pid) + ") exited with status " + str(status) + ", restarting"
+                )
+                time.sleep(1)
+                cls.spawn(number, config, sock, post_fork)
+        sock.close()
+
+    @classmethod
+    def spawn(cls, number, config, sock, post_fork=None):
+        pid = os.fork()
+        if pid:
+            cls._children[pid] = number
+            return
+        # worker process
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            if hasattr(signal, "SIGHUP"):
+                signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            cls._children = {}
+            cls._retiring = {}
+            cls.worker_number = number
+            gc.enable()
+            if post_fork:
+                post_fork()
+            print("Worker " + str(number) + " started: ", os.getpid())
+            uvicorn.Server(config).run(sockets=[sock])
+        except Exception as e:
+            print("Worker " + str(number) + " error: ", e)
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    @classmethod
+    def request_reload(cls, signum=None, frame=None):
+        # the reload runs in the main loop, not in the signal handler
+        cls._reload_requested = True
+
+    @classmethod
+    def reload(cls, config, sock, post_fork=None):
+        # the data is parsed once by the master, the replaced workers share it copy-on-write
+        if ReferenceDataReloader.reload():
+            cls.preload()
+            cls.replace(config, sock, post_fork)
+
+    @classmethod
+    def replace(cls, config, sock, post_fork=None):
+        # the new worker is started before the previous one is stopped, the socket is served during the replacement
+        for pid, number in list(cls._children.items()):
+            del cls._children[pid]
+            cls.spawn(number, config, sock, post_fork)
+            cls._retiring[pid] = time.monotonic() + cls.graceful_timeout
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        print("Workers replaced: ", len(cls._children))
+
+    @classmethod
+    def kill_retiring(cls):
+        now = time.monotonic()
+        for pid, deadline in list(cls._retiring.items()):
+            if now >= deadline:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    cls._retiring.pop(pid, None)
+
+    @classmethod
+    def stop(cls, signum=None, frame=None):
+        cls._stopping = True
+        # replaced workers which are still finishing their requests are stopped as well
+        cls._children.update(dict.fromkeys(cls._retiring))
+        cls._retiring = {}
+        for pid in list(cls._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                cls._children.pop(pid, None)
+        deadline = time.monotonic() + cls.graceful_timeout
+        while cls._children and time.monotonic() < deadline:
+            try:
+                pid, _status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                cls._children.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        for pid in list(cls._children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
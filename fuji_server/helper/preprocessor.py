@@ -2,9 +2,10 @@
 #
 # SPDX-License-Identifier: MIT
 
+import json
 import logging
 import mimetypes
-import time
+import threading
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -12,6 +13,7 @@ import requests
 
 import yaml
 from fuji_server.helper.linked_vocab_helper import LinkedVocabHelper
+from fuji_server.helper.packed_table import PackedRecords, PackedTable
 
 
 class Preprocessor:
@@ -34,8 +36,9 @@ class Preprocessor:
 
     schema_org_context = []
     schema_org_creativeworks = []
-    all_licenses = []
+    all_licenses = []  # PackedRecords once retrieved
     license_names = []
+    licenses = ([], [])  # (all_licenses, license_names) snapshot
     metadata_standards = {}  # key=subject,value =[standards name]
     metadata_standards_uris = {}  # some additional namespace uris and all uris from above as key
     all_file_formats = {}
@@ -45,11 +48,11 @@ class Preprocessor:
     access_rights = {}
     re3repositories: dict[str, str] = {}
     linked_vocabs = {}
-    linked_vocab_index = {}
+    linked_vocab_index = {}  # PackedTable domain -> {subdomain: entries} once retrieved
     default_namespaces = []
     standard_protocols = {}
     resource_types = []
-    identifiers_org_data = {}
+    identifiers_org_data = {}  # PackedTable prefix -> namespace once retrieved
     google_data_dois = []
     google_data_urls = []
     fuji_server_dir = Path(__file__).parent.parent  # project_root
@@ -62,9 +65,14 @@ class Preprocessor:
     remote_log_path = None
     verify_pids = False
     max_content_size = 5000000
+    assessment_timeout = None  # time budget of a single assessment in seconds, None for unlimited
+    data_harvest_timeout = 30  # time budget of the data harvesting phase of an assessment in seconds
     google_custom_search_id = None
     google_custom_search_api_key = None
     doi_prefixes = {}
+    reference_data_dir = None  # directory of the reference data refreshed by the ReferenceDataRefresher
+    # held while reloaded reference data is swapped in and while an assessment takes its tables
+    reference_data_lock = threading.RLock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -72,9 +80,15 @@ class Preprocessor:
         return cls._instance
 
     @classmethod
-    def set_mime_types(cls):
+    def set_mime_types(cls, mimes=None):
+        # mime-db data (downloaded by the ReferenceDataRefresher), without data the refreshed snapshot is loaded
         try:
-            mimes = requests.get("https://raw.githubusercontent.com/jshttp/mime-db/master/db.json").json()
+            if mimes is None:
+                mime_path = cls.get_reference_data_path("mime_db.json")
+                if not mime_path.exists():
+                    return
+                with open(mime_path) as f:
+                    mimes = json.load(f)
             for mime_type, mime_data in mimes.items():
                 if mime_data.get("extensions"):
                     for ext in mime_data.get("extensions"):
@@ -84,10 +98,32 @@ class Preprocessor:
         except Exception:
             cls.logger.warning("Loading additional mime types failed, will continue with standard set")
 
+    @classmethod
+    def set_reference_data_dir(cls, path):
+        cls.reference_data_dir = Path(path) if path else None
+
+    @classmethod
+    def get_reference_data_path(cls, filename):
+        # the snapshot refreshed by the ReferenceDataRefresher if there is one, otherwise the shipped file
+        if cls.reference_data_dir is not None:
+            refreshed_path = cls.reference_data_dir / filename
+            if refreshed_path.exists():
+                return refreshed_path
+        return cls.data_dir / filename
+
     @classmethod
     def set_max_content_size(cls, size):
         cls.max_content_size = int(size)
 
+    @classmethod
+    def set_assessment_timeout(cls, timeout):
+        cls.assessment_timeout = int(timeout) if timeout else None
+
+    @classmethod
+    def set_data_harvest_timeout(cls, timeout):
+        if timeout:
+            cls.data_harvest_timeout = int(timeout)
+
     @classmethod
     def set_remote_log_info(cls, host, path):
         if host:
@@ -126,11 +162,16 @@ class Preprocessor:
         with open(std_uri_path, encoding="utf-8") as f:
             identifiers_data = yaml.safe_load(f)
         if identifiers_data:
-            for namespace in identifiers_data["payload"]["namespaces"]:
-                cls.identifiers_org_data[namespace["prefix"]] = {
-                    "pattern": namespace["pattern"],
-                    "url_pattern": namespace["resources"][0]["urlPattern"],
-                }
+            cls.identifiers_org_data = PackedTable(
+                (
+                    namespace["prefix"],
+                    {
+                        "pattern": namespace["pattern"],
+                        "url_pattern": namespace["resources"][0]["urlPattern"],
+                    },
+                )
+                for namespace in identifiers_data["payload"]["namespaces"]
+            )
 
     @classmethod
     def get_resource_types(cls):
@@ -154,14 +195,15 @@ class Preprocessor:
         with open(std_uri_path) as f:
             data = yaml.safe_load(f)
         if data:
+            schema_org_context = []
             for context, schemadict in data.get("@context").items():
                 if isinstance(schemadict, dict):
                     schemauri = schemadict.get("@id")
                     if str(schemauri).startswith("schema:"):
-                        cls.schema_org_context.append(str(context).lower())
+                        schema_org_context.append(str(context).lower())
             bioschema_context = cls.get_schema_org_creativeworks()
-            cls.schema_org_context.extend(bioschema_context)
-            cls.schema_org_context = list(set(cls.schema_org_context))
+            schema_org_context.extend(bioschema_context)
+            cls.schema_org_context = list(set(schema_org_context))
 
     @classmethod
     def retrieve_schema_org_creativeworks(cls, include_bioschemas=True):
@@ -221,78 +263,42 @@ class Preprocessor:
 
     @classmethod
     def retrieve_datacite_re3repos(cls):
-        # retrieve all client id and re3data doi from datacite
-        isDebugMode = True
-        re3dict_path = cls.data_dir / "repodois.yaml"
-        repolistdate = re3dict_path.stat().st_mtime
-        try:
-            # update once a day
-            if time.time() - repolistdate >= 86400:
-                isDebugMode = False
-        except:
-            pass
-        if isDebugMode:
-            with open(re3dict_path) as f:
-                cls.re3repositories = yaml.safe_load(f)
-        else:
-            print("updating re3data dois")
-            p = {"query": "re3data_id:*"}
-            try:
-                req = requests.get(cls.DATACITE_API_REPO, params=p, headers=cls.header, timeout=5)
-                raw = req.json()
-                for r in raw["data"]:
-                    cls.re3repositories[r["id"]] = r["attributes"]["re3data"]
-                while "next" in raw["links"]:
-                    response = requests.get(raw["links"]["next"]).json()
-                    for r in response["data"]:
-                        cls.re3repositories[r["id"]] = r["attributes"]["re3data"]
-                    raw["links"] = response["links"]
-                # fix wrong entry
-                cls.re3repositories["bl.imperial"] = "http://doi.org/10.17616/R3K64N"
-                with open(re3dict_path, "w") as f2:
-                    yaml.safe_dump(cls.re3repositories, f2)
+        # client id and re3data doi of all repositories from datacite, updated by the ReferenceDataRefresher
+        with open(cls.get_reference_data_path("repodois.yaml")) as f:
+            cls.set_re3repositories(yaml.safe_load(f))
 
-            except requests.exceptions.RequestException as e:
-                re3dict_path.touch()
-                print("Preprocessor Error: " + str(e))
-                cls.logger.error(e)
+    @classmethod
+    def set_re3repositories(cls, repositories):
+        if repositories:
+            cls.re3repositories = repositories
 
     @classmethod
     def get_access_rights(cls):
+        if not cls.access_rights:
+            cls.retrieve_access_rights()
+        return cls.access_rights
+
+    @classmethod
+    def retrieve_access_rights(cls):
         data = None
         path = cls.data_dir / "access_rights.yaml"
         with path.open() as f:
             data = yaml.safe_load(f)
-        return data
+        if data:
+            cls.access_rights = data
 
     @classmethod
-    def retrieve_licenses(cls, isDebugMode):
-        data = None
-        path = cls.data_dir / "licenses.yaml"
+    def retrieve_licenses(cls):
         # The repository can be found at https://github.com/spdx/license-list-data
         # https://spdx.org/spdx-license-list/license-list-overview
-        if isDebugMode:  # use local file instead of downloading the file online
-            with open(path) as f:
-                data = yaml.safe_load(f)
-        else:
-            # cls.SPDX_URL = license_path
-            try:
-                r = requests.get(cls.SPDX_URL)
-                try:
-                    if r.status_code == 200:
-                        resp = r.json()
-                        data = resp["licenses"]
-                        for d in data:
-                            d["name"] = d["name"].lower()  # convert license name to lowercase
-                        with open(path, "w") as f:
-                            yaml.safe_dump(data, f)
-                except yaml.YAMLError as exc1:
-                    cls.logger.error(exc1)
-            except requests.exceptions.RequestException as exc2:
-                cls.logger.error(exc2)
+        # the online list is downloaded by the ReferenceDataRefresher, so always the local file is read here
+        with open(cls.get_reference_data_path("licenses.yaml")) as f:
+            cls.set_licenses(yaml.safe_load(f))
+
+    @classmethod
+    def set_licenses(cls, data):
         if data:
-            cls.all_licenses = data
-            for licenceitem in cls.all_licenses:
+            for licenceitem in data:
                 seeAlso = licenceitem.get("seeAlso")
                 # some cleanup to add modified licence URLs
                 for licenceurl in seeAlso:
@@ -305,8 +311,10 @@ class Preprocessor:
                     if licenceurl.endswith("/legalcode"):
                         altURL = licenceurl.replace("/legalcode", "")
                         seeAlso.append(altURL)
+            # assessments read both lists together by get_licenses()
+            cls.licenses = (PackedRecords(data), [d["name"] for d in data if "name" in d])
+            cls.all_licenses, cls.license_names = cls.licenses
             cls.total_licenses = len(data)
-            cls.license_names = [d["name"] for d in data if "name" in d]
             # referenceNumber = [r['referenceNumber'] for r in data if 'referenceNumber' in r]
             # seeAlso = [s['seeAlso'] for s in data if 'seeAlso' in s]
             # cls.license_urls = dict(zip(referenceNumber, seeAlso))
@@ -413,10 +421,11 @@ class Preprocessor:
 
     @classmethod
     def retrieve_linked_vocab_index(cls):
-        lov_helper = LinkedVocabHelper()
+        # a new index, the index of a running assessment is not modified
+        lov_helper = LinkedVocabHelper({})
         lov_helper.set_linked_vocab_index()
         cls.linked_vocabs = list(set(lov_helper.namespaces))
-        cls.linked_vocab_index = lov_helper.linked_vocab_index
+        cls.linked_vocab_index = PackedTable(lov_helper.linked_vocab_index)
 
     @classmethod
     def retrieve_doi_prefixes(cls):
@@ -424,8 +433,9 @@ class Preprocessor:
         prf_path = cls.data_dir / "doi_prefixes.tsv"
         with open(prf_path) as f:
             for line in f:
-                key, value = line.strip().split("\t")
-                data[key] = value
+                if line.strip():
+                    key, value = line.strip().split("\t")
+                    data[key.lower()] = value
         if data:
             cls.doi_prefixes = data
 
@@ -454,8 +464,8 @@ class Preprocessor:
     @classmethod
     def get_licenses(cls):
         if not cls.all_licenses:
-            cls.retrieve_licenses(True)
-        return cls.all_licenses, cls.license_names
+            cls.retrieve_licenses()
+        return cls.licenses
 
     @classmethod
     def getRE3repositories(cls):
@@ -538,12 +548,3 @@ class Preprocessor:
         if not cls.doi_prefixes:
             cls.retrieve_doi_prefixes()
         return cls.doi_prefixes
-
-    @classmethod
-    def add_doi_prefix(cls, prefix, authority) -> object:
-        prf_path = cls.data_dir / "doi_prefixes.tsv"
-        if prefix not in cls.doi_prefixes:
-            cls.doi_prefixes[prefix] = authority
-            with open(prf_path, "a+") as f:
-                f.write("\n" + prefix + "\t" + authority)
-        return True
@@ -0,0 +1,137 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from fuji_server.helper.sqlite_store import SQLiteStore
+
+
+class RedirectChainCache:
+    """
+    TTL cache of PID resolutions (PID -> landing page redirect chains) shared by all assessments.
+    Entries are keyed by the normalized PID (see IdentifierHelper.get_resolution_key) and contain the final URL as
+    well as the redirect and status lists of the resolver hops so that a cached resolution can be replayed without
+    requesting the resolver again. Resolutions are kept in memory of the process and, if a file is configured, in a
+    SQLite database shared by all worker processes, each row with its own expiry time. Resolutions found in the
+    shared database are promoted to the memory of the process
+
+    ...
+
+    Attributes
+    ----------
+    ttl : int
+        Number of seconds a resolution is reused
+    max_entries : int
+        Maximum number of cached resolutions, the least recently stored ones are dropped first
+
+    Methods
+    -------
+    configure(ttl, max_entries, path)
+        Sets the lifetime and number of resolutions and the database file shared by the worker processes
+    get(key)
+        Returns a copy of the cached redirect chain or None
+    set(key, chain)
+        Stores a redirect chain
+    evict()
+        Removes expired resolutions from the database and shrinks it to max_entries
+    """
+
+    ttl = 86400
+    max_entries = 50000
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+    _store = SQLiteStore(
+        "PID resolution cache",
+        [
+            "CREATE TABLE IF NOT EXISTS resolutions (key TEXT PRIMARY KEY, chain TEXT, expires REAL)",
+            "CREATE INDEX IF NOT EXISTS resolutions_expires ON resolutions (expires)",
+        ],
+    )
+
+    @classmethod
+    def configure(cls, ttl=None, max_entries=None, path=None):
+        if ttl is not None:
+            cls.ttl = int(ttl)
+        if max_entries is not None:
+            cls.max_entries = int(max_entries)
+        cls._store.configure(path)
+
+    @classmethod
+    def get(cls, key):
+        if not key:
+            return None
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del cls._entries[key]
+                entry = None
+        if entry is None:
+            entry = cls.get_shared(key)
+            if entry is None:
+                return None
+            cls.set_local(key, *entry)
+        return {k: list(v) if isinstance(v, list) else v for k, v in entry[1].items()}
+
+    @classmethod
+    def get_shared(cls, key):
+        # returns (monotonic expiry, chain) of a resolution stored by any worker process or None
+        if not cls._store.is_enabled():
+            return None
+        try:
+            now = time.time()
+            row = cls._store.execute(
+                "SELECT chain, expires FROM resolutions WHERE key = ? AND expires > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            chain = json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            cls._store.print_error(e)
+            return None
+        chain["redirect_status_list"] = [tuple(r) for r in chain.get("redirect_status_list") or []]
+        return time.monotonic() + row[1] - now, chain
+
+    @classmethod
+    def set_local(cls, key, expires, chain):
+        with cls._lock:
+            cls._entries[key] = (expires, chain)
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > cls.max_entries:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def set(cls, key, chain):
+        if not key or not chain.get("redirect_url"):
+            return
+        cls.set_local(key, time.monotonic() + cls.ttl, chain)
+        if not cls._store.is_enabled():
+            return
+        try:
+            with cls._store.lock:
+                cls._store.execute(
+                    "INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?)",
+                    (key, json.dumps(chain), time.time() + cls.ttl),
+                )
+                if cls._store.is_eviction_due():
+                    cls.evict()
+        except (sqlite3.Error, TypeError) as e:
+            cls._store.print_error(e)
+
+    @classmethod
+    def evict(cls):
+        with cls._store.lock:
+            cls._store.execute("DELETE FROM resolutions WHERE expires <= ?", (time.time(),))
+            cls._store.execute(
+                "DELETE FROM resolutions WHERE key NOT IN (SELECT key FROM resolutions ORDER BY expires DESC LIMIT ?)",
+                (cls.max_entries,),
+            )
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._entries = OrderedDict()
@@ -0,0 +1,317 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+
+import yaml
+from fuji_server.helper.http_transport import HTTPTransport
+from fuji_server.helper.preprocessor import Preprocessor
+
+
+class ReferenceDataRefresher:
+    """
+    Background refresher of the reference datasets F-UJI downloads from external services (DataCite repositories,
+    SPDX licenses, mime-db). Datasets are requested with conditional GETs, paged APIs are fetched in parallel and
+    completely as a 304 of one page says nothing about the other pages.
+    A downloaded dataset is written as snapshot file (atomically replaced) into the reference data directory and
+    swapped into the Preprocessor in one assignment, assessments only read the snapshot which is ready.
+    The shipped files in fuji_server/data are never changed. With pre-forked workers only one worker runs the
+    refresher, its update handler asks the master to reload the snapshots for all workers (see PreforkServer)
+
+    ...
+
+    Attributes
+    ----------
+    reference_data_dir : str
+        Directory of the refreshed snapshots and of the refresh state file, None disables refreshing
+    interval : int
+        Number of seconds after which a dataset is refreshed
+    retry_interval : int
+        Number of seconds after which a failed refresh is retried
+    stale_after : int
+        Age (seconds) after which a dataset is reported as stale
+    timeout : int
+        Timeout (seconds) of the requests
+    update_handler : callable
+        Called without arguments after datasets have been updated or None
+
+    Methods
+    -------
+    configure(reference_data_dir, interval, stale_after)
+        Sets the snapshot directory and the refresh intervals
+    set_update_handler(update_handler)
+        Sets the function called after datasets have been updated
+    refresh(name)
+        Refreshes a dataset, returns True if the dataset is up to date
+    refresh_due()
+        Refreshes all datasets which are due
+    start()
+        Starts the background refresher thread
+    stop()
+        Stops the background refresher thread
+    get_status()
+        Returns the age and staleness of all datasets
+    """
+
+    DATASETS = {
+        "datacite_repositories": "repodois.yaml",
+        "spdx_licenses": "licenses.yaml",
+        "mime_types": "mime_db.json",
+    }
+    # datasets fetched from several pages of an API, not requested conditionally
+    PAGED_DATASETS = ["datacite_repositories"]
+    MIME_DB_URL = "https://raw.githubusercontent.com/jshttp/mime-db/master/db.json"
+    STATE_FILE = "refresh_state.json"
+    reference_data_dir = None
+    interval = 86400
+    retry_interval = 3600
+    stale_after = 259200
+    timeout = 30
+    page_size = 1000
+    check_interval = 60  # seconds between two checks for due datasets
+    update_handler = None
+    _state = {}
+    _thread = None
+    _stop = threading.Event()
+    _lock = threading.RLock()
+
+    @classmethod
+    def configure(cls, reference_data_dir=None, interval=None, stale_after=None):
+        with cls._lock:
+            if interval is not None:
+                cls.interval = int(interval)
+            if stale_after is not None:
+                cls.stale_after = int(stale_after)
+            cls.reference_data_dir = reference_data_dir or None
+            Preprocessor.set_reference_data_dir(cls.reference_data_dir)
+            cls._state = cls.load_state()
+
+    @classmethod
+    def set_update_handler(cls, update_handler):
+        cls.update_handler = update_handler
+
+    @classmethod
+    def load_state(cls):
+        # validators (ETag, Last-Modified) and timestamps of the refreshed datasets
+        if cls.reference_data_dir:
+            try:
+                with open(os.path.join(cls.reference_data_dir, cls.STATE_FILE)) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    @classmethod
+    def write_file(cls, filename, content):
+        # atomic replacement, readers see either the previous or the new file
+        os.makedirs(cls.reference_data_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cls.reference_data_dir, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, os.path.join(cls.reference_data_dir, filename))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def read_file(cls, filename):
+        try:
+            with open(os.path.join(cls.reference_data_dir, filename), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @classmethod
+    def get_headers(cls, name):
+        headers = {"Accept": "application/json"}
+        if name in cls.PAGED_DATASETS:
+            return headers
+        state = cls._state.get(name, {})
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    @classmethod
+    def get_json(cls, url, params=None, headers=None):
+        response = HTTPTransport.get(url, params=params, headers=headers, timeout=cls.timeout)
+        if response.status_code == 200:
+            return response, response.json()
+        return response, None
+
+    @classmethod
+    def fetch_datacite_repositories(cls, headers):
+        # client id -> re3data DOI of all DataCite repositories registered in re3data
+        params = {"query": "re3data_id:*", "page[size]": cls.page_size, "page[number]": 1}
+        response, first_page = cls.get_json(Preprocessor.DATACITE_API_REPO, params, headers)
+        if first_page is None:
+            return response, None
+        total_pages = int(first_page.get("meta", {}).get("totalPages") or 1)
+        executor = HTTPTransport.get_executor()
+        futures = [
+            executor.submit(cls.get_json, Preprocessor.DATACITE_API_REPO, dict(params, **{"page[number]": number}))
+            for number in range(2, total_pages + 1)
+        ]
+        pages = [first_page]
+        for future in futures:
+            page_response, page = future.result()
+            if page is None:
+                raise OSError("DataCite repository page request failed: " + str(page_response.status_code))
+            pages.append(page)
+        repositories = {r["id"]: r["attributes"]["re3data"] for page in pages for r in page["data"]}
+        # fix wrong entry
+        repositories["bl.imperial"] = "http://doi.org/10.17616/R3K64N"
+        return response, repositories
+
+    @classmethod
+    def fetch_spdx_licenses(cls, headers):
+        response, data = cls.get_json(Preprocessor.SPDX_URL, headers=headers)
+        if data is None:
+            return response, None
+        licenses = data["licenses"]
+        for license in licenses:
+            license["name"] = license["name"].lower()  # convert license name to lowercase
+        return response, licenses
+
+    @classmethod
+    def fetch_mime_types(cls, headers):
+        return cls.get_json(cls.MIME_DB_URL, headers=headers)
+
+    @classmethod
+    def apply(cls, name, data):
+        if name == "datacite_repositories":
+            Preprocessor.set_re3repositories(data)
+        elif name == "spdx_licenses":
+            Preprocessor.set_licenses(data)
+        elif name == "mime_types":
+            Preprocessor.set_mime_types(data)
+
+    @classmethod
+    def serialize(cls, name, data):
+        if cls.DATASETS[name].endswith(".json"):
+            return json.dumps(data)
+        return yaml.safe_dump(data)
+
+    @classmethod
+    def refresh(cls, name):
+        if not cls.reference_data_dir:
+            return False
+        fetch = getattr(cls, "fetch_" + name)
+        with cls._lock:
+            state = dict(cls._state.get(name, {}))
+            state["checked"] = time.time()
+            try:
+                response, data = fetch(cls.get_headers(name))
+                if response.status_code == 304:
+                    state["refreshed"] = state["checked"]
+                elif data and cls.read_file(cls.DATASETS[name]) == cls.serialize(name, data):
+                    # unchanged data of a dataset which is not requested conditionally (paged)
+                    state.update(refreshed=state["checked"], entries=len(data))
+                elif data:
+                    # the snapshot file is written before the swap, a restarted server continues with it
+                    cls.write_file(cls.DATASETS[name], cls.serialize(name, data))
+                    cls.apply(name, data)
+                    state.update(
+                        refreshed=state["checked"],
+                        updated=state["checked"],
+                        entries=len(data),
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    )
+                else:
+                    raise OSError("unexpected response status: " + str(response.status_code))
+                state["error"] = None
+            except Exception as e:
+                print("Reference data refresh error (" + name + "): ", e)
+                Preprocessor.logger.warning("Reference data refresh failed for " + name + ": " + str(e))
+                state["error"] = str(e)
+            cls._state[name] = state
+            try:
+                cls.write_file(cls.STATE_FILE, json.dumps(cls._state))
+            except OSError as e:
+                print("Reference data state error: ", e)
+            return state["error"] is None
+
+    @classmethod
+    def is_due(cls, name):
+        state = cls._state.get(name, {})
+        interval = cls.retry_interval if state.get("error") else cls.interval
+        return time.time() - max(state.get("checked", 0), state.get("refreshed", 0)) >= interval
+
+    @classmethod
+    def refresh_due(cls):
+        updated = False
+        for name in cls.DATASETS:
+            if cls._stop.is_set():
+                break
+            if cls.is_due(name):
+                previous = cls._state.get(name, {}).get("updated")
+                cls.refresh(name)
+                updated = updated or cls._state.get(name, {}).get("updated") != previous
+        if updated and cls.update_handler:
+            # once for all datasets updated in this round
+            try:
+                cls.update_handler()
+            except Exception as e:
+                print("Reference data update handler error: ", e)
+
+    @classmethod
+    def run(cls):
+        while not cls._stop.is_set():
+            cls.refresh_due()
+            cls._stop.wait(cls.check_interval)
+
+    @classmethod
+    def start(cls):
+        with cls._lock:
+            if not cls.reference_data_dir or (cls._thread is not None and cls._thread.is_alive()):
+                return
+            # a (re)started worker continues with the state written by its predecessor
+            cls._state = cls.load_state()
+            cls._stop.clear()
+            cls._thread = threading.Thread(target=cls.run, name="fuji-reference-data", daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def stop(cls):
+        cls._stop.set()
+        thread = cls._thread
+        if thread is not None:
+            thread.join(cls.timeout)
+        cls._thread = None
+
+    @classmethod
+    def get_status(cls):
+        now = time.time()
+        running = cls._thread is not None and cls._thread.is_alive()
+        # workers which do not run the refresher report the state written by the one which does
+        states = cls._state if running else cls.load_state() or cls._state
+        datasets = {}
+        for name, filename in cls.DATASETS.items():
+            state = states.get(name, {})
+            refreshed = state.get("refreshed")
+            if refreshed is None and (Preprocessor.data_dir / filename).exists():
+                # shipped data, its age is the one of the file
+                refreshed = (Preprocessor.data_dir / filename).stat().st_mtime
+            datasets[name] = {
+                "source": "refreshed" if state.get("refreshed") else ("shipped" if refreshed else "none"),
+                "refreshed": (
+                    datetime.datetime.fromtimestamp(refreshed, datetime.UTC).isoformat() if refreshed else None
+                ),
+                "age": int(now - refreshed) if refreshed else None,
+                "stale": refreshed is None or now - refreshed > cls.stale_after,
+                "entries": state.get("entries"),
+                "error": state.get("error"),
+            }
+        return {
+            "refresher_running": running,
+            "datasets": datasets,
+        }
@@ -0,0 +1,171 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import datetime
+import json
+import os
+import signal
+import threading
+import time
+
+from fuji_server.helper.doi_prefix_index import DOIPrefixIndex
+from fuji_server.helper.identifier_helper import IdentifierHelper
+from fuji_server.helper.linked_vocab_helper import LinkedVocabMatcher
+from fuji_server.helper.metric_registry import MetricRegistry
+from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.reference_data_snapshot import ReferenceDataSnapshot
+
+
+class ReferenceDataReloader:
+    """
+    Reloads the reference data (metadata standards, licenses, linked vocabs, file formats, identifiers.org data etc.)
+    and the metric specifications without restarting the server. The files are parsed in a background thread into a
+    staging copy of the Preprocessor, the live tables are not touched until all files have been parsed, then all
+    tables are swapped in at once. Assessments take their tables at their start (see FAIRCheck) and keep them until
+    they are finished, a reload only affects assessments started after the swap. Pre-forked workers do not reload
+    themselves, they ask the master process which reloads the data once and replaces the workers (see PreforkServer)
+
+    ...
+
+    Attributes
+    ----------
+    snapshot_path : str
+        Path of the reference data snapshot which is rewritten after a reload or None
+    state_path : str
+        Path of a JSON file with the state of the last reload shared by the master and its workers or None
+    master_pid : int
+        Process id of the master which reloads the data for all workers or None if this process reloads itself
+
+    Methods
+    -------
+    configure(snapshot_path, state_path)
+        Sets the reference data snapshot to be rewritten after a reload and the shared state file
+    set_master(master_pid)
+        Sets the master process which is asked (SIGHUP) to reload the data
+    reload()
+        Parses the reference data and swaps it in, returns True on success
+    start()
+        Starts a reload in the background (or in the master), returns False if a reload is already running
+    get_status()
+        Returns the state of the last reload
+    """
+
+    snapshot_path = None
+    state_path = None
+    master_pid = None
+    _thread = None
+    _state = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, snapshot_path=None, state_path=None):
+        cls.snapshot_path = snapshot_path or None
+        cls.state_path = state_path or None
+        cls.master_pid = None
+
+    @classmethod
+    def set_master(cls, master_pid):
+        cls.master_pid = master_pid
+
+    @classmethod
+    def set_state(cls, state):
+        cls._state = state
+        if cls.state_path:
+            try:
+                # atomic replacement, the workers read either the previous or the new state
+                tmp_path = cls.state_path + "." + str(os.getpid())
+                with open(tmp_path, "w") as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, cls.state_path)
+            except OSError as e:
+                print("Reference data reload state error: ", e)
+
+    @classmethod
+    def get_state(cls):
+        if cls.state_path:
+            try:
+                with open(cls.state_path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return cls._state
+
+    @classmethod
+    def get_staging_preprocessor(cls):
+        # subclass with empty tables, the retrieve methods assign their results to it instead of the Preprocessor
+        tables = {attribute: type(getattr(Preprocessor, attribute))() for attribute in ReferenceDataSnapshot.ATTRIBUTES}
+        tables["re3repositories"] = {}
+        return type("StagingPreprocessor", (Preprocessor,), tables)
+
+    @classmethod
+    def swap(cls, staging):
+        with Preprocessor.reference_data_lock:
+            for attribute in [*ReferenceDataSnapshot.ATTRIBUTES, "re3repositories"]:
+                setattr(Preprocessor, attribute, getattr(staging, attribute))
+            # tables derived from the reference data are rebuilt on their next use
+            IdentifierHelper.reset()
+            DOIPrefixIndex.reset()
+            LinkedVocabMatcher.reset()
+            MetricRegistry.clear()
+
+    @classmethod
+    def reload(cls):
+        started = time.time()
+        state = {"started": started, "running": True}
+        cls.set_state(state)
+        try:
+            sources = ReferenceDataSnapshot.get_fingerprint()
+            staging = cls.get_staging_preprocessor()
+            ReferenceDataSnapshot.retrieve_all(staging)
+            staging.retrieve_datacite_re3repos()
+            cls.swap(staging)
+            # mime types refreshed by the ReferenceDataRefresher
+            Preprocessor.set_mime_types()
+            if cls.snapshot_path:
+                # a restarted server loads the reloaded data instead of parsing the files again
+                ReferenceDataSnapshot.write(
+                    cls.snapshot_path,
+                    {
+                        "version": ReferenceDataSnapshot.get_version(),
+                        "sources": sources,
+                        "data": {
+                            attribute: getattr(staging, attribute) for attribute in ReferenceDataSnapshot.ATTRIBUTES
+                        },
+                    },
+                )
+            state["error"] = None
+            Preprocessor.logger.info("Reference data reloaded in {:.1f} s".format(time.time() - started))
+        except Exception as e:
+            print("Reference data reload error: ", e)
+            Preprocessor.logger.warning("Reference data reload failed, continuing with the current data: " + str(e))
+            state["error"] = str(e)
+        state.update(running=False, finished=time.time())
+        cls.set_state(state)
+        return state["error"] is None
+
+    @classmethod
+    def start(cls):
+        with cls._lock:
+            if cls.master_pid:
+                # the master reloads the data once for all workers and replaces them
+                if cls.get_state().get("running"):
+                    return False
+                cls.set_state({"started": time.time(), "running": True})
+                os.kill(cls.master_pid, signal.SIGHUP)
+                return True
+            if cls._thread is not None and cls._thread.is_alive():
+                return False
+            cls.set_state({"started": time.time(), "running": True})
+            cls._thread = threading.Thread(target=cls.reload, name="fuji-reference-data-reload", daemon=True)
+            cls._thread.start()
+            return True
+
+    @classmethod
+    def get_status(cls):
+        state = dict(cls.get_state())
+        state.setdefault("running", False)
+        for key in ["started", "finished"]:
+            if state.get(key):
+                state[key] = datetime.datetime.fromtimestamp(state[key], datetime.UTC).isoformat()
+        return state
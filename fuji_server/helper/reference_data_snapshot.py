@@ -0,0 +1,156 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import os
+import pickle
+import tempfile
+
+from fuji_server.helper.parsed_artifact_cache import ParsedArtifactCache
+from fuji_server.helper.preprocessor import Preprocessor
+
+
+class ReferenceDataSnapshot:
+    """
+    Binary snapshot of the reference data the Preprocessor parses from the YAML, JSON and text files in
+    fuji_server/data (identifiers.org namespaces, linked vocab index, licenses, file formats, metadata standards etc.).
+    The snapshot contains the final lookup structures and is loaded with one unpickling instead of parsing about
+    11 MB of source files. It is versioned and records size and modification time of all source files, a snapshot
+    which does not match the installed F-UJI version or the current source files is stale and not loaded
+
+    ...
+
+    Attributes
+    ----------
+    FORMAT_VERSION : int
+        Version of the snapshot layout, to be increased if ATTRIBUTES or their structures change
+    ATTRIBUTES : list
+        Preprocessor attributes contained in the snapshot
+    SOURCE_FILES : list
+        Files in fuji_server/data the attributes are built from (additionally the linked vocab files and licenses)
+
+    Methods
+    -------
+    build(path)
+        Parses all source files and writes the snapshot
+    load(path)
+        Sets the Preprocessor attributes from the snapshot, returns False if the snapshot is missing or stale
+    """
+
+    FORMAT_VERSION = 3
+    ATTRIBUTES = [
+        "identifiers_org_data",
+        "resource_types",
+        "schema_org_creativeworks",
+        "schema_org_context",
+        "metadata_standards",
+        "all_file_formats",
+        "science_file_formats",
+        "long_term_file_formats",
+        "open_file_formats",
+        "standard_protocols",
+        "default_namespaces",
+        "linked_vocabs",
+        "linked_vocab_index",
+        "doi_prefixes",
+        "licenses",
+        "all_licenses",
+        "license_names",
+        "total_licenses",
+        "access_rights",
+    ]
+    SOURCE_FILES = [
+        "identifiers_org_resolver_data.yaml",
+        "ResourceTypes.txt",
+        "creativeworktypes.txt",
+        "bioschemastypes.txt",
+        "jsonldcontext.yaml",
+        "metadata_standards.yaml",
+        "file_formats.yaml",
+        "standard_uri_protocols.yaml",
+        "default_namespaces.txt",
+        "doi_prefixes.tsv",
+        "access_rights.yaml",
+    ]
+
+    @classmethod
+    def get_version(cls):
+        return cls.FORMAT_VERSION, ParsedArtifactCache.get_package_version("fuji")
+
+    @classmethod
+    def get_source_paths(cls):
+        paths = [Preprocessor.data_dir / filename for filename in cls.SOURCE_FILES]
+        paths.extend(sorted((Preprocessor.data_dir / "linked_vocabs").glob("*.json")))
+        # licenses may have been refreshed by the ReferenceDataRefresher
+        paths.append(Preprocessor.get_reference_data_path("licenses.yaml"))
+        return paths
+
+    @classmethod
+    def get_fingerprint(cls):
+        fingerprint = {}
+        for path in cls.get_source_paths():
+            try:
+                stat = path.stat()
+                fingerprint[str(path)] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                fingerprint[str(path)] = None
+        return fingerprint
+
+    @classmethod
+    def retrieve_all(cls, preprocessor=Preprocessor):
+        # preprocessor may be a subclass of the Preprocessor the data is retrieved into (see ReferenceDataReloader)
+        preprocessor.retrieve_identifiers_org_data()
+        preprocessor.retrieve_resource_types()
+        preprocessor.retrieve_schema_org_creativeworks()
+        preprocessor.retrieve_schema_org_context()
+        preprocessor.retrieve_metadata_standards()
+        preprocessor.retrieve_all_file_formats()
+        preprocessor.retrieve_science_file_formats(True)
+        preprocessor.retrieve_long_term_file_formats(True)
+        preprocessor.retrieve_open_file_formats(True)
+        preprocessor.retrieve_standard_protocols(True)
+        preprocessor.retrieve_default_namespaces()
+        preprocessor.retrieve_linked_vocab_index()
+        preprocessor.retrieve_doi_prefixes()
+        preprocessor.retrieve_licenses()
+        preprocessor.retrieve_access_rights()
+
+    @classmethod
+    def build(cls, path):
+        # the fingerprint is taken before parsing, a source file changed meanwhile makes the snapshot stale
+        snapshot = {"version": cls.get_version(), "sources": cls.get_fingerprint()}
+        cls.retrieve_all()
+        snapshot["data"] = {attribute: getattr(Preprocessor, attribute) for attribute in cls.ATTRIBUTES}
+        cls.write(path, snapshot)
+
+    @classmethod
+    def write(cls, path, snapshot):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        Preprocessor.logger.info("Reference data snapshot written: " + str(path))
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print("Reference data snapshot error: ", e)
+            return False
+        if snapshot.get("version") != cls.get_version() or snapshot.get("sources") != cls.get_fingerprint():
+            Preprocessor.logger.warning("Reference data snapshot is stale, reading the source files instead")
+            return False
+        with Preprocessor.reference_data_lock:
+            for attribute, value in snapshot["data"].items():
+                setattr(Preprocessor, attribute, value)
+        return True
@@ -7,11 +7,11 @@ from lxml import etree
 from tldextract import extract
 
 from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.repository_profile_cache import RepositoryProfileCache
 from fuji_server.helper.request_helper import AcceptTypes, RequestHelper
 
 
 class RepositoryHelper:
-    DATACITE_REPOSITORIES = Preprocessor.getRE3repositories()
     ns = {"r3d": "http://www.re3data.org/schema/2-2"}
     RE3DATA_APITYPES = ["OAI-PMH", "SOAP", "SPARQL", "SWORD", "OpenDAP"]
 
@@ -28,9 +28,40 @@ class RepositoryHelper:
         # self.logger = logging.getLogger(logger)
         # print(__name__)
 
+    def get_profile_key(self):
+        # the profile depends on the landing page domain which is verified against the repository URL
+        landing_domain = None
+        if self.landing_page_url:
+            landing_url_parts = extract(self.landing_page_url)
+            landing_domain = landing_url_parts.domain + "." + landing_url_parts.suffix
+        return RepositoryProfileCache.get_key(self.client_id, landing_domain)
+
+    def get_profile(self):
+        return {
+            "repository_name": self.repository_name,
+            "repository_url": self.repository_url,
+            "repo_apis": self.repo_apis,
+            "repo_standards": self.repo_standards,
+        }
+
+    def set_profile(self, profile):
+        self.repository_name = profile.get("repository_name")
+        self.repository_url = profile.get("repository_url")
+        self.repo_apis = profile.get("repo_apis") or {}
+        self.repo_standards = profile.get("repo_standards") or []
+
     def lookup_re3data(self):
         if self.client_id:  # and self.pid_scheme:
-            re3doi = RepositoryHelper.DATACITE_REPOSITORIES.get(self.client_id)  # {client_id,re3doi}
+            # repositories share one profile for all their datasets, so the re3data API is only queried once
+            profile_key = self.get_profile_key()
+            profile = RepositoryProfileCache.get(profile_key)
+            if profile is not None:
+                self.set_profile(profile)
+                self.logger.info(
+                    "FsF-R1.3-01M : Using cached re3data repository profile -: " + str(self.repository_name)
+                )
+                return
+            re3doi = Preprocessor.getRE3repositories().get(self.client_id)  # {client_id,re3doi}
             if re3doi:
                 if is_doi(re3doi):
                     short_re3doi = normalize_pid(re3doi, scheme="doi")  # https://doi.org/10.17616/R3XS37
@@ -61,6 +92,7 @@ class RepositoryHelper:
                         _re3_source, re3_response = q2.content_negotiate(metric_id="FsF-R1.3-01M")
                         self.re3metadata_raw = re3_response
                         self.parseRe3data()
+                        RepositoryProfileCache.set(profile_key, self.get_profile())
                 except Exception as e:
                     self.logger.warning(
                         "FsF-R1.3-01M : Malformed or none re3data (DOI-based) record received: " + str(e)
@@ -0,0 +1,84 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import sqlite3
+import time
+
+from fuji_server.helper.sqlite_store import SQLiteStore
+
+
+class RepositoryProfileCache:
+    """
+    Cache of parsed re3data repository profiles (name, URL, APIs and metadata standards) keyed by DataCite client ID
+    and landing page domain. The profiles are stored in a SQLite file shared by all worker processes, without a
+    configured file an in-memory database of the process is used
+
+    ...
+
+    Attributes
+    ----------
+    ttl : int
+        Number of seconds a repository profile is reused
+
+    Methods
+    -------
+    configure(path, ttl)
+        Sets the database file and lifetime of the profiles
+    get(key)
+        Returns a cached profile as dict or None
+    set(key, profile)
+        Stores a profile
+    """
+
+    ttl = 604800
+    _store = SQLiteStore(
+        "Repository profile cache",
+        ["CREATE TABLE IF NOT EXISTS profiles (key TEXT PRIMARY KEY, profile TEXT, expires REAL)"],
+        in_memory=True,
+    )
+
+    @classmethod
+    def configure(cls, path=None, ttl=None):
+        if ttl is not None:
+            cls.ttl = int(ttl)
+        cls._store.configure(path)
+
+    @classmethod
+    def get_key(cls, client_id, landing_domain):
+        if not client_id:
+            return None
+        return str(client_id).lower() + "|" + str(landing_domain).lower()
+
+    @classmethod
+    def get(cls, key):
+        if key is None:
+            return None
+        try:
+            row = cls._store.execute(
+                "SELECT profile FROM profiles WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            cls._store.print_error(e)
+            return None
+
+    @classmethod
+    def set(cls, key, profile):
+        if key is None:
+            return
+        try:
+            with cls._store.lock:
+                cls._store.execute(
+                    "INSERT OR REPLACE INTO profiles VALUES (?, ?, ?)",
+                    (key, json.dumps(profile), time.time() + cls.ttl),
+                )
+                if cls._store.is_eviction_due():
+                    cls._store.execute("DELETE FROM profiles WHERE expires <= ?", (time.time(),))
+        except (sqlite3.Error, TypeError) as e:
+            cls._store.print_error(e)
+
+    @classmethod
+    def clear(cls):
+        cls._store.execute("DELETE FROM profiles")
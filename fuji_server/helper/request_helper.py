@@ -2,40 +2,29 @@
 #
 # SPDX-License-Identifier: MIT
 
+import codecs
 import gzip
-import http.cookiejar
+import hashlib
 import json
 import mimetypes
 import re
-import ssl
-import sys
-import urllib
 from enum import Enum
 
 import lxml
 import rdflib
-from tika import parser
-
+import requests
+
+from fuji_server.helper.content_cache import (
+    LRUContentCache,
+    SQLiteContentCache,
+    TieredContentCache,
+    get_content_key,
+)
+from fuji_server.helper.http_cache import HTTPCache
 from fuji_server.helper.metadata_collector import MetadataFormats
 from fuji_server.helper.preprocessor import Preprocessor
 
 
-class FUJIHTTPRedirectHandler(urllib.request.HTTPRedirectHandler):
-    def __init__(self):
-        super().__init__()
-        self.redirect_list = []
-        self.redirect_url = None
-        self.redirect_status_list = []
-        self.status_list = []
-
-    def redirect_request(self, req, fp, code, msg, hdrs, newurl):
-        self.redirect_url = newurl
-        self.redirect_list.append(newurl)
-        self.redirect_status_list.append((newurl, code))
-        self.status_list.append(code)
-        return super().redirect_request(req, fp, code, msg, hdrs, newurl)
-
-
 class AcceptTypes(Enum):
     # TODO: this seems to be quite error prone..
     datacite_json = "application/vnd.datacite.datacite+json"
@@ -62,8 +51,73 @@ class AcceptTypes(Enum):
         return list(set([item.strip().split(";", 1)[0] for sublist in al for item in sublist]))
 
 
+class ContentReader:
+    """
+    Reads a response body chunk-wise up to a maximum size, validates its UTF-8 encoding and computes the SHA-256
+    digest of the raw bytes on the fly
+    """
+
+    chunk_size = 65536
+
+    def __init__(self, response, max_size):
+        self.response = response
+        self.max_size = max_size
+        self.size = 0  # number of bytes read so far
+        self.complete = False  # True if the body has been read completely
+        self.truncated = False  # True if the body is larger than max_size
+        self.is_utf8 = True
+        self.utf8_valid_size = 0  # number of leading bytes which are valid UTF-8
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.digest = hashlib.sha256()
+
+    def check_utf8(self, data, offset, final=False):
+        if self.is_utf8:
+            try:
+                self.decoder.decode(data, final)
+                self.utf8_valid_size = offset + len(data) - len(self.decoder.getstate()[0])
+            except UnicodeDecodeError:
+                self.is_utf8 = False
+
+    def validate_utf8(self, content):
+        self.decoder.reset()
+        self.is_utf8 = True
+        self.utf8_valid_size = 0
+        self.check_utf8(content, 0, final=True)
+
+    def read(self, size=None):
+        # reads up to size bytes, in total never more than max_size bytes
+        remaining = self.max_size - self.size
+        if size is not None:
+            remaining = min(size, remaining)
+        chunks = []
+        while remaining > 0 and not self.complete:
+            chunk = self.response.read(min(self.chunk_size, remaining))
+            if not chunk:
+                self.complete = True
+                self.check_utf8(b"", self.size, final=True)
+                break
+            self.check_utf8(chunk, self.size)
+            self.digest.update(chunk)
+            self.size += len(chunk)
+            remaining -= len(chunk)
+            chunks.append(chunk)
+        if self.size >= self.max_size and not self.complete and not self.truncated:
+            # one more byte tells if there is more content than allowed
+            if self.response.read(1):
+                self.truncated = True
+            else:
+                self.complete = True
+        return b"".join(chunks)
+
+    def get_digest(self):
+        # digest of the bytes read so far (before decompression or encoding fixes)
+        return self.digest.hexdigest()
+
+
 class RequestHelper:
-    checked_content = {}
+    # downloaded and parsed content shared by all assessments, keyed by a fingerprint of URL and content type
+    # content requested with an authorization token is not cached since it must not be served to other assessments
+    content_cache = TieredContentCache()
 
     def __init__(self, url, logInst: object = None):
         self.user_agent = "F-UJI"
@@ -83,20 +137,49 @@ class RequestHelper:
         self.parse_response = None
         self.response_status = None
         self.response_content = None  # normally the response body
+        self.content_digest = None  # SHA-256 digest of the raw response body as downloaded
         self.response_header = None
         self.response_charset = "utf-8"
         self.content_type = None
         self.content_size = 0
         # maximum size which will be downloaded and analysed by F-UJU
         self.max_content_size = Preprocessor.max_content_size
+        # size of the first part of the body used to decide if the remaining content is needed
+        self.sniff_size = 8192
         self.checked_content_hash = None
+        # keys of the content which has already been parsed as XML during the current assessment
+        self.checked_content_keys = set()
+        # cached PID redirect chain, if given the request directly goes to its final URL
+        self.resolved_chain = None
         self.authtoken = None
         self.tokentype = None
         # print('REQUEST HELPER CACHE: ', len(self.checked_content))
 
     @classmethod
-    def reset_cache(cls):
-        cls.checked_content = {}
+    def configure_content_cache(cls, max_bytes=None, ttl=None, shared_path=None, shared_max_bytes=None):
+        local = LRUContentCache()
+        if max_bytes is not None:
+            local.max_bytes = int(max_bytes)
+        if ttl is not None:
+            local.ttl = int(ttl)
+        shared = None
+        if shared_path:
+            shared = SQLiteContentCache(shared_path, ttl=local.ttl)
+            if shared_max_bytes is not None:
+                shared.max_bytes = int(shared_max_bytes)
+        cls.content_cache = TieredContentCache(local, shared)
+
+    def mark_content_checked(self):
+        if self.checked_content_hash:
+            self.checked_content_keys.add(self.checked_content_hash)
+
+    def is_content_checked(self):
+        return self.checked_content_hash in self.checked_content_keys
+
+    def setCheckedContentKeys(self, checked_content_keys):
+        # set shared by the requests of an assessment
+        if isinstance(checked_content_keys, set):
+            self.checked_content_keys = checked_content_keys
 
     def setAuthToken(self, authtoken, tokentype):
         if isinstance(authtoken, str):
@@ -118,6 +201,22 @@ class RequestHelper:
     def setRequestUrl(self, url):
         self.request_url = url
 
+    def setResolvedRedirectChain(self, chain):
+        if isinstance(chain, dict) and chain.get("redirect_url"):
+            self.resolved_chain = chain
+
+    def isRedirectChainCached(self):
+        # True if the response has been requested with the cached PID resolution (no fallback to the resolver)
+        return self.resolved_chain is not None
+
+    def getRedirectChain(self):
+        return {
+            "redirect_url": self.redirect_url,
+            "redirect_list": self.redirect_list,
+            "redirect_status_list": self.redirect_status_list,
+            "status_list": self.status_list,
+        }
+
     # def getHTTPResponse(self):
     #    return self.http_response
 
@@ -135,134 +234,145 @@ class RequestHelper:
             pass
         return True
 
-    def request_content(self, metric_id="", ignore_html=True):
+    def set_redirect_info(self, tp_response):
+        # the hops of a cached redirect chain precede the ones of the actual request
+        chain = self.resolved_chain or {}
+        self.redirect_url = tp_response.redirect_url or chain.get("redirect_url")
+        self.redirect_list = chain.get("redirect_list", []) + tp_response.redirect_list
+        self.redirect_status_list = chain.get("redirect_status_list", []) + tp_response.redirect_status_list
+        self.status_list = chain.get("status_list", []) + tp_response.status_list
+
+    def get_error_status(self, error):
+        # some internal status messages for optional analysis
+        errmatch = re.search(r"\[Errno\s+(\-?[0-9]+)", str(error))
+        # eg [Errno -2] Name or service not known => DNS failed
+        if errmatch:
+            return int(errmatch[1])
+        elif "NewConnectionError" in str(error):
+            return 601
+        elif "RemoteDisconnected" in str(error):
+            return 602
+        elif "Read timed out" in str(error):
+            return 603
+        elif "ConnectionResetError" in str(error):
+            return 604
+        elif isinstance(error, requests.exceptions.ConnectionError):
+            return 900
+        else:
+            return 1000
+
+    def is_html_content(self, content_type, content_prefix):
+        # only says True if the complete content would be identified as HTML too
+        try:
+            html_found = re.search(b"<!doctype html>|<html", content_prefix.strip(), re.IGNORECASE) is not None
+        except Exception:
+            html_found = False
+        if content_type is None:
+            content_type = mimetypes.guess_type(self.request_url, strict=True)[0]
+        if content_type is None or "application/xhtml+xml" in content_type:
+            return html_found
+        content_type = content_type.split(";", 1)[0]
+        for at in AcceptTypes:
+            if at.name == "xml" and str(content_type).endswith("+xml"):
+                content_type = "text/xml"
+            if content_type in at.value:
+                return at.name == "html"
+        return False
+
+    def request_content(self, metric_id="", ignore_html=True, bypass_cache=False):
+        # bypass_cache=True forces a new download, the persistent HTTP cache is neither read nor written
         self.metric_id = metric_id
         tp_response = None
-        if self.request_url is not None:
+        request_url = self.request_url
+        if self.resolved_chain:
+            request_url = self.resolved_chain.get("redirect_url")
+        if request_url is not None:
             try:
                 self.logger.info(f"{metric_id} : Retrieving page -: {self.request_url} as {self.accept_type}")
-                urllib.request.HTTPRedirectHandler.http_error_308 = urllib.request.HTTPRedirectHandler.http_error_301
-
-                cookiejar = http.cookiejar.MozillaCookieJar()
-                context = ssl._create_unverified_context()
-                context.set_ciphers("DEFAULT@SECLEVEL=0")
-                redirect_handler = FUJIHTTPRedirectHandler()
-                opener = urllib.request.build_opener(
-                    urllib.request.HTTPCookieProcessor(cookiejar),
-                    urllib.request.HTTPSHandler(context=context),
-                    urllib.request.HTTPHandler(),
-                    redirect_handler,
-                )
-                urllib.request.install_opener(opener)
+                if request_url != self.request_url:
+                    self.logger.info(f"{metric_id} : Using cached PID resolution -: {request_url}")
                 request_headers = {"Accept": self.accept_type, "User-Agent": self.user_agent}
                 if self.authtoken:
                     request_headers["Authorization"] = self.tokentype + " " + self.authtoken
-                tp_request = urllib.request.Request(self.request_url, headers=request_headers)
                 try:
-                    tp_response = opener.open(tp_request, timeout=10)
-                    self.redirect_list = redirect_handler.redirect_list
-                    self.redirect_status_list = redirect_handler.redirect_status_list
-                    self.status_list = redirect_handler.status_list
-                    self.redirect_url = redirect_handler.redirect_url
-                except urllib.error.HTTPError as e:
-                    self.response_status = int(e.code)
-                    try:
-                        self.redirect_url = redirect_handler.redirect_url
-                        self.redirect_list = redirect_handler.redirect_list
-                        self.redirect_status_list = redirect_handler.redirect_status_list
-                        self.status_list = redirect_handler.status_list
-                    except:
-                        pass
-                    if e.code == 308:
-                        self.logger.error(
-                            "%s : F-UJI 308 redirect failed, most likely this patch: https://github.com/python/cpython/pull/19588/commits is not installed"
-                            % metric_id
-                        )
-                    elif e.code == 405 or e.code == 403:
-                        self.logger.error(
-                            "%s : Received a 405 or 403 HTTP error, either a 'method not allowed' error or the host denied the User-Agent used (web scraping detection), retrying..."
-                            % metric_id
-                        )
-                        try:
-                            request_headers["User-Agent"] = self.browser_like_user_agent
-                            tp_request = urllib.request.Request(self.request_url, headers=request_headers)
-                            tp_response = opener.open(tp_request, timeout=10)
-                        except:
-                            print("405 fix error:" + str(e))
-                    elif e.code >= 500:
-                        if "doi.org" in self.request_url:
+                    tp_response = HTTPCache.open(request_url, headers=request_headers, timeout=10, bypass=bypass_cache)
+                    self.set_redirect_info(tp_response)
+                    if tp_response.status >= 400:
+                        error_response = tp_response
+                        tp_response = None
+                        self.response_status = int(error_response.status)
+                        if error_response.status == 405 or error_response.status == 403:
                             self.logger.error(
-                                "{} : DataCite/DOI content negotiation failed, status code -: {}, {} - {}".format(
-                                    metric_id, self.request_url, self.accept_type, str(e.code)
-                                )
+                                "%s : Received a 405 or 403 HTTP error, either a 'method not allowed' error or the host denied the User-Agent used (web scraping detection), retrying..."
+                                % metric_id
                             )
-                        else:
-                            self.logger.error(
-                                "{} : Request failed (status code >=500), status code -: {}, {} - {}".format(
-                                    metric_id, self.request_url, self.accept_type, str(e.code)
+                            try:
+                                request_headers["User-Agent"] = self.browser_like_user_agent
+                                tp_response = HTTPCache.open(
+                                    request_url, headers=request_headers, timeout=10, bypass=bypass_cache
                                 )
-                            )
-                    elif e.code == 400:
-                        try:
-                            # browsers automatically redirect to https in case a 400 occured for a http URL
-                            if redirect_handler.redirect_list:
-                                last_redirect_url = redirect_handler.redirect_list[-1]
-                                if "http://" in last_redirect_url:
-                                    self.logger.warning(
-                                        "{} : HTTP 400 Error after redirect to http page , trying to redirect to https page for -: {}".format(
-                                            metric_id, redirect_handler.redirect_list[-1]
-                                        )
+                                if tp_response.status >= 400:
+                                    tp_response.close()
+                                    tp_response = None
+                            except Exception as e:
+                                print("405 fix error:" + str(e))
+                        elif error_response.status >= 500:
+                            if "doi.org" in self.request_url:
+                                self.logger.error(
+                                    "{} : DataCite/DOI content negotiation failed, status code -: {}, {} - {}".format(
+                                        metric_id, self.request_url, self.accept_type, str(error_response.status)
                                     )
-                                    # This is what Browsers sometimes do:
-                                    last_redirect_url = last_redirect_url.replace("http:", "https:")
-                                    tp_request = urllib.request.Request(last_redirect_url, headers=request_headers)
-                                    tp_response = opener.open(tp_request, timeout=10)
-                        except Exception as e:
-                            print("Redirect fix error:" + str(e))
-                            pass
-                    elif e.code == 410:
-                        self.logger.warning(
-                            "{} : Content GONE, this could be a tombstone page, status code -: {}, {} - {}".format(
-                                metric_id, self.request_url, self.accept_type, str(e.code)
+                                )
+                            else:
+                                self.logger.error(
+                                    "{} : Request failed (status code >=500), status code -: {}, {} - {}".format(
+                                        metric_id, self.request_url, self.accept_type, str(error_response.status)
+                                    )
+                                )
+                        elif error_response.status == 400:
+                            try:
+                                # browsers automatically redirect to https in case a 400 occured for a http URL
+                                if self.redirect_list:
+                                    last_redirect_url = self.redirect_list[-1]
+                                    if "http://" in last_redirect_url:
+                                        self.logger.warning(
+                                            "{} : HTTP 400 Error after redirect to http page , trying to redirect to https page for -: {}".format(
+                                                metric_id, self.redirect_list[-1]
+                                            )
+                                        )
+                                        # This is what Browsers sometimes do:
+                                        last_redirect_url = last_redirect_url.replace("http:", "https:")
+                                        tp_response = HTTPCache.open(
+                                            last_redirect_url, headers=request_headers, timeout=10, bypass=bypass_cache
+                                        )
+                                        if tp_response.status >= 400:
+                                            tp_response.close()
+                                            tp_response = None
+                            except Exception as e:
+                                print("Redirect fix error:" + str(e))
+                        elif error_response.status == 410:
+                            self.logger.warning(
+                                "{} : Content GONE, this could be a tombstone page, status code -: {}, {} - {}".format(
+                                    metric_id, self.request_url, self.accept_type, str(error_response.status)
+                                )
                             )
-                        )
-                        try:
-                            tp_response = e  # so take the error response as response instead
-                            self.redirect_list = redirect_handler.redirect_list
-                            self.redirect_status_list = redirect_handler.redirect_status_list
-                            self.status_list = redirect_handler.status_list
-                            self.redirect_url = redirect_handler.redirect_url
-                        except Exception as e:
-                            print("ERROR ", e)
-                    else:
-                        self.logger.warning(
-                            "{} : Request failed, status code -: {}, {} - {}".format(
-                                metric_id, self.request_url, self.accept_type, str(e.code)
+                            # so take the error response as response instead
+                            tp_response = error_response
+                        else:
+                            self.logger.warning(
+                                "{} : Request failed, status code -: {}, {} - {}".format(
+                                    metric_id, self.request_url, self.accept_type, str(error_response.status)
+                                )
                             )
-                        )
-                except urllib.error.URLError as e:
+                        if tp_response is not error_response:
+                            error_response.close()
+                except requests.exceptions.ConnectionError as e:
                     self.logger.warning(
-                        "{} : Request failed, reason -: {}, {} - URLError: {}".format(
+                        "{} : Request failed, reason -: {}, {} - ConnectionError: {}".format(
                             metric_id, self.request_url, self.accept_type, str(e)
                         )
                     )
-                    self.response_status = 900
-                    try:
-                        urlerrmatch = re.search(r"\[Errno\s+(\-?[0-9]+)", str(e))
-                        # eg urlopen error [Errno 11001] getaddrinfo failed => DNS failed
-                        if urlerrmatch:
-                            print("Request URL Error: ", urlerrmatch[1])
-                            self.response_status = int(urlerrmatch[1])
-                    except:
-                        pass
-
-                    try:
-                        self.redirect_url = redirect_handler.redirect_url
-                        self.redirect_list = redirect_handler.redirect_list
-                        self.redirect_status_list = redirect_handler.redirect_status_list
-                        self.status_list = redirect_handler.status_list
-                    except:
-                        pass
+                    self.response_status = self.get_error_status(e)
                 except Exception as e:
                     print("Request ERROR: ", e)
                     self.logger.warning(
@@ -270,35 +380,10 @@ class RequestHelper:
                             metric_id, self.request_url, self.accept_type, str(e)
                         )
                     )
-                    # some internal status messages for optional analysis
-                    try:
-                        self.redirect_url = redirect_handler.redirect_url
-                        self.redirect_list = redirect_handler.redirect_list
-                        self.redirect_status_list = redirect_handler.redirect_status_list
-                        self.status_list = redirect_handler.status_list
-                    except:
-                        pass
-                    if "NewConnectionError" in str(e):
-                        self.response_status = 601
-                    elif "RemoteDisconnected" in str(e):
-                        self.response_status = 602
-                    elif "Read timed out" in str(e):
-                        self.response_status = 603
-                    elif "ConnectionResetError" in str(e):
-                        self.response_status = 604
-                    else:
-                        self.response_status = 1000
+                    self.response_status = self.get_error_status(e)
                 # redirect logger messages to metadata collection metric
                 if metric_id == "FsF-F1-02D":
                     metric_id = "FsF-F2-01M"
-            # except requests.exceptions.SSLError as e:
-            except urllib.error.HTTPError as e:
-                self.logger.warning(
-                    f"{metric_id} : Content negotiation failed -: accept={self.accept_type}, status={e.code!s} "
-                )
-                self.response_status = int(e.code)
-            except urllib.error.URLError as e:
-                self.logger.warning(f"{metric_id} : RequestException -: {e.reason} : {self.request_url}")
             except Exception as e:
                 self.logger.warning(f"{metric_id} : Request Failed -: {e!s} : {self.request_url}")
         return tp_response
@@ -308,9 +393,6 @@ class RequestHelper:
         status_code = None
         if tp_response:
             # self.http_response = tp_response
-            if tp_response.info().get("Content-Encoding") == "gzip":
-                self.logger.info("FsF-F2-01M : Retrieving gzipped content")
-                self.response_content = gzip.decompress(self.response_content)
             if tp_response.info().get("Content-Type") == "application/zip":
                 self.logger.warning(
                     "FsF-F2-01M : Received zipped content which contains several files, therefore skipping tests"
@@ -332,21 +414,25 @@ class RequestHelper:
             if not self.content_type:
                 self.content_type = self.getResponseHeader().get("content-type")
             # key for content cache
-            checked_content_id = hash(str(self.redirect_url) + str(self.content_type))
-
-            if checked_content_id in self.checked_content:
-                self.checked_content_hash = checked_content_id
-                format = self.checked_content.get(checked_content_id).get("format")
-                self.parse_response = self.checked_content.get(checked_content_id).get("parse_response")
-                self.response_content = self.checked_content.get(checked_content_id).get("response_content")
-                self.content_type = self.checked_content.get(checked_content_id).get("content_type")
-                self.content_size = self.checked_content.get(checked_content_id).get("content_size")
-                content_truncated = self.checked_content.get(checked_content_id).get("content_truncated")
+            checked_content_id = get_content_key(self.redirect_url, self.content_type)
+            self.checked_content_hash = checked_content_id
+            cached_content = None
+            if not self.authtoken:
+                cached_content = self.content_cache.get(checked_content_id)
+            if cached_content is not None:
+                format = cached_content.get("format")
+                self.parse_response = cached_content.get("parse_response")
+                self.response_content = cached_content.get("response_content")
+                self.content_type = cached_content.get("content_type")
+                self.content_size = cached_content.get("content_size")
+                self.content_digest = cached_content.get("content_digest")
+                content_truncated = cached_content.get("content_truncated")
                 # print('USING CACHE ...')
                 self.logger.info("%s : Using Cached response content" % metric_id)
             else:
                 self.logger.info("%s : Creating Cached response content" % metric_id)
                 content_truncated = False
+                html_skipped = False
                 if status_code in [200]:
                     try:
                         self.content_size = int(self.getResponseHeader().get("Content-Length"))
@@ -357,31 +443,50 @@ class RequestHelper:
                         pass
                     if self.content_size > self.max_content_size:
                         content_truncated = True
-                    if sys.getsizeof(self.response_content) >= self.max_content_size or content_truncated:
-                        self.logger.warning(
-                            "{} : Downloaded content has been TRUNCATED by F-UJI since it is larger than: -: {}".format(
-                                metric_id, str(self.max_content_size)
+                    # first sniff the beginning of the body to decide if the rest is needed at all
+                    content_reader = ContentReader(tp_response, self.max_content_size)
+                    self.response_content = content_reader.read(self.sniff_size)
+                    if (
+                        ignore_html
+                        and not content_reader.complete
+                        and self.is_html_content(self.content_type, self.response_content)
+                    ):
+                        html_skipped = True
+                        self.logger.info("%s : Skipped downloading the remaining HTML content" % metric_id)
+                    else:
+                        self.response_content += content_reader.read()
+                        self.content_digest = content_reader.get_digest()
+                        # gzip transfer encoding is decoded by the transport, gzipped files are not
+                        if tp_response.info().get("Content-Encoding") == "gzip" and self.response_content:
+                            if self.response_content[:2] == b"\x1f\x8b":
+                                self.logger.info("FsF-F2-01M : Retrieving gzipped content")
+                                self.response_content = gzip.decompress(self.response_content)
+                                content_reader.validate_utf8(self.response_content)
+                        if content_reader.truncated:
+                            content_truncated = True
+                        if content_truncated:
+                            self.logger.warning(
+                                "{} : Downloaded content has been TRUNCATED by F-UJI since it is larger than: -: {}".format(
+                                    metric_id, str(self.max_content_size)
+                                )
                             )
-                        )
-                    self.response_content = tp_response.read(self.max_content_size)
-                    if self.content_size == 0:
-                        self.content_size = sys.getsizeof(self.response_content)
-                    # try to find out if content type is byte then fix
-                    if self.response_content:
-                        try:
-                            self.response_content.decode("utf-8")
-                        except (UnicodeDecodeError, AttributeError):
+                        # try to find out if content type is byte then fix
+                        if self.response_content and not content_reader.is_utf8:
                             self.logger.warning("%s : Content UTF-8 encoding problem, trying to fix.. " % metric_id)
-
-                            self.response_content = self.response_content.decode("utf-8", errors="replace")
-                            self.response_content = str(self.response_content).encode("utf-8")
-
-                    # Now content should be utf-8 encoded
-                    if content_truncated is True:
-                        try:
-                            self.response_content = self.response_content.rsplit(b"\n", 1)[0]
-                        except Exception as e:
-                            print("Error: " + str(e))
+                            # only the part starting with the first invalid chunk needs to be re-encoded
+                            valid_size = content_reader.utf8_valid_size
+                            self.response_content = self.response_content[:valid_size] + self.response_content[
+                                valid_size:
+                            ].decode("utf-8", errors="replace").encode("utf-8")
+
+                        # Now content should be utf-8 encoded
+                        if content_truncated is True:
+                            try:
+                                self.response_content = self.response_content.rsplit(b"\n", 1)[0]
+                            except Exception as e:
+                                print("Error: " + str(e))
+                    if self.content_size == 0:
+                        self.content_size = content_reader.size
                     if self.content_type is None:
                         self.content_type = mimetypes.guess_type(self.request_url, strict=True)[0]
                     if self.content_type is None:
@@ -400,6 +505,8 @@ class RequestHelper:
                                 "%s : No content type (mime) given by server, trying to identify mime with TIKA "
                                 % metric_id
                             )
+                            from tika import parser
+
                             parsedFile = parser.from_buffer(self.response_content)
                             self.content_type = parsedFile.get("metadata").get("Content-Type")
                         except Exception as e:
@@ -519,15 +626,22 @@ class RequestHelper:
                                         format = MetadataFormats.JSON
                                         break
                             break
-                        # cache downloaded content
-                        self.checked_content[checked_content_id] = {
-                            "format": format,
-                            "parse_response": self.parse_response,
-                            "response_content": self.response_content,
-                            "content_type": self.content_type,
-                            "content_size": self.content_size,
-                            "content_truncated": content_truncated,
-                        }
+                        # cache downloaded content, an entry stored meanwhile by a concurrent request is kept
+                        # skipped HTML is not cached since other requests may need the complete page, content
+                        # requested with an authorization token is not cached either
+                        if not html_skipped and not self.authtoken:
+                            self.content_cache.set(
+                                checked_content_id,
+                                {
+                                    "format": format,
+                                    "parse_response": self.parse_response,
+                                    "response_content": self.response_content,
+                                    "content_type": self.content_type,
+                                    "content_size": self.content_size,
+                                    "content_digest": self.content_digest,
+                                    "content_truncated": content_truncated,
+                                },
+                            )
                     else:
                         self.logger.warning(f"{metric_id} : Content-type is NOT SPECIFIED")
                 else:
@@ -539,7 +653,11 @@ class RequestHelper:
             self.logger.warning(f"{metric_id} : No response received from -: {self.request_url}, {self.accept_type}")
         return format
 
-    def content_negotiate(self, metric_id="", ignore_html=True):
-        response = self.request_content(metric_id, ignore_html)
+    def content_negotiate(self, metric_id="", ignore_html=True, bypass_cache=False):
+        response = self.request_content(metric_id, ignore_html, bypass_cache)
+        if response is None and self.resolved_chain:
+            # the cached PID resolution may be outdated, resolve the PID again
+            self.resolved_chain = None
+            response = self.request_content(metric_id, ignore_html, bypass_cache)
         format = self.handle_content(response, metric_id, ignore_html)
         return format, self.parse_response
@@ -0,0 +1,203 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import json
+import sqlite3
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from fuji_server.helper.http_transport import HTTPTransport
+from fuji_server.helper.identifier_helper import IdentifierHelper
+from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.request_helper import ContentReader
+from fuji_server.helper.sqlite_store import SQLiteStore
+
+
+class AssessmentResultStore:
+    """
+    Persistent (SQLite) store of assessment results shared by all workers. Results are keyed by the normalized
+    object identifier, the metric version and the request options. A stored result is reused by a request
+    giving a max_age if it is not older than max_age seconds and the landing page is unchanged, which is
+    verified by a conditional request using the stored ETag/Last-Modified validators or by comparing the
+    SHA-256 digest of the raw landing page body (read as by the RequestHelper, see ContentReader)
+
+    ...
+
+    Attributes
+    ----------
+    max_age : int
+        Maximum age of stored results in seconds, older results are evicted
+    max_entries : int
+        Maximum number of stored results, the least recently stored ones are evicted first
+
+    Methods
+    -------
+    configure(path, max_age, max_entries)
+        Enables the store using the given database file
+    get_key(body)
+        Returns the key of an assessment request or None if its result may not be stored
+    get_digest(response)
+        Returns the digest of the raw body of a response
+    get_validators(headers, digest)
+        Returns the landing page validators of a response
+    lookup(key, max_age)
+        Returns a stored entry which is not older than max_age seconds or None
+    get_unchanged(key, max_age)
+        Returns a stored result if it is fresh and the landing page is unchanged
+    store(key, landing_url, validators, result)
+        Stores an assessment result
+    """
+
+    # request options which influence the result of an assessment
+    OPTIONS = [
+        "test_debug",
+        "metadata_service_endpoint",
+        "metadata_service_type",
+        "use_datacite",
+        "use_github",
+        "oaipmh_endpoint",
+    ]
+    # Accept header of the landing page request, see MetadataHarvester.retrieve_metadata_embedded()
+    LANDING_PAGE_ACCEPT = "text/html, */*"
+
+    max_age = 604800
+    max_entries = 100000
+    _store = SQLiteStore(
+        "Result store",
+        [
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, landing_url TEXT, etag TEXT, "
+            "last_modified TEXT, digest TEXT, result TEXT, stored REAL)",
+            "CREATE INDEX IF NOT EXISTS results_stored ON results (stored)",
+        ],
+    )
+
+    @classmethod
+    def configure(cls, path, max_age=None, max_entries=None):
+        with cls._store.lock:
+            if max_age is not None:
+                cls.max_age = int(max_age)
+            if max_entries is not None:
+                cls.max_entries = int(max_entries)
+            cls._store.configure(path)
+            if cls.is_enabled():
+                try:
+                    cls.evict()
+                except sqlite3.Error as e:
+                    cls._store.print_error(e)
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._store.is_enabled()
+
+    @classmethod
+    def get_key(cls, body):
+        # results of authenticated assessments are private and never stored
+        identifier = str(body.get("object_identifier") or "").strip()
+        if not cls.is_enabled() or not identifier or body.get("auth_token"):
+            return None
+        normalized_id = IdentifierHelper(identifier).get_resolution_key() or identifier
+        options = {option: body.get(option) for option in cls.OPTIONS}
+        key = json.dumps([normalized_id, body.get("metric_version"), options], sort_keys=True)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get_digest(cls, response):
+        # the same bytes the RequestHelper digests, the body is not decompressed or re-encoded
+        content_reader = ContentReader(response, Preprocessor.max_content_size)
+        content_reader.read()
+        return content_reader.get_digest()
+
+    @classmethod
+    def get_validators(cls, headers, digest):
+        headers = CaseInsensitiveDict(headers or {})
+        return {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "digest": digest,
+        }
+
+    @classmethod
+    def lookup(cls, key, max_age):
+        if key is None or not cls.is_enabled():
+            return None
+        try:
+            row = cls._store.execute(
+                "SELECT landing_url, etag, last_modified, digest, result, stored FROM results "
+                "WHERE key = ? AND stored >= ?",
+                (key, time.time() - min(float(max_age), cls.max_age)),
+            ).fetchone()
+        except sqlite3.Error as e:
+            cls._store.print_error(e)
+            return None
+        if row is None:
+            return None
+        return dict(zip(["landing_url", "etag", "last_modified", "digest", "result", "stored"], row, strict=True))
+
+    @classmethod
+    def is_unchanged(cls, entry, timeout=10):
+        headers = {"Accept": cls.LANDING_PAGE_ACCEPT}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            # the landing page is requested directly, a response of the HTTP cache would not tell anything
+            tp_response = HTTPTransport.open(entry["landing_url"], headers=headers, timeout=timeout)
+            try:
+                if tp_response.status == 304:
+                    return True
+                if tp_response.status != 200 or not entry["digest"]:
+                    return False
+                if entry["etag"] and tp_response.headers.get("ETag") == entry["etag"]:
+                    return True
+                return cls.get_digest(tp_response) == entry["digest"]
+            finally:
+                tp_response.close()
+        except requests.exceptions.RequestException as e:
+            print("Result store revalidation error: ", e)
+            return False
+
+    @classmethod
+    def get_unchanged(cls, key, max_age):
+        entry = cls.lookup(key, max_age)
+        if entry is None or not entry["landing_url"] or not cls.is_unchanged(entry):
+            return None
+        result = json.loads(entry["result"])
+        return result, int(time.time() - entry["stored"])
+
+    @classmethod
+    def store(cls, key, landing_url, validators, result):
+        # result is the JSON serialised FAIRResults
+        if key is None or not landing_url or not cls.is_enabled() or not validators:
+            return
+        try:
+            with cls._store.lock:
+                cls._store.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        landing_url,
+                        validators.get("etag"),
+                        validators.get("last_modified"),
+                        validators.get("digest"),
+                        result,
+                        time.time(),
+                    ),
+                )
+                if cls._store.is_eviction_due():
+                    cls.evict()
+        except sqlite3.Error as e:
+            cls._store.print_error(e)
+
+    @classmethod
+    def evict(cls):
+        with cls._store.lock:
+            cls._store.execute("DELETE FROM results WHERE stored < ?", (time.time() - cls.max_age,))
+            cls._store.execute(
+                "DELETE FROM results WHERE key NOT IN (SELECT key FROM results ORDER BY stored DESC LIMIT ?)",
+                (cls.max_entries,),
+            )
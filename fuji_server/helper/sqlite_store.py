@@ -0,0 +1,113 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """
+    SQLite database file shared by all worker processes, used by the persistent caches (HTTP responses, GitHub
+    responses, re3data profiles, DOI prefixes, assessment results, checked content). The connection is opened on
+    first use, the database file is created with its tables and uses write-ahead logging so that readers of
+    other processes are not blocked by writers. Without a configured file the store is either disabled or, if
+    in_memory is set, kept in an in-memory database of the process
+
+    ...
+
+    Attributes
+    ----------
+    name : str
+        Name of the store used in error messages
+    schema : list
+        SQL statements creating the tables and indexes of the store
+    in_memory : bool
+        Use an in-memory database of the process if no file is configured
+    path : str
+        Path of the SQLite database file or None
+    timeout : int
+        Number of seconds to wait for a lock held by another connection
+    evict_interval : int
+        Number of writes after which the owner of the store evicts expired entries
+    lock : threading.RLock
+        Lock serialising the use of the connection
+
+    Methods
+    -------
+    configure(path)
+        Sets the database file, an open connection is closed
+    is_enabled()
+        Returns True if the store can be used
+    get_connection()
+        Returns the connection to the database, which is opened and initialised on first use, or None
+    execute(sql, parameters)
+        Executes an SQL statement and returns the cursor or None if the store is disabled
+    is_eviction_due()
+        Counts a write and returns True after every evict_interval writes
+    print_error(e)
+        Reports a failed database operation
+    close()
+        Closes the connection
+    """
+
+    timeout = 30
+
+    def __init__(self, name, schema, in_memory=False, evict_interval=100):
+        self.name = name
+        self.schema = list(schema)
+        self.in_memory = in_memory
+        self.evict_interval = evict_interval
+        self.path = None
+        self.lock = threading.RLock()
+        self._connection = None
+        self._writes = 0
+
+    def configure(self, path=None):
+        with self.lock:
+            self.close()
+            self.path = path or None
+
+    def is_enabled(self):
+        return self.path is not None or self.in_memory
+
+    def get_connection(self):
+        with self.lock:
+            if self._connection is None and self.is_enabled():
+                if self.path and os.path.dirname(self.path):
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                connection = sqlite3.connect(
+                    self.path or ":memory:", check_same_thread=False, isolation_level=None, timeout=self.timeout
+                )
+                if self.path:
+                    connection.execute("PRAGMA journal_mode=WAL")
+                for statement in self.schema:
+                    connection.execute(statement)
+                self._connection = connection
+            return self._connection
+
+    def execute(self, sql, parameters=()):
+        with self.lock:
+            connection = self.get_connection()
+            if connection is None:
+                return None
+            return connection.execute(sql, parameters)
+
+    def is_eviction_due(self):
+        with self.lock:
+            self._writes += 1
+            if self._writes >= self.evict_interval:
+                self._writes = 0
+                return True
+            return False
+
+    def print_error(self, e):
+        print(self.name + " error: ", e)
+
+    def close(self):
+        with self.lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self._writes = 0
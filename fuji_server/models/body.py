@@ -28,6 +28,7 @@ class Body(Model):
         auth_token: str | None = None,
         auth_token_type: str | None = None,
         oaipmh_endpoint: str | None = None,
+        max_age: int | None = None,
     ):
         """Body - a model defined in Swagger
 
@@ -51,6 +52,8 @@ class Body(Model):
         :type auth_token_type: str
         :param oaipmh_endpoint: The oaipmh_endpoint of this Body.  # noqa: E501
         :type oaipmh_endpoint: str
+        :param max_age: The max_age of this Body.  # noqa: E501
+        :type max_age: int
         """
         self.swagger_types = {
             "object_identifier": str,
@@ -63,6 +66,7 @@ class Body(Model):
             "auth_token": str,
             "auth_token_type": str,
             "oaipmh_endpoint": str,
+            "max_age": int,
         }
 
         self.attribute_map = {
@@ -76,6 +80,7 @@ class Body(Model):
             "auth_token": "auth_token",
             "auth_token_type": "auth_token_type",
             "oaipmh_endpoint": "oaipmh_endpoint",
+            "max_age": "max_age",
         }
         self._object_identifier = object_identifier
         self._test_debug = test_debug
@@ -87,6 +92,7 @@ class Body(Model):
         self._auth_token = auth_token
         self._auth_token_type = auth_token_type
         self._oaipmh_endpoint = oaipmh_endpoint
+        self._max_age = max_age
 
     @classmethod
     def from_dict(cls, dikt) -> "Body":
@@ -328,3 +334,26 @@ class Body(Model):
         """
 
         self._oaipmh_endpoint = oaipmh_endpoint
+
+    @property
+    def max_age(self) -> int:
+        """Gets the max_age of this Body.
+
+        Maximum age in seconds of a stored result of the same request which may be returned if the landing page is unchanged  # noqa: E501
+
+        :return: The max_age of this Body.
+        :rtype: int
+        """
+        return self._max_age
+
+    @max_age.setter
+    def max_age(self, max_age: int):
+        """Sets the max_age of this Body.
+
+        Maximum age in seconds of a stored result of the same request which may be returned if the landing page is unchanged  # noqa: E501
+
+        :param max_age: The max_age of this Body.
+        :type max_age: int
+        """
+
+        self._max_age = max_age
@@ -34,3 +34,27 @@ def test_single_metric_returns_200(client: FlaskClient) -> None:
     valid_url = "/fuji/api/v1/metrics/0.5/FsF-F1-01D-1"
     response = client.get(valid_url)
     assert response.status_code == HTTP_200_OK
+
+
+def test_status_returns_200(client: FlaskClient) -> None:
+    valid_url = "/fuji/api/v1/status"
+    response = client.get(valid_url)
+    assert response.status_code == HTTP_200_OK
+    assert "spdx_licenses" in response.json()["reference_data"]["datasets"]
+
+
+def test_metrics_are_served_with_etag(client: FlaskClient) -> None:
+    valid_url = "/fuji/api/v1/metrics/0.5"
+    response = client.get(valid_url)
+    etag = response.headers["ETag"]
+    assert response.json()["total"] == len(response.json()["metrics"])
+
+    response = client.get(valid_url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert client.get(valid_url, headers={"If-None-Match": '"outdated"'}).status_code == HTTP_200_OK
+
+
+def test_reload_requires_authentication(client: FlaskClient) -> None:
+    response = client.post("/fuji/api/v1/admin/reload")
+    assert response.status_code == 401
@@ -15,6 +15,7 @@ from unittest import mock
 import pytest
 
 from fuji_server.app import create_app
+from fuji_server.helper.host_health import HostHealthRegistry
 from fuji_server.helper.preprocessor import Preprocessor
 
 if TYPE_CHECKING:
@@ -72,8 +73,7 @@ def preprocessor(test_config) -> Preprocessor:
     preprocessor = Preprocessor()
 
     preprocessor.set_metric_yaml_path(METRIC_YML_PATH)
-    isDebug = True
-    preprocessor.retrieve_licenses(isDebug)
+    preprocessor.retrieve_licenses()
 
     # mock getmtime to suppress downloading repo information
     with mock.patch("os.path.getmtime") as mock_getmtime:
@@ -90,6 +90,15 @@ def preprocessor(test_config) -> Preprocessor:
     return preprocessor
 
 
+@pytest.fixture(autouse=True)
+def host_health():
+    """Reset the process wide host health registry, requests of background threads which outlive a test
+    (and its recorded cassette) must not open circuits for the hosts of the following tests"""
+    HostHealthRegistry.reset()
+    yield HostHealthRegistry
+    HostHealthRegistry.reset()
+
+
 @pytest.fixture
 def temporary_preprocessor(temporary_data_directory) -> Preprocessor:
     """Fixture which resets the Preprocessor (singleton) for a test and restores its prior state afterwards"""
@@ -2,13 +2,20 @@
 #
 # SPDX-License-Identifier: MIT
 
+import asyncio
+import subprocess
+import sys
+
 import pytest
 
 from fuji_server.controllers.fair_check import FAIRCheck
+from fuji_server.harvester.data_harvester import DataHarvester
 
 DEBUG = True
 UID = "https://doi.org/10.1594/PANGAEA.902845"
 OAIPMH_ENDPOINT = "https://ws.pangaea.de/oai/"
+# dependencies of rarely used features, imported on first use
+DEFERRED_MODULES = ["pandas", "github", "SPARQLWrapper", "tika"]
 
 
 @pytest.fixture(scope="session")
@@ -34,3 +41,52 @@ def test_harvest_all_metadata(fair_check: FAIRCheck) -> None:
     assert fair_check.origin_url == UID
     assert fair_check.pid_url == UID
     assert fair_check.pid_scheme == "doi"
+
+
+@pytest.mark.vcr("test_harvest_all_metadata.yaml")
+def test_harvest_all_metadata_async() -> None:
+    fair_check = FAIRCheck(uid=UID, oaipmh_endpoint=OAIPMH_ENDPOINT, test_debug=DEBUG)
+    asyncio.run(fair_check.harvest_all_metadata_async())
+    assert fair_check.landing_url == "https://doi.pangaea.de/10.1594/PANGAEA.902845"
+    assert fair_check.origin_url == UID
+    assert fair_check.pid_url == UID
+    assert fair_check.pid_scheme == "doi"
+
+
+def test_incomplete_data_harvesting_is_marked(monkeypatch) -> None:
+    def retrieve_all_data(self):
+        # the phase deadline fired before all data links were harvested
+        self.deadline_exceeded = True
+
+    monkeypatch.setattr(DataHarvester, "retrieve_all_data", retrieve_all_data)
+    fair_check = FAIRCheck(uid=UID, test_debug=DEBUG)
+    fair_check.metadata_merged["object_content_identifier"] = [{"url": "https://example.org/data.csv"}]
+    fair_check.harvest_all_data()
+    assert fair_check.skipped_phases == ["data_harvesting_incomplete"]
+
+
+def get_import_times(module: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # import time: self [us] | cumulative | imported package
+    imports = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _self, cumulative, name = line.removeprefix("import time:").split("|")
+            if cumulative.strip().isdigit():
+                imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def test_import_defers_heavy_dependencies() -> None:
+    # the import time depends on the machine, the import of the Preprocessor is measured as its baseline
+    baseline = get_import_times("fuji_server.helper.preprocessor")["fuji_server.helper.preprocessor"]
+    imports = get_import_times("fuji_server.controllers.fair_check")
+    assert not [module for module in DEFERRED_MODULES if module in imports]
+    # usually 4 to 6 times the baseline, the generous budget only catches gross regressions such as
+    # reference data being parsed at import time
+    assert imports["fuji_server.controllers.fair_check"] < 10 * baseline
@@ -0,0 +1,28 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import json
+from types import SimpleNamespace
+
+from fuji_server.controllers.fair_object_controller import store_result
+from fuji_server.helper.result_store import AssessmentResultStore
+
+BODY = {"object_identifier": "https://doi.org/10.1594/PANGAEA.908011", "metric_version": "metrics_v0.5"}
+LANDING_URL = "https://doi.pangaea.de/10.1594/PANGAEA.908011"
+
+
+def test_incomplete_results_are_not_stored(tmp_path):
+    AssessmentResultStore.configure(str(tmp_path / "results.sqlite"))
+    try:
+        key = AssessmentResultStore.get_key(BODY)
+        validators = {"etag": '"1"', "last_modified": None, "digest": None}
+        ft = SimpleNamespace(landing_url=LANDING_URL, landing_validators=validators, skipped_phases=["data_harvesting"])
+        assert not store_result(key, ft, {"test_id": "abc"})
+        assert AssessmentResultStore.lookup(key, 60) is None
+
+        ft.skipped_phases = []
+        assert store_result(key, ft, {"test_id": "abc"})
+        assert json.loads(AssessmentResultStore.lookup(key, 60)["result"]) == {"test_id": "abc"}
+    finally:
+        AssessmentResultStore.configure(None)
@@ -0,0 +1,79 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import http.server
+import io
+import logging
+import threading
+import time
+
+import pytest
+
+from fuji_server.harvester.data_harvester import DataHarvester
+from fuji_server.helper.identifier_helper import IdentifierHelper
+from fuji_server.helper.metric_helper import MetricHelper
+
+
+def test_needs_content():
+    logger = logging.getLogger(__name__)
+    assert DataHarvester([], logger).needs_content()
+    assert DataHarvester([], logger, metrics=["FsF-R1-01MD", "FsF-R1.3-02D"]).needs_content()
+    assert not DataHarvester([], logger, metrics=["FsF-F3-01M", "FsF-R1.3-02D"]).needs_content()
+    for metric_version in ["metrics_v0.5", "metrics_v0.8"]:
+        metrics = MetricHelper(metric_version).get_custom_metrics(["metric_name"])
+        assert DataHarvester([], logger, metrics=metrics.keys()).needs_content()
+
+
+def test_retrieve_all_data_probing_mode():
+    harvester = DataHarvester([], logging.getLogger(__name__), metrics=["FsF-R1.3-02D"])
+    assert harvester.retrieve_all_data()
+    assert not harvester.scan_content
+    assert harvester.retrieve_all_data(scan_content=True)
+    assert harvester.scan_content
+
+
+def test_read_content_is_aborted_at_the_deadline():
+    harvester = DataHarvester([], logging.getLogger(__name__))
+    harvester.chunk_size = 4
+    assert harvester.read_content(io.BytesIO(b"0123456789"), 6) == b"012345"
+    assert harvester.read_content(io.BytesIO(b"0123456789"), 100, time.monotonic() + 10) == b"0123456789"
+    with pytest.raises(TimeoutError):
+        harvester.read_content(io.BytesIO(b"0123456789"), 100, time.monotonic() - 1)
+
+
+class DataFileHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/slow.csv":
+            time.sleep(2)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_late_downloads_are_dropped():
+    # loads the identifiers.org patterns used for the data file info, which takes longer than the deadline
+    IdentifierHelper("https://example.org/data.csv")
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), DataFileHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base_url = "http://127.0.0.1:" + str(server.server_port)
+        data_links = [
+            {"url": base_url + "/fast.csv", "type": "text/csv"},
+            {"url": base_url + "/slow.csv", "type": "application/octet-stream"},
+        ]
+        harvester = DataHarvester(data_links, logging.getLogger(__name__), metrics=["FsF-R1.3-02D"])
+        harvester.harvest_timeout = 1
+        harvester.retrieve_all_data()
+        assert list(harvester.data) == [base_url + "/fast.csv"]
+        assert harvester.deadline_exceeded
+        # the running download of the slow file finishes after the deadline without changing the data
+        time.sleep(2)
+        assert list(harvester.data) == [base_url + "/fast.csv"]
+    finally:
+        server.shutdown()
+        server.server_close()
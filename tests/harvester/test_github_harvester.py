@@ -4,7 +4,11 @@
 
 import logging
 
+import requests
+
 from fuji_server.harvester.github_harvester import GithubHarvester
+from fuji_server.helper.github_cache import GithubCache
+from fuji_server.helper.http_transport import HTTPTransport
 
 
 def test_github_harvester():
@@ -13,3 +17,35 @@ def test_github_harvester():
     logger = logging.getLogger()
     harvester = GithubHarvester(id_, logger)
     assert harvester.files_map
+
+
+def test_unchanged_repository_is_not_harvested_again(monkeypatch):
+    GithubCache.configure(None)
+    sent_headers = []
+
+    def get(url, headers=None, timeout=None):
+        sent_headers.append(headers)
+        response = requests.Response()
+        if headers.get("If-None-Match"):
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response.headers["ETag"] = '"' + url + '"'
+            response._content = b"abc123" if url.endswith("/commits/main") else b'{"default_branch": "main"}'
+        return response
+
+    monkeypatch.setattr(HTTPTransport, "get", get)
+    harvester = GithubHarvester("https://github.com/pangaea-data-publisher/fuji", logging.getLogger())
+    GithubCache.set_result("pangaea-data-publisher/FUJI", "abc123", {"license": "MIT License"})
+    # PyGithub requests of a full harvest would fail without a recorded cassette
+    harvester.handle = None
+    harvester.harvest()
+    assert harvester.data == {"license": "MIT License"}
+    harvester.harvest()
+    assert [headers.get("If-None-Match") for headers in sent_headers] == [
+        None,
+        None,
+        '"https://api.github.com/repos/pangaea-data-publisher/fuji"',
+        '"https://api.github.com/repos/pangaea-data-publisher/fuji/commits/main"',
+    ]
+    GithubCache.clear()
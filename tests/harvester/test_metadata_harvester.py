@@ -0,0 +1,132 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import http.server
+import logging
+import threading
+import time
+
+from fuji_server.harvester.metadata_harvester import MetadataHarvester
+from fuji_server.helper.metadata_collector import MetadataFormats, MetadataSources
+
+
+class FakeCollector:
+    def __init__(self, namespace, content_type):
+        self.namespaces = [namespace]
+        self.metadata_format = MetadataFormats.XML
+        self.main_entity_format = namespace
+        self.content_type = content_type
+
+    def getNamespaces(self):
+        return self.namespaces
+
+    def getLinkedNamespaces(self):
+        return {self.namespaces[0]: "http://example.org/linked"}
+
+    def getContentType(self):
+        return self.content_type
+
+
+def create_harvester():
+    harvester = MetadataHarvester("https://doi.org/10.1594/PANGAEA.902845")
+    harvester.landing_url = "https://example.org/landing"
+    harvester.pid_url = "https://doi.org/10.1594/PANGAEA.902845"
+    return harvester
+
+
+def patch_collectors(harvester, delays):
+    # the collectors finish after the given delays and return metadata with conflicting titles
+    def collect(name, namespace, source, content_type):
+        def collect_metadata(target_url, *args):
+            time.sleep(delays[name])
+            metadata = {"title": name + " " + target_url, name + "_keyword": name}
+            return FakeCollector(namespace, content_type), source, metadata
+
+        return collect_metadata
+
+    harvester.collect_metadata_external_xml_negotiated = collect(
+        "xml", "http://datacite.org/schema/kernel-4", MetadataSources.XML_NEGOTIATED, "application/xml"
+    )
+    harvester.collect_metadata_external_schemaorg_negotiated = collect(
+        "schemaorg", "http://schema.org", MetadataSources.SCHEMAORG_NEGOTIATED, "application/ld+json"
+    )
+    harvester.collect_metadata_external_rdf_negotiated = collect(
+        "rdf", "http://www.w3.org/ns/dcat#", MetadataSources.RDF_NEGOTIATED, "text/turtle"
+    )
+    harvester.collect_metadata_external_datacite = collect(
+        "datacite", "http://datacite.org/schema", MetadataSources.DATACITE_JSON_NEGOTIATED, "application/json"
+    )
+
+
+def test_concurrent_negotiation_is_merged_in_sequential_order():
+    target_urls = ["https://example.org/a", "https://example.org/b"]
+    sequential = create_harvester()
+    patch_collectors(sequential, {"xml": 0, "schemaorg": 0, "rdf": 0, "datacite": 0})
+    sequential.retrieve_metadata_external_xml_negotiated(target_urls)
+    sequential.retrieve_metadata_external_schemaorg_negotiated(target_urls)
+    sequential.retrieve_metadata_external_rdf_negotiated(target_urls)
+    sequential.retrieve_metadata_external_datacite()
+
+    concurrent = create_harvester()
+    # the collectors finish in the reverse order of the sequential merge
+    patch_collectors(concurrent, {"xml": 0.6, "schemaorg": 0.4, "rdf": 0.2, "datacite": 0})
+    concurrent.retrieve_metadata_external_negotiated(target_urls)
+
+    assert [m["metadata"]["title"] for m in concurrent.metadata_unmerged] == [
+        "xml https://example.org/a",
+        "xml https://example.org/b",
+        "schemaorg https://example.org/a",
+        "schemaorg https://example.org/b",
+        "rdf https://example.org/a",
+        "rdf https://example.org/b",
+        "datacite https://doi.org/10.1594/PANGAEA.902845",
+    ]
+    assert concurrent.metadata_unmerged == sequential.metadata_unmerged
+    assert concurrent.metadata_merged == sequential.metadata_merged
+    assert concurrent.metadata_sources == sequential.metadata_sources
+    assert concurrent.namespace_uri == sequential.namespace_uri
+    assert concurrent.linked_namespace_uri == sequential.linked_namespace_uri
+
+
+XML_METADATA = b"""<?xml version="1.0" encoding="UTF-8"?>
+<resource xmlns="http://datacite.org/schema/kernel-4">
+  <creators><creator><creatorName>Doe, Jane</creatorName></creator></creators>
+  <titles><title>Test dataset</title></titles>
+  <publisher>PANGAEA</publisher>
+  <publicationYear>2019</publicationYear>
+</resource>
+"""
+
+
+class NegotiationHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        # the XML response is slower than the RDF response of the same content
+        if "rdf" not in self.headers.get("Accept", ""):
+            time.sleep(1)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(XML_METADATA)))
+        self.end_headers()
+        self.wfile.write(XML_METADATA)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_rdf_collector_skips_content_parsed_as_xml(caplog):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), NegotiationHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        target_url = "http://127.0.0.1:" + str(server.server_port) + "/metadata"
+        harvester = MetadataHarvester(target_url, use_datacite=False, logger=logging.getLogger(__name__))
+        with caplog.at_level(logging.INFO):
+            harvester.retrieve_metadata_external_negotiated([target_url])
+        assert "Ignoring RDF since content already has been parsed as XML" in caplog.text
+        assert harvester.metadata_sources == [
+            (MetadataSources.XML_NEGOTIATED.name, MetadataSources.XML_NEGOTIATED.value.get("method"))
+        ]
+        assert harvester.metadata_merged.get("title") == ["Test dataset"]
+    finally:
+        server.shutdown()
+        server.server_close()
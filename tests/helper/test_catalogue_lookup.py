@@ -0,0 +1,77 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import logging
+
+import pytest
+
+from fuji_server.helper.catalogue_helper import MetaDataCatalogue
+from fuji_server.helper.catalogue_lookup import CatalogueLookup
+
+
+class FakeCatalogue(MetaDataCatalogue):
+    batch_size = 2
+
+    def __init__(self, listed, source="fake"):
+        super().__init__(logging.getLogger(__name__))
+        self.source = source
+        self.listed = listed
+        self.batches = []
+
+    def query(self, pidlist):
+        self.islisted = any(CatalogueLookup.lookup(self, pidlist).values())
+
+    def query_batch(self, pids):
+        self.batches.append(pids)
+        return {pid: self.listed.get(pid) for pid in pids}
+
+
+@pytest.fixture
+def lookup():
+    CatalogueLookup.reset()
+    yield CatalogueLookup
+    CatalogueLookup.reset()
+
+
+def test_lookup_batches_and_caches_answers(lookup):
+    catalogue = FakeCatalogue({"10.1/a": True, "10.1/b": False, "10.1/c": None})
+    assert lookup.lookup(catalogue, ["10.1/a", "10.1/b", "10.1/c", None]) == {
+        "10.1/a": True,
+        "10.1/b": False,
+        "10.1/c": None,
+    }
+    assert catalogue.batches == [["10.1/a", "10.1/b"], ["10.1/c"]]
+    # positive and negative answers are cached, unknown ones are queried again
+    assert lookup.lookup(catalogue, ["10.1/A", "10.1/b", "10.1/c"])["10.1/A"] is True
+    assert catalogue.batches[2:] == [["10.1/c"]]
+
+
+def test_negative_ttl(lookup):
+    positive_ttl, negative_ttl = lookup.positive_ttl, lookup.negative_ttl
+    try:
+        lookup.configure(negative_ttl=-1)
+        catalogue = FakeCatalogue({"10.1/a": True, "10.1/b": False})
+        lookup.lookup(catalogue, ["10.1/a", "10.1/b"])
+        lookup.lookup(catalogue, ["10.1/a", "10.1/b"])
+        assert catalogue.batches == [["10.1/a", "10.1/b"], ["10.1/b"]]
+    finally:
+        lookup.configure(positive_ttl, negative_ttl)
+
+
+def test_query_concurrently_and_prefetch(lookup):
+    unlisting, listing = FakeCatalogue({}, "first"), FakeCatalogue({"10.1/a": True}, "second")
+    assert lookup.query_concurrently([(unlisting, ["10.1/a"]), (listing, ["10.1/a"])]) == [listing]
+    prefetched = lookup.prefetch([FakeCatalogue({"10.1/x": True}, "third")], ["10.1/x", "10.1/y"])
+    assert prefetched == {"third": {"10.1/x": True, "10.1/y": None}}
+
+
+def test_answers_are_cached_per_scope(lookup):
+    catalogue = FakeCatalogue({"10.1/a": False})
+    catalogue.get_cache_scope = lambda: None
+    assert lookup.lookup(catalogue, ["10.1/a"]) == {"10.1/a": False}
+    # e.g. a Google Dataset Search lookup of a dataset, which is also checked by the custom search API
+    catalogue.listed = {"10.1/a": True}
+    catalogue.get_cache_scope = lambda: "custom_search"
+    assert lookup.lookup(catalogue, ["10.1/a"]) == {"10.1/a": True}
+    assert catalogue.batches == [["10.1/a"], ["10.1/a"]]
@@ -0,0 +1,66 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import pickle
+
+from fuji_server.helper.content_cache import (
+    LRUContentCache,
+    SQLiteContentCache,
+    TieredContentCache,
+    get_content_key,
+    get_entry_size,
+)
+
+
+def make_entry(content, parse_response=None):
+    return {"response_content": content, "parse_response": parse_response, "content_type": "application/json"}
+
+
+def test_content_key_is_stable():
+    assert get_content_key("https://example.org", "text/xml") == get_content_key("https://example.org", "text/xml")
+    assert get_content_key("https://example.org", "text/xml") != get_content_key("https://example.org", "text/html")
+
+
+def test_lru_byte_accounting():
+    cache = LRUContentCache(max_bytes=10)
+    cache.set("a", make_entry(b"12345"))
+    cache.set("b", make_entry(b"12345"))
+    assert cache.size == 10
+    cache.get("a")
+    cache.set("c", make_entry(b"1"))
+    # b is the least recently used entry
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.size == 6
+    cache.set("d", make_entry(b"12345678901"))
+    assert cache.get("d") is None
+
+
+def test_parsed_json_is_measured_by_its_pickled_size():
+    parsed = {"title": "x" * 1000, "keywords": ["a"] * 100}
+    assert get_entry_size(make_entry(b"{}", parsed)) == 2 + len(pickle.dumps(parsed, protocol=pickle.HIGHEST_PROTOCOL))
+    content = b"12345"
+    assert get_entry_size(make_entry(content, content)) == 5
+    cache = LRUContentCache(max_bytes=2000)
+    cache.set("a", make_entry(b"{}", parsed))
+    cache.set("b", make_entry(b"{}", parsed))
+    # the small raw content does not keep the large parse results in the cache
+    assert len(cache) == 1
+    assert cache.size <= cache.max_bytes
+
+
+def test_parsed_json_is_copied():
+    cache = LRUContentCache()
+    cache.set("a", make_entry(b'{"a": 1}', {"a": 1}))
+    cache.get("a")["parse_response"]["a"] = 2
+    assert cache.get("a")["parse_response"] == {"a": 1}
+
+
+def test_shared_tier(tmp_path):
+    shared_path = str(tmp_path / "content_cache.sqlite")
+    writer = TieredContentCache(LRUContentCache(), SQLiteContentCache(shared_path))
+    reader = TieredContentCache(LRUContentCache(), SQLiteContentCache(shared_path))
+    writer.set("a", make_entry(b'{"a": 1}', {"a": 1}))
+    assert reader.get("a")["parse_response"] == {"a": 1}
+    assert len(reader.local) == 1
@@ -0,0 +1,36 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fuji_server.helper.deadline import AssessmentDeadline, DeadlineExceededError
+
+
+def test_unlimited_deadline():
+    deadline = AssessmentDeadline()
+    assert deadline.remaining() is None
+    assert not deadline.expired()
+    assert deadline.get_timeout(10) == 10
+
+
+def test_timeout_capped_by_deadline():
+    deadline = AssessmentDeadline(5)
+    assert deadline.get_timeout(10) <= 5
+    assert deadline.get_timeout(1) == 1
+    assert AssessmentDeadline.get_current_timeout(10) == 10
+    with deadline.active():
+        assert AssessmentDeadline.get_current_timeout(10) <= 5
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert AssessmentDeadline.run_in_context(executor, AssessmentDeadline.get_current).result() is deadline
+    assert AssessmentDeadline.get_current() is None
+
+
+def test_expired_deadline():
+    deadline = AssessmentDeadline(0.001)
+    deadline.expires_at -= 1
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceededError):
+        deadline.get_timeout(10)
@@ -0,0 +1,54 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import threading
+
+import pytest
+
+from fuji_server.helper.doi_prefix_index import DOIPrefixIndex
+from fuji_server.helper.identifier_helper import IdentifierHelper
+
+
+@pytest.fixture
+def prefix_index(tmp_path):
+    DOIPrefixIndex.configure(str(tmp_path / "doi_prefixes.sqlite"))
+    yield DOIPrefixIndex
+    DOIPrefixIndex.configure(None)
+
+
+def test_shipped_prefixes_are_known_without_lookup(prefix_index, monkeypatch):
+    monkeypatch.setattr(IdentifierHelper, "lookup_agency", lambda self, prefix: pytest.fail("unexpected lookup"))
+    assert IdentifierHelper("https://doi.org/10.1594/PANGAEA.908011").get_agency() == "DataCite"
+    assert IdentifierHelper("https://www.example.org/record/1").get_agency() is None
+
+
+def test_learned_prefixes_are_persisted(prefix_index, tmp_path):
+    assert prefix_index.get_agency("10.99999", lambda prefix: "Crossref") == "Crossref"
+    prefix_index.configure(str(tmp_path / "doi_prefixes.sqlite"))
+    assert prefix_index.get_agency("10.99999") == "Crossref"
+    # unknown answers are not stored
+    assert prefix_index.get_agency("10.99998", lambda prefix: None) is None
+    assert prefix_index.get_learned() == {"10.99999": "Crossref"}
+
+
+def test_concurrent_lookups_are_coalesced(prefix_index):
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def resolver(prefix):
+        calls.append(prefix)
+        started.set()
+        release.wait(5)
+        return "DataCite"
+
+    threads = [threading.Thread(target=lambda: results.append(prefix_index.get_agency("10.99997", resolver)))]
+    threads[0].start()
+    started.wait(5)
+    threads += [threading.Thread(target=lambda: results.append(prefix_index.get_agency("10.99997", resolver)))]
+    threads[1].start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert calls == ["10.99997"]
+    assert results == ["DataCite", "DataCite"]
@@ -0,0 +1,83 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import pytest
+import requests
+
+from fuji_server.helper.deadline import AssessmentDeadline
+from fuji_server.helper.host_health import HostHealthRegistry, HostUnavailableError
+from fuji_server.helper.http_transport import HTTPTransport
+from fuji_server.helper.request_helper import RequestHelper
+
+
+@pytest.fixture
+def registry():
+    HostHealthRegistry.reset()
+    cooldown, failure_threshold = HostHealthRegistry.cooldown, HostHealthRegistry.failure_threshold
+    HostHealthRegistry.configure(cooldown=60, failure_threshold=2)
+    yield HostHealthRegistry
+    HostHealthRegistry.configure(cooldown, failure_threshold)
+    HostHealthRegistry.reset()
+
+
+def test_circuit_opens_after_failures(registry):
+    url = "https://dead.example.org/record/1"
+    registry.record_failure(url, "Read timed out.")
+    registry.check(url)
+    registry.record_failure(url, "Read timed out.")
+    with pytest.raises(HostUnavailableError) as excinfo:
+        registry.check("https://DEAD.example.org/record/2")
+    assert RequestHelper("https://dead.example.org").get_error_status(excinfo.value) == 603
+    assert registry.get_unavailable_hosts() == ["dead.example.org"]
+    registry.check("https://alive.example.org")
+
+
+def test_dns_failure_opens_circuit_immediately(registry):
+    url = "https://unknown.example.org"
+    registry.record_failure(url, "[Errno -2] Name or service not known")
+    with pytest.raises(HostUnavailableError):
+        registry.check(url)
+
+
+def test_trial_request_after_cooldown(registry):
+    url = "https://flaky.example.org"
+    registry.configure(cooldown=0)
+    registry.record_failure(url, "[Errno -2] Name or service not known")
+    # the first request after the cool-down is let through, concurrent ones still fail fast
+    registry.check(url)
+    with pytest.raises(HostUnavailableError):
+        registry.check(url)
+    registry.record_success(url)
+    registry.check(url)
+    registry.check(url)
+
+
+def test_unrecorded_trial_expires(registry, monkeypatch):
+    url = "https://slow.example.org"
+    registry.configure(cooldown=0)
+    registry.record_failure(url, "[Errno -2] Name or service not known")
+    registry.check(url)
+    # the outcome of the trial request is never recorded
+    with pytest.raises(HostUnavailableError):
+        registry.check(url)
+    monkeypatch.setattr(registry, "trial_timeout", 0)
+    registry.check(url)
+
+
+def test_trial_cut_by_deadline_reopens_circuit(registry, monkeypatch):
+    url = "https://slow.example.org/record/1"
+    registry.configure(cooldown=0)
+    registry.record_failure(url, "[Errno -2] Name or service not known")
+
+    class Session:
+        def request(self, method, url, **kwargs):
+            raise requests.exceptions.ConnectTimeout("connect timeout")
+
+    # timeout=None capped by an active assessment deadline
+    monkeypatch.setattr(AssessmentDeadline, "get_current_timeout", lambda timeout: 1)
+    # the request is the trial after the cool-down
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        HTTPTransport.send(Session(), "GET", url, timeout=None)
+    # the trial has been settled, another one is let through after the cool-down
+    registry.check(url)
@@ -0,0 +1,74 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import io
+
+import pytest
+import requests
+import urllib3
+
+from fuji_server.helper.http_cache import CachingResponse, HTTPCache
+from fuji_server.helper.http_transport import TransportResponse
+
+
+@pytest.fixture
+def http_cache(tmp_path):
+    HTTPCache.configure(str(tmp_path / "http_cache.sqlite"), max_size=10, max_age=3600, default_ttl=60)
+    yield HTTPCache
+    HTTPCache.configure(None)
+
+
+def make_transport_response(url, body, headers=None):
+    response = requests.Response()
+    response.url = url
+    response.status_code = 200
+    response.headers.update(headers or {})
+    response.raw = urllib3.HTTPResponse(body=io.BytesIO(body), preload_content=False)
+    return TransportResponse(response)
+
+
+def test_get_expiry():
+    now = 1000
+    assert HTTPCache.get_expiry({"Cache-Control": "public, max-age=60"}, now) == 1060
+    assert HTTPCache.get_expiry({"Cache-Control": "max-age=60", "Age": "10"}, now) == 1050
+    assert HTTPCache.get_expiry({"Cache-Control": "no-cache"}, now) == now
+    assert HTTPCache.get_expiry({"Cache-Control": "no-store"}, now) is None
+    assert HTTPCache.get_expiry({"Cache-Control": "private"}, now) is None
+    assert HTTPCache.get_expiry({"Expires": "0"}, now) == now
+    assert HTTPCache.get_expiry({"Last-Modified": "Thu, 01 Jan 1970 00:00:00 GMT"}, now) == 1100
+    # responses without freshness information are stored, but always revalidated
+    assert HTTPCache.get_expiry({}, now) == now
+
+
+def test_store_and_evict(http_cache):
+    key = http_cache.get_key("https://example.org/a", {"Accept": "text/xml"})
+    assert key != http_cache.get_key("https://example.org/a", {"Accept": "text/html"})
+    assert http_cache.get_key("https://example.org/a", {"Authorization": "Basic xyz"}) is None
+    caching_response = CachingResponse(
+        make_transport_response("https://example.org/a", b"<a>1</a>", {"ETag": '"1"'}), key
+    )
+    assert caching_response.read(4) == b"<a>1"
+    assert caching_response.read(100) == b"</a>"
+    assert caching_response.read(100) == b""
+    caching_response.close()
+    entry = http_cache.lookup(key)
+    assert entry["body"] == b"<a>1</a>"
+    assert entry["etag"] == '"1"'
+    cached_response = http_cache.get_response(entry)
+    assert cached_response.status == 200
+    assert cached_response.geturl() == "https://example.org/a"
+    assert cached_response.read() == b"<a>1</a>"
+    # incompletely read responses are not stored
+    other_key = http_cache.get_key("https://example.org/b", {})
+    caching_response = CachingResponse(make_transport_response("https://example.org/b", b"12345"), other_key)
+    caching_response.read(2)
+    caching_response.close()
+    assert http_cache.lookup(other_key) is None
+    # exceeding max_size evicts the least recently used entries
+    caching_response = CachingResponse(make_transport_response("https://example.org/b", b"123456"), other_key)
+    caching_response.read()
+    caching_response.close()
+    assert http_cache.lookup(key) is None
+    assert http_cache.lookup(other_key)["body"] == b"123456"
+    assert http_cache._total_size == 6
@@ -0,0 +1,119 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from fuji_server.helper.host_health import HostHealthRegistry, HostUnavailableError
+from fuji_server.helper.http_transport import HTTPTransport, TransportResponse
+
+
+def make_response(url, status_code, headers=None):
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+def test_transport_response_redirect_info():
+    first = make_response("http://doi.org/10.1234/abc", 302)
+    second = make_response("https://doi.org/10.1234/abc", 301)
+    final = make_response("https://repo.example.org/record/1", 200, {"Content-Type": "text/html; charset=ISO-8859-1"})
+    final.history = [first, second]
+    tp_response = TransportResponse(final)
+    assert tp_response.redirect_list == ["https://doi.org/10.1234/abc", "https://repo.example.org/record/1"]
+    assert tp_response.redirect_status_list == [
+        ("https://doi.org/10.1234/abc", 302),
+        ("https://repo.example.org/record/1", 301),
+    ]
+    assert tp_response.status_list == [302, 301]
+    assert tp_response.redirect_url == "https://repo.example.org/record/1"
+    assert tp_response.info().get_content_charset() == "iso-8859-1"
+    assert tp_response.geturl() == "https://repo.example.org/record/1"
+
+
+def test_transport_shares_connection_pools():
+    assert HTTPTransport.session(verify=False).get_adapter("https://a.example.org") is HTTPTransport.session(
+        verify=False
+    ).get_adapter("https://b.example.org")
+    assert HTTPTransport.get_adapter(True) is not HTTPTransport.get_adapter(False)
+
+
+def test_submit_applies_host_limits_before_the_worker_pool(monkeypatch):
+    HTTPTransport.reset()
+    monkeypatch.setattr(HTTPTransport, "max_requests_per_host", 1)
+    release = threading.Event()
+    starts = []
+
+    def task(name):
+        starts.append((name, time.monotonic()))
+        if name == "a1":
+            release.wait(5)
+        return name
+
+    start = time.monotonic()
+    futures = [HTTPTransport.submit("https://example.org/" + name, 0.1, task, name) for name in ["a1", "a2", "a3"]]
+    other = HTTPTransport.submit("https://example.com/b", 0.1, task, "b")
+    # the queued tasks of a busy host do not occupy worker threads, other hosts are served at once
+    assert other.result(5) == "b"
+    assert [name for name, _t in starts] == ["a1", "b"]
+    futures[2].cancel()
+    release.set()
+    assert futures[1].result(5) == "a2"
+    assert futures[2].cancelled()
+    assert [name for name, _t in starts] == ["a1", "b", "a2"]
+    # politeness: the second task of the host starts at least interval seconds after the first one
+    assert starts[2][1] - starts[0][1] >= 0.1
+    assert starts[1][1] - start < 0.1
+    # the request slot is released right after the result has been set
+    deadline = time.monotonic() + 5
+    while HTTPTransport._host_requests and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert HTTPTransport._host_requests == {}
+    assert HTTPTransport.get_executor() is HTTPTransport.get_executor()
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(0.5)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_read_timeouts_do_not_open_circuit():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:" + str(server.server_port) + "/record"
+    try:
+        for _attempt in range(HostHealthRegistry.failure_threshold + 1):
+            with pytest.raises(requests.exceptions.ReadTimeout):
+                HTTPTransport.get(url, timeout=0.1)
+        assert HostHealthRegistry.get_unavailable_hosts() == []
+        assert HTTPTransport.get(url, timeout=5).content == b"ok"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_connection_failures_open_circuit():
+    # a port nobody listens on
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    url = "http://127.0.0.1:" + str(port) + "/record"
+    for _attempt in range(HostHealthRegistry.failure_threshold):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            HTTPTransport.get(url, timeout=1)
+    with pytest.raises(HostUnavailableError):
+        HTTPTransport.get(url, timeout=1)
@@ -0,0 +1,36 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import pytest
+
+from fuji_server.helper.identifier_helper import IdentifierHelper
+
+
+@pytest.mark.parametrize(
+    ("idstring", "preferred_schema", "normalized_id", "is_persistent"),
+    [
+        ("https://doi.org/10.1594/PANGAEA.908011", "doi", "10.1594/PANGAEA.908011", True),
+        ("https://nbn-resolving.org/urn:nbn:de:0001-123", "urn", "urn:nbn:de:0001-123", True),
+        ("uniprot:P12345", "identifiers.org", "uniprot:P12345", True),
+        ("9b2a5a8f-3c2f-4d0c-8b0e-9c3d9a3f9a1b", "uuid", "9b2a5a8f-3c2f-4d0c-8b0e-9c3d9a3f9a1b", False),
+        ("https://www.example.org/record/1", "url", "https://www.example.org/record/1", False),
+    ],
+)
+def test_analyse(idstring, preferred_schema, normalized_id, is_persistent):
+    analysis = IdentifierHelper.analyse(idstring)
+    assert analysis.preferred_schema == preferred_schema
+    assert analysis.normalized_id == normalized_id
+    assert analysis.is_persistent is is_persistent
+    assert isinstance(analysis.identifier_schemes, tuple)
+
+
+def test_analysis_is_memoized_and_not_shared_with_helpers():
+    idstring = "https://hdl.handle.net/10013/epic.42"
+    first = IdentifierHelper(idstring)
+    first.identifier_schemes.append("test")
+    hits = IdentifierHelper.analyse.cache_info().hits
+    second = IdentifierHelper(idstring)
+    assert IdentifierHelper.analyse.cache_info().hits == hits + 1
+    assert second.identifier_schemes == ["handle", "url"]
+    assert second.get_identifier_url() == "https://hdl.handle.net/10013/epic.42"
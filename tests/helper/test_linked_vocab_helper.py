@@ -2,7 +2,7 @@
 #
 # SPDX-License-Identifier: MIT
 
-from fuji_server.helper.linked_vocab_helper import LinkedVocabHelper
+from fuji_server.helper.linked_vocab_helper import LinkedVocabHelper, LinkedVocabMatcher
 
 
 def test_linked_vocab_helper():
@@ -13,3 +13,55 @@ def test_linked_vocab_helper():
     # test entries from two different files are present
     assert "bioportal.aba-amb" in linked_vocab_helper_.linked_vocab_dict
     assert "bioregistry.3dmet" in linked_vocab_helper_.linked_vocab_dict
+
+
+def test_linked_vocab_matcher():
+    linked_vocab_helper_ = LinkedVocabHelper({})
+    for prefix, uri_format, pattern in [
+        ("dcterms", "http://purl.org/dc/terms/$1", None),
+        ("go", "http://purl.obolibrary.org/obo/GO_$1", r"^GO_\d{7}$"),
+        ("chebi", "http://purl.obolibrary.org/obo/CHEBI_$1", r"^CHEBI_\d+$"),
+        ("dcterms.alias", "http://purl.org/dc/terms/$1", None),
+        ("prints", "http://example.org/cgi-bin/search.cgi?accn=$1", None),
+    ]:
+        linked_vocab_helper_.add_linked_vocab_index_entry(
+            prefix, {"prefix": prefix, "uri_format": uri_format, "pattern": pattern}
+        )
+    index = linked_vocab_helper_.linked_vocab_index
+
+    def get_prefix(iri, isnamespaceIRI=False):
+        entry = linked_vocab_helper_.get_linked_vocab_by_iri(iri, isnamespaceIRI=isnamespaceIRI)
+        return entry.get("prefix") if entry else None
+
+    # the last matching entry wins
+    assert get_prefix("http://purl.org/dc/terms/title") == "dcterms.alias"
+    assert get_prefix("http://purl.org/dc/terms/", isnamespaceIRI=True) == "dcterms.alias"
+    assert get_prefix("http://purl.obolibrary.org/obo/GO_0008150") == "go"
+    assert get_prefix("http://purl.obolibrary.org/obo/CHEBI_15377") == "chebi"
+    assert get_prefix("http://purl.obolibrary.org/obo/GO_123") is None
+    assert get_prefix("http://example.org/cgi-bin/search.cgi?accn=PR00001") == "prints"
+    assert get_prefix("http://example.org/other") is None
+    assert get_prefix("https://schema.org/name") is None
+    # the index is not changed by matching
+    assert index["example.org"]["www"][0]["pattern"] == "/cgi-bin/search.cgi?accn=$1"
+    matcher = LinkedVocabMatcher.get_matcher(index)
+    assert matcher.match.cache_info().currsize == 8
+    assert get_prefix("http://purl.org/dc/terms/title") == "dcterms.alias"
+    assert matcher.match.cache_info().hits == 1
+    assert LinkedVocabMatcher.get_matcher(index) is matcher
+    LinkedVocabMatcher.reset()
+    assert LinkedVocabMatcher.get_matcher(index) is not matcher
+
+
+def test_linked_vocab_matcher_prefers_namespace_entries():
+    linked_vocab_helper_ = LinkedVocabHelper({})
+    for prefix, uri_format in [
+        ("vto", "http://purl.obolibrary.org/obo/VTO_$1"),
+        ("obo", "http://purl.obolibrary.org/obo/$1"),
+    ]:
+        linked_vocab_helper_.add_linked_vocab_index_entry(prefix, {"prefix": prefix, "uri_format": uri_format})
+    # the entry of the namespace itself wins over the later generic entry whose pattern matches as well
+    entry = linked_vocab_helper_.get_linked_vocab_by_iri("http://purl.obolibrary.org/obo/VTO_", isnamespaceIRI=True)
+    assert entry.get("prefix") == "vto"
+    entry = linked_vocab_helper_.get_linked_vocab_by_iri("http://purl.obolibrary.org/obo/VTO_0000001")
+    assert entry.get("prefix") == "obo"
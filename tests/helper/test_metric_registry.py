@@ -0,0 +1,34 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+
+from fuji_server.helper.metric_helper import MetricHelper
+from fuji_server.helper.metric_registry import MetricRegistry
+from fuji_server.helper.preprocessor import Preprocessor
+
+
+def test_specification_is_shared_until_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "metrics_v0.5.yaml"
+    shutil.copy(os.path.join(Preprocessor.METRIC_YML_PATH, "metrics_v0.5.yaml"), path)
+    monkeypatch.setattr(Preprocessor, "METRIC_YML_PATH", str(tmp_path))
+    MetricRegistry.clear()
+
+    first, second = MetricHelper("metrics_v0.5"), MetricHelper("0.5")
+    assert first.specification is second.specification
+    metrics = first.get_custom_metrics(["metric_name", "metric_tests"])
+    assert metrics is second.get_custom_metrics(["metric_name", "metric_tests"])
+    assert metrics["FsF-F1-01D"]["metric_tests"][0]["agnostic_test_identifier"] == "FsF-F1-01D-1"
+    # the served specification is not changed by indexing the tests
+    assert "agnostic_test_identifier" not in first.get_metric("FsF-F1-01D-1")["metric_tests"][0]
+    assert first.get_metric("FsF-F1-01D")["metric_identifier"] == "FsF-F1-01D"
+
+    path.write_text(path.read_text().replace("FsF-F1-01D", "FsF-F1-09D"))
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1000000000))
+    changed = MetricHelper("0.5")
+    assert changed.specification is not first.specification
+    assert changed.get_etag() != first.get_etag()
+    assert "FsF-F1-09D" in changed.get_custom_metrics(["metric_name"])
+    MetricRegistry.clear()
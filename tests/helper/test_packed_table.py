@@ -0,0 +1,40 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import pickle
+
+import pytest
+
+from fuji_server.helper.packed_table import PackedRecords, PackedTable
+
+LICENSES = [
+    {"licenseId": "MIT", "seeAlso": ["https://opensource.org/license/mit/"]},
+    {"licenseId": "CC-BY-4.0", "seeAlso": []},
+]
+
+
+def test_packed_records():
+    records = PackedRecords(LICENSES)
+    assert len(records) == 2
+    assert records == LICENSES
+    assert records[-1]["licenseId"] == "CC-BY-4.0"
+    assert records[:1] == LICENSES[:1]
+    with pytest.raises(IndexError):
+        records[2]
+    # records are copies, the table is not modified
+    records[0]["seeAlso"].append("http://opensource.org/license/mit/")
+    assert records[0] == LICENSES[0]
+    assert pickle.loads(pickle.dumps(records)) == LICENSES
+    assert not PackedRecords()
+
+
+def test_packed_table():
+    table = PackedTable({"occ": {"pattern": "^[a-z]+$"}, "taxonomy": {"pattern": "^\\d+$"}})
+    assert list(table) == ["occ", "taxonomy"]
+    assert "occ" in table and "doi" not in table
+    assert table["taxonomy"] == {"pattern": "^\\d+$"}
+    assert table.get("doi", {}) == {}
+    assert dict(table.items()) == {"occ": {"pattern": "^[a-z]+$"}, "taxonomy": {"pattern": "^\\d+$"}}
+    assert table == pickle.loads(pickle.dumps(table))
+    assert table.get_size() > 0
@@ -0,0 +1,74 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import logging
+
+import pytest
+
+from fuji_server.helper.metadata_collector_rdf import MetaDataCollectorRdf
+from fuji_server.helper.metadata_collector_xml import MetaDataCollectorXML
+from fuji_server.helper.parsed_artifact_cache import ParsedArtifactCache
+
+JSON_LD = {
+    "@context": {"@vocab": "http://schema.org/"},
+    "@id": "https://www.example.org/dataset/1",
+    "@type": "Dataset",
+    "name": "Example dataset",
+}
+
+DATACITE_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<resource xmlns="http://datacite.org/schema/kernel-4">
+  <identifier identifierType="DOI">10.1594/PANGAEA.908011</identifier>
+  <titles><title>Example dataset</title></titles>
+</resource>"""
+
+
+@pytest.fixture
+def cache():
+    ParsedArtifactCache.reset()
+    yield ParsedArtifactCache
+    ParsedArtifactCache.reset()
+
+
+def test_key_depends_on_content_parser_and_version(cache):
+    key = cache.get_key(b"<html/>", "extruct", "0.18.0", "json-ld")
+    assert key == cache.get_key("<html/>", "extruct", "0.18.0", "json-ld")
+    assert key != cache.get_key(b"<html />", "extruct", "0.18.0", "json-ld")
+    assert key != cache.get_key(b"<html/>", "extruct", "0.19.0", "json-ld")
+    assert cache.get_key({"b": 1, "a": 2}, "rdf", 1) == cache.get_key({"a": 2, "b": 1}, "rdf", 1)
+    assert cache.get_key(None, "rdf", 1) is None
+
+
+def test_hits_are_copies(cache):
+    key = cache.get_key(b"content", "test", 1)
+    cache.set(key, {"metadata": {"title": ["a"]}})
+    artifact = cache.get(key)
+    artifact["metadata"]["title"].append("b")
+    assert cache.get(key) == {"metadata": {"title": ["a"]}}
+
+
+def test_rdf_collector_reuses_parse_result(cache, monkeypatch):
+    logger = logging.getLogger(__name__)
+    source, metadata = MetaDataCollectorRdf(loggerinst=logger, json_ld_content=JSON_LD).parse_metadata()
+    assert metadata.get("title") == "Example dataset"
+
+    def fail(self, rdf_response):
+        raise AssertionError("content parsed again")
+
+    monkeypatch.setattr(MetaDataCollectorRdf, "parse_rdf_response", fail)
+    collector = MetaDataCollectorRdf(loggerinst=logger, json_ld_content=dict(JSON_LD))
+    assert collector.parse_metadata() == (source, metadata)
+    assert collector.getNamespaces()
+
+
+def test_xml_collector_cache_restores_namespaces(cache):
+    collector = MetaDataCollectorXML(loggerinst=logging.getLogger(__name__))
+    key = collector.get_parse_cache_key(DATACITE_XML)
+    metadata = collector.parse_xml(DATACITE_XML)
+    collector.set_cached_parse(key, metadata)
+    assert metadata.get("title")
+    other = MetaDataCollectorXML(loggerinst=logging.getLogger(__name__))
+    assert other.get_cached_parse(key)["metadata"] == metadata
+    assert other.getNamespaces() == collector.getNamespaces()
+    assert "http://datacite.org/schema/kernel-4" in other.getNamespaces()
@@ -0,0 +1,51 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import gc
+import signal
+from pathlib import Path
+
+import fuji_server
+from fuji_server.helper.identifier_helper import IdentifierHelper
+from fuji_server.helper.metric_registry import MetricRegistry
+from fuji_server.helper.prefork_server import PreforkServer
+from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.reference_data_snapshot import ReferenceDataSnapshot
+
+
+def test_preload_freezes_reference_data(temporary_preprocessor, monkeypatch):
+    # parsing all source files takes several seconds, a few small ones are enough here
+    monkeypatch.setattr(
+        ReferenceDataSnapshot,
+        "retrieve_all",
+        classmethod(lambda cls: (Preprocessor.retrieve_identifiers_org_data(), Preprocessor.retrieve_doi_prefixes())),
+    )
+    Preprocessor.set_metric_yaml_path(Path(fuji_server.__file__).parent / "yaml")
+    monkeypatch.setattr(IdentifierHelper, "_identifiers_org_patterns", None)
+    MetricRegistry.clear()
+    try:
+        PreforkServer.preload()
+        assert gc.get_freeze_count() > 0
+        assert Preprocessor.identifiers_org_data
+        assert IdentifierHelper._identifiers_org_patterns
+        assert MetricRegistry._specifications
+    finally:
+        gc.unfreeze()
+        MetricRegistry.clear()
+
+
+def test_replace_starts_new_workers_before_stopping_the_previous_ones(monkeypatch):
+    events = []
+    monkeypatch.setattr(PreforkServer, "_children", {101: 0, 102: 1})
+    monkeypatch.setattr(PreforkServer, "_retiring", {})
+    monkeypatch.setattr(
+        PreforkServer,
+        "spawn",
+        classmethod(lambda cls, number, config, sock, post_fork=None: cls._children.update({201 + number: number})),
+    )
+    monkeypatch.setattr("os.kill", lambda pid, signum: events.append((pid, signum)))
+    PreforkServer.replace(None, None)
+    assert PreforkServer._children == {201: 0, 202: 1}
+    assert sorted(PreforkServer._retiring) == [101, 102]
+    assert events == [(101, signal.SIGTERM), (102, signal.SIGTERM)]
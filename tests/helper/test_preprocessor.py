@@ -119,7 +119,7 @@ def test_set_mime_types(temporary_preprocessor: Preprocessor, initial_mime_types
 
 def test_retrieve_licenses(temporary_preprocessor: Preprocessor, licenses: list[dict[str, Any]]) -> None:
     assert temporary_preprocessor.total_licenses == 0
-    temporary_preprocessor.retrieve_licenses(isDebug)
+    temporary_preprocessor.retrieve_licenses()
     expected = len(licenses)
     assert temporary_preprocessor.total_licenses == expected
     assert len(temporary_preprocessor.all_licenses) == temporary_preprocessor.total_licenses
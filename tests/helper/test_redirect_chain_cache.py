@@ -0,0 +1,110 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import http.server
+import socket
+import threading
+
+import pytest
+
+from fuji_server.helper.http_transport import TransportResponse
+from fuji_server.helper.identifier_helper import IdentifierHelper
+from fuji_server.helper.redirect_chain_cache import RedirectChainCache
+from fuji_server.helper.request_helper import AcceptTypes, RequestHelper
+from tests.helper.test_http_transport import make_response
+from tests.helper.test_request_helper import RecordHandler
+
+CHAIN = {
+    "redirect_url": "https://doi.pangaea.de/10.1594/PANGAEA.908011",
+    "redirect_list": ["https://doi.pangaea.de/10.1594/PANGAEA.908011"],
+    "redirect_status_list": [("https://doi.pangaea.de/10.1594/PANGAEA.908011", 302)],
+    "status_list": [302],
+}
+
+
+@pytest.fixture
+def cache():
+    RedirectChainCache.reset()
+    yield RedirectChainCache
+    RedirectChainCache.reset()
+
+
+def test_resolution_key():
+    assert (
+        IdentifierHelper("https://doi.org/10.1594/PANGAEA.908011").get_resolution_key()
+        == IdentifierHelper("doi:10.1594/pangaea.908011").get_resolution_key()
+    )
+    assert IdentifierHelper("https://www.example.org/record/1").get_resolution_key() is None
+
+
+def test_cache_ttl_and_size(cache):
+    cache.set("doi:10.1/a", CHAIN)
+    chain = cache.get("doi:10.1/a")
+    assert chain == CHAIN
+    chain["status_list"].append(200)
+    assert cache.get("doi:10.1/a")["status_list"] == [302]
+    ttl, max_entries = cache.ttl, cache.max_entries
+    try:
+        cache.configure(max_entries=1)
+        cache.set("doi:10.1/b", CHAIN)
+        assert cache.get("doi:10.1/a") is None
+        cache.configure(ttl=-1)
+        cache.set("doi:10.1/c", CHAIN)
+        assert cache.get("doi:10.1/c") is None
+    finally:
+        cache.configure(ttl, max_entries)
+
+
+def test_resolutions_are_shared_by_worker_processes(cache, tmp_path):
+    ttl = cache.ttl
+    cache.configure(path=str(tmp_path / "pid_resolutions.sqlite"))
+    try:
+        cache.set("doi:10.1/a", CHAIN)
+        # another worker process only sees the shared database
+        cache.reset()
+        assert cache.get("doi:10.1/a") == CHAIN
+        cache.configure(ttl=-1, path=str(tmp_path / "pid_resolutions.sqlite"))
+        cache.set("doi:10.1/b", CHAIN)
+        cache.reset()
+        assert cache.get("doi:10.1/b") is None
+        assert cache.get("doi:10.1/a") == CHAIN
+    finally:
+        cache.configure(ttl)
+
+
+def test_redirect_info_prepends_cached_chain():
+    request_helper = RequestHelper("https://doi.org/10.1594/PANGAEA.908011")
+    request_helper.setResolvedRedirectChain(CHAIN)
+    request_helper.set_redirect_info(TransportResponse(make_response(CHAIN["redirect_url"], 200)))
+    assert request_helper.getRedirectChain() == CHAIN
+
+
+def test_cached_chain_use_is_reported():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RecordHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        closed_port = sock.getsockname()[1]
+    try:
+        url = "http://127.0.0.1:" + str(server.server_port) + "/record"
+        request_helper = RequestHelper("https://doi.org/10.1594/PANGAEA.908011")
+        request_helper.setAcceptType(AcceptTypes.xml)
+        request_helper.setResolvedRedirectChain(dict(CHAIN, redirect_url=url))
+        request_helper.content_negotiate("FsF-F1-02D")
+        assert request_helper.response_status == 200
+        # the caller does not store (and extend) the reused resolution again
+        assert request_helper.isRedirectChainCached()
+
+        # an outdated resolution is replaced by a new one which is stored
+        request_helper = RequestHelper(url)
+        request_helper.setAcceptType(AcceptTypes.xml)
+        request_helper.setResolvedRedirectChain(
+            dict(CHAIN, redirect_url="http://127.0.0.1:" + str(closed_port) + "/record")
+        )
+        request_helper.content_negotiate("FsF-F1-02D")
+        assert request_helper.response_status == 200
+        assert not request_helper.isRedirectChainCached()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,100 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import json
+
+import pytest
+import requests
+
+from fuji_server.helper.http_transport import HTTPTransport
+from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.reference_data_refresher import ReferenceDataRefresher
+
+
+def make_response(status, data=None, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = json.dumps(data).encode() if data is not None else b""
+    return response
+
+
+def repository_page(number, total_pages):
+    return {
+        "data": [{"id": f"client.{number}", "attributes": {"re3data": f"https://doi.org/10.17616/R3{number}"}}],
+        "meta": {"totalPages": total_pages},
+    }
+
+
+@pytest.fixture
+def refresher(tmp_path, temporary_preprocessor):
+    ReferenceDataRefresher.configure(str(tmp_path / "reference_data"))
+    yield ReferenceDataRefresher
+    ReferenceDataRefresher.stop()
+    ReferenceDataRefresher.configure(None)
+
+
+def test_refresh_pages_and_swaps_snapshot(refresher, monkeypatch):
+    requested = []
+
+    def get(url, params=None, headers=None, timeout=None):
+        requested.append((params["page[number]"], headers))
+        if headers and headers.get("If-None-Match") == '"v1"':
+            return make_response(304)
+        return make_response(200, repository_page(params["page[number]"], 3), {"ETag": '"v1"'})
+
+    monkeypatch.setattr(HTTPTransport, "get", get)
+    assert refresher.refresh("datacite_repositories")
+    assert sorted(number for number, _headers in requested) == [1, 2, 3]
+    assert Preprocessor.getRE3repositories()["client.3"] == "https://doi.org/10.17616/R33"
+    # the snapshot is read after a restart instead of the shipped file
+    Preprocessor.re3repositories = {}
+    Preprocessor.retrieve_datacite_re3repos()
+    assert "client.2" in Preprocessor.re3repositories
+
+    # paged data is requested completely, a 304 of the first page would skip changes of the other pages
+    requested.clear()
+    refresher.configure(refresher.reference_data_dir)
+    updated = refresher._state["datacite_repositories"]["updated"]
+    assert refresher.refresh("datacite_repositories")
+    assert sorted(number for number, _headers in requested) == [1, 2, 3]
+    assert all("If-None-Match" not in (headers or {}) for _number, headers in requested)
+    # unchanged pages do not update the snapshot
+    assert refresher._state["datacite_repositories"]["updated"] == updated
+    status = refresher.get_status()["datasets"]["datacite_repositories"]
+    assert status["source"] == "refreshed"
+    assert not status["stale"]
+    assert status["entries"] == 4
+
+
+def test_failed_refresh_keeps_snapshot(refresher, monkeypatch):
+    licenses, _license_names = Preprocessor.get_licenses()
+    monkeypatch.setattr(HTTPTransport, "get", lambda url, **kwargs: make_response(500))
+    assert not refresher.refresh("spdx_licenses")
+    assert Preprocessor.get_licenses()[0] is licenses
+    status = refresher.get_status()["datasets"]["spdx_licenses"]
+    assert status["source"] == "shipped"
+    assert "500" in status["error"]
+    assert not refresher.is_due("spdx_licenses")
+
+
+def test_update_handler_is_called_once_per_round(refresher, monkeypatch):
+    updates = []
+    monkeypatch.setattr(refresher, "DATASETS", {"spdx_licenses": "licenses.yaml", "mime_types": "mime_db.json"})
+    monkeypatch.setattr(refresher, "update_handler", lambda: updates.append(True))
+    responses = {
+        Preprocessor.SPDX_URL: make_response(200, {"licenses": [{"name": "MIT"}]}, {"ETag": '"v1"'}),
+        refresher.MIME_DB_URL: make_response(200, {"text/x-test": {"extensions": ["fujitest"]}}),
+    }
+    monkeypatch.setattr(HTTPTransport, "get", lambda url, **kwargs: responses[url])
+    # the refresher of a previous test has been stopped
+    refresher._stop.clear()
+    refresher.refresh_due()
+    assert updates == [True]
+
+    # unchanged data does not trigger a reload
+    monkeypatch.setattr(HTTPTransport, "get", lambda url, **kwargs: make_response(304))
+    monkeypatch.setattr(refresher, "interval", 0)
+    refresher.refresh_due()
+    assert updates == [True]
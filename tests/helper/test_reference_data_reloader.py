@@ -0,0 +1,66 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+import os
+import signal
+
+from fuji_server.helper.identifier_helper import IdentifierHelper
+from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.reference_data_reloader import ReferenceDataReloader
+from fuji_server.helper.reference_data_snapshot import ReferenceDataSnapshot
+
+
+def test_reload_swaps_in_new_tables(temporary_preprocessor, temporary_data_directory, monkeypatch):
+    monkeypatch.setattr(Preprocessor, "data_dir", temporary_data_directory / "data")
+    # parsing all source files takes several seconds, a few small ones are enough here
+    monkeypatch.setattr(
+        ReferenceDataSnapshot,
+        "retrieve_all",
+        classmethod(
+            lambda cls, preprocessor=Preprocessor: (
+                preprocessor.retrieve_doi_prefixes(),
+                preprocessor.retrieve_identifiers_org_data(),
+            )
+        ),
+    )
+    snapshot_path = temporary_data_directory / "cache" / "reference_data.pickle"
+    ReferenceDataReloader.configure(snapshot_path)
+    doi_prefixes = Preprocessor.get_doi_prefixes()
+    identifiers_org_data = Preprocessor.get_identifiers_org_data()
+    IdentifierHelper.reset()
+    IdentifierHelper("10.1594/PANGAEA.902845")
+    with open(Preprocessor.data_dir / "doi_prefixes.tsv", "a") as f:
+        f.write("10.99999\tTest\n")
+
+    try:
+        assert ReferenceDataReloader.reload()
+        assert Preprocessor.get_doi_prefixes()["10.99999"] == "Test"
+        assert Preprocessor.get_identifiers_org_data() == identifiers_org_data
+        # the tables of running assessments are not modified
+        assert "10.99999" not in doi_prefixes
+        assert Preprocessor.get_identifiers_org_data() is not identifiers_org_data
+        assert IdentifierHelper.analyse.cache_info().currsize == 0
+        assert ReferenceDataSnapshot.load(snapshot_path)
+        status = ReferenceDataReloader.get_status()
+        assert not status["running"]
+        assert status["error"] is None
+    finally:
+        ReferenceDataReloader.configure(None)
+        IdentifierHelper.reset()
+
+
+def test_start_asks_the_master_to_reload(tmp_path):
+    signals = []
+    previous_handler = signal.signal(signal.SIGHUP, lambda signum, frame: signals.append(signum))
+    ReferenceDataReloader.configure(None, str(tmp_path / "reload_state.json"))
+    ReferenceDataReloader.set_master(os.getpid())
+    try:
+        assert ReferenceDataReloader.start()
+        assert signals == [signal.SIGHUP]
+        # the state is shared with the master and the other workers
+        assert ReferenceDataReloader.get_status()["running"]
+        assert not ReferenceDataReloader.start()
+        assert signals == [signal.SIGHUP]
+    finally:
+        signal.signal(signal.SIGHUP, previous_handler)
+        ReferenceDataReloader.configure(None)
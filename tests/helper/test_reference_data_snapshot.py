@@ -0,0 +1,32 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import os
+
+from fuji_server.helper.preprocessor import Preprocessor
+from fuji_server.helper.reference_data_snapshot import ReferenceDataSnapshot
+
+
+def test_snapshot_is_loaded_until_a_source_file_changes(temporary_preprocessor, temporary_data_directory, monkeypatch):
+    monkeypatch.setattr(Preprocessor, "data_dir", temporary_data_directory / "data")
+    # parsing all source files takes several seconds, a few small ones are enough here
+    monkeypatch.setattr(
+        ReferenceDataSnapshot,
+        "retrieve_all",
+        classmethod(lambda cls: (Preprocessor.retrieve_doi_prefixes(), Preprocessor.retrieve_licenses())),
+    )
+    path = temporary_data_directory / "cache" / "reference_data.pickle"
+    ReferenceDataSnapshot.build(path)
+    doi_prefixes, licenses = Preprocessor.doi_prefixes, Preprocessor.licenses
+    Preprocessor.doi_prefixes, Preprocessor.licenses = {}, ([], [])
+
+    assert ReferenceDataSnapshot.load(path)
+    assert Preprocessor.doi_prefixes == doi_prefixes
+    assert Preprocessor.licenses == licenses
+    assert "10.1594" in Preprocessor.get_doi_prefixes()
+
+    source = Preprocessor.data_dir / "doi_prefixes.tsv"
+    os.utime(source, ns=(source.stat().st_atime_ns, source.stat().st_mtime_ns + 1000000000))
+    assert not ReferenceDataSnapshot.load(path)
+    assert not ReferenceDataSnapshot.load(temporary_data_directory / "missing.pickle")
@@ -0,0 +1,48 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import logging
+
+import pytest
+
+from fuji_server.helper.repository_helper import RepositoryHelper
+from fuji_server.helper.repository_profile_cache import RepositoryProfileCache
+
+RE3DATA_RECORD = b"""<?xml version="1.0" encoding="utf-8"?>
+<r3d:re3data xmlns:r3d="http://www.re3data.org/schema/2-2">
+  <r3d:repository>
+    <r3d:repositoryName>PANGAEA</r3d:repositoryName>
+    <r3d:repositoryURL>https://www.pangaea.de/</r3d:repositoryURL>
+    <r3d:api apiType="OAI-PMH">https://ws.pangaea.de/oai/provider</r3d:api>
+    <r3d:metadataStandard>
+      <r3d:metadataStandardURL>http://www.dcc.ac.uk/resources/metadata-standards/datacite-metadata-schema</r3d:metadataStandardURL>
+    </r3d:metadataStandard>
+  </r3d:repository>
+</r3d:re3data>"""
+
+
+@pytest.fixture
+def profile_cache(tmp_path):
+    RepositoryProfileCache.configure(str(tmp_path / "re3data_profiles.sqlite"))
+    yield RepositoryProfileCache
+    RepositoryProfileCache.configure(None)
+
+
+def test_profile_is_reused_by_assessments_of_the_same_repository(profile_cache):
+    logger = logging.getLogger(__name__)
+    helper = RepositoryHelper("pangaea.repository", logger, "https://doi.pangaea.de/10.1594/PANGAEA.908011")
+    helper.re3metadata_raw = RE3DATA_RECORD
+    helper.parseRe3data()
+    profile_cache.set(helper.get_profile_key(), helper.get_profile())
+
+    other = RepositoryHelper("PANGAEA.REPOSITORY", logger, "https://doi.pangaea.de/10.1594/PANGAEA.0815")
+    # a cache miss would query the DataCite and re3data APIs which are not recorded for this test
+    other.lookup_re3data()
+    assert other.getRepoNameURL() == ("PANGAEA", "https://www.pangaea.de/")
+    assert other.getRe3MetadataAPIs() == {"OAI-PMH": "https://ws.pangaea.de/oai/provider"}
+    assert other.getRe3MetadataStandards() == helper.getRe3MetadataStandards()
+    assert (
+        other.get_profile_key()
+        != RepositoryHelper("pangaea.repository", logger, "https://example.org").get_profile_key()
+    )
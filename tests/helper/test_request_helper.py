@@ -0,0 +1,86 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import http.server
+import io
+import threading
+
+from fuji_server.helper.content_cache import TieredContentCache
+from fuji_server.helper.request_helper import AcceptTypes, ContentReader, RequestHelper
+
+
+def test_content_reader_truncation():
+    reader = ContentReader(io.BytesIO(b"a" * 100), 60)
+    assert reader.read(10) == b"a" * 10
+    assert not reader.complete
+    assert len(reader.read()) == 50
+    assert reader.truncated
+    assert reader.size == 60
+
+    reader = ContentReader(io.BytesIO(b"a" * 60), 60)
+    reader.read()
+    assert reader.complete
+    assert not reader.truncated
+
+
+def test_content_reader_utf8_validation():
+    content = "ümlaut".encode() + b"\xff broken"
+    reader = ContentReader(io.BytesIO(content), 1000)
+    reader.chunk_size = 2
+    reader.read()
+    assert not reader.is_utf8
+    # the valid part ends at a chunk border before the invalid byte
+    assert content[: reader.utf8_valid_size].decode("utf-8") == "ümlau"
+
+    reader = ContentReader(io.BytesIO("ümlaut".encode()), 1000)
+    reader.chunk_size = 1
+    reader.read()
+    assert reader.is_utf8
+
+
+def test_is_html_content():
+    request_helper = RequestHelper("https://example.org/record/1")
+    assert request_helper.is_html_content("text/html; charset=utf-8", b"")
+    assert request_helper.is_html_content(None, b"  <!DOCTYPE html><html>")
+    assert request_helper.is_html_content("application/xhtml+xml", b"<html>")
+    assert not request_helper.is_html_content("application/xhtml+xml", b"<?xml version='1.0'?><record/>")
+    assert not request_helper.is_html_content("application/ld+json", b"{}")
+
+
+class RecordHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        content = b"<record>protected</record>" if self.headers.get("Authorization") else b"<record>public</record>"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_authorized_content_is_not_cached(monkeypatch):
+    monkeypatch.setattr(RequestHelper, "content_cache", TieredContentCache())
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RecordHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = "http://127.0.0.1:" + str(server.server_port) + "/record"
+        request_helper = RequestHelper(url)
+        request_helper.setAcceptType(AcceptTypes.xml)
+        request_helper.setAuthToken("secret", "Bearer")
+        request_helper.content_negotiate("FsF-F2-01M")
+        assert b"protected" in request_helper.response_content
+        request_helper.mark_content_checked()
+
+        request_helper = RequestHelper(url)
+        request_helper.setAcceptType(AcceptTypes.xml)
+        request_helper.content_negotiate("FsF-F2-01M")
+        assert b"public" in request_helper.response_content
+        # content parsed as XML by another assessment is not skipped
+        assert not request_helper.is_content_checked()
+    finally:
+        server.shutdown()
+        server.server_close()
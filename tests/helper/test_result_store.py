@@ -0,0 +1,103 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+import http.server
+import io
+import json
+import threading
+
+import pytest
+import requests
+import urllib3
+
+from fuji_server.helper.http_transport import HTTPTransport, TransportResponse
+from fuji_server.helper.request_helper import AcceptTypes, RequestHelper
+from fuji_server.helper.result_store import AssessmentResultStore
+
+BODY = {"object_identifier": "https://doi.org/10.1594/PANGAEA.908011", "metric_version": "metrics_v0.5"}
+LANDING_URL = "https://doi.pangaea.de/10.1594/PANGAEA.908011"
+
+
+@pytest.fixture
+def result_store(tmp_path):
+    AssessmentResultStore.configure(str(tmp_path / "results.sqlite"), max_age=3600)
+    yield AssessmentResultStore
+    AssessmentResultStore.configure(None)
+
+
+def make_transport_response(status, body=b"", headers=None):
+    response = requests.Response()
+    response.url = LANDING_URL
+    response.status_code = status
+    response.headers.update(headers or {})
+    response.raw = urllib3.HTTPResponse(body=io.BytesIO(body), preload_content=False)
+    return TransportResponse(response)
+
+
+def test_key(result_store):
+    key = result_store.get_key(BODY)
+    assert key == result_store.get_key(dict(BODY, object_identifier="doi:10.1594/pangaea.908011", max_age=60))
+    assert key != result_store.get_key(dict(BODY, metric_version="metrics_v0.8"))
+    assert key != result_store.get_key(dict(BODY, use_datacite=False))
+    assert result_store.get_key(dict(BODY, auth_token="xyz")) is None
+
+
+def test_reuse_if_landing_page_unchanged(result_store, monkeypatch):
+    key = result_store.get_key(BODY)
+    validators = result_store.get_validators(
+        [("ETag", '"1"')], result_store.get_digest(make_transport_response(200, b"<html>1</html>"))
+    )
+    result_store.store(key, LANDING_URL, validators, json.dumps({"test_id": "abc"}))
+    sent_headers = []
+
+    def open_not_modified(url, headers=None, timeout=10):
+        sent_headers.append(headers)
+        return make_transport_response(304)
+
+    monkeypatch.setattr(HTTPTransport, "open", open_not_modified)
+    result, age = result_store.get_unchanged(key, 60)
+    assert result == {"test_id": "abc"}
+    assert age <= 1
+    assert sent_headers[0]["If-None-Match"] == '"1"'
+    assert result_store.get_unchanged(key, -1) is None
+
+    monkeypatch.setattr(HTTPTransport, "open", lambda url, headers=None, timeout=10: make_transport_response(200))
+    assert result_store.get_unchanged(key, 60) is None
+    monkeypatch.setattr(
+        HTTPTransport, "open", lambda url, headers=None, timeout=10: make_transport_response(200, b"<html>1</html>")
+    )
+    assert result_store.get_unchanged(key, 60)[0] == {"test_id": "abc"}
+
+
+class LatinPageHandler(http.server.BaseHTTPRequestHandler):
+    # not UTF-8 encoded, the RequestHelper re-encodes the content
+    content = "<html>Müller</html>".encode("latin-1")
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(self.content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_revalidation_digests_the_downloaded_body(result_store, monkeypatch):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), LatinPageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = "http://127.0.0.1:" + str(server.server_port) + "/record"
+        request_helper = RequestHelper(url)
+        request_helper.setAcceptType(AcceptTypes.default)
+        request_helper.content_negotiate("FsF-F1-02D", ignore_html=False)
+        assert request_helper.response_content != LatinPageHandler.content
+        key = result_store.get_key(BODY)
+        validators = result_store.get_validators(request_helper.response_header, request_helper.content_digest)
+        result_store.store(key, url, validators, json.dumps({"test_id": "abc"}))
+        assert result_store.get_unchanged(key, 60)[0] == {"test_id": "abc"}
+    finally:
+        server.shutdown()
+        server.server_close()
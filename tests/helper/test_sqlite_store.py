@@ -0,0 +1,34 @@
+# SPDX-FileCopyrightText: 2020 PANGAEA (https://www.pangaea.de/)
+#
+# SPDX-License-Identifier: MIT
+
+from fuji_server.helper.sqlite_store import SQLiteStore
+
+SCHEMA = ["CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT)"]
+
+
+def test_store_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "stores" / "test.sqlite")
+    writer = SQLiteStore("Test store", SCHEMA)
+    reader = SQLiteStore("Test store", SCHEMA)
+    assert not writer.is_enabled()
+    assert writer.execute("SELECT * FROM entries") is None
+    writer.configure(path)
+    reader.configure(path)
+    try:
+        assert writer.get_connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        writer.execute("INSERT INTO entries VALUES (?, ?)", ("a", "1"))
+        assert reader.execute("SELECT value FROM entries WHERE key = ?", ("a",)).fetchone() == ("1",)
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_in_memory_store_and_eviction_interval():
+    store = SQLiteStore("Test store", SCHEMA, in_memory=True, evict_interval=3)
+    assert store.is_enabled()
+    store.execute("INSERT INTO entries VALUES (?, ?)", ("a", "1"))
+    assert store.execute("SELECT COUNT(*) FROM entries").fetchone() == (1,)
+    assert [store.is_eviction_due() for _ in range(6)] == [False, False, True, False, False, True]
+    store.close()
+    assert store.execute("SELECT COUNT(*) FROM entries").fetchone() == (0,)